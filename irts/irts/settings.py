@@ -10,11 +10,19 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Django-гүй дундын модулиуд (geofence, attendance_matrix) qr_attendance-д байрладаг:
+# app_core.services.* гэж import хийхийн тулд qr_attendance-г sys.path-д нэмнэ.
+QR_ATTENDANCE_DIR = Path(os.getenv('QR_ATTENDANCE_DIR', BASE_DIR.parent / 'qr_attendance'))
+if str(QR_ATTENDANCE_DIR) not in sys.path:
+    sys.path.append(str(QR_ATTENDANCE_DIR))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
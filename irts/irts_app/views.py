@@ -8,7 +8,6 @@ from datetime import datetime, date, timedelta
 import csv
 import io
 import math
-from math import radians, sin, cos, sqrt, asin
 
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -19,6 +18,8 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch
 import io
 
+from app_core.services.geofence import get_fence
+from app_core.services.attendance_matrix import AttendanceMatrix, XLSX_CONTENT_TYPE, write_xlsx
 from .models import (
     ClassSession, Student, Enrollment, Attendance, 
     WeeklySchedule, Course, TeacherProfile, Location, AttendanceReport
@@ -29,16 +30,18 @@ from .models import (
 # UTILITY FUNCTIONS
 # ============================================
 
-def haversine_distance(lat1, lon1, lat2, lon2):
+def _attendance_distances(session, attendances):
     """
-    Хоёр GPS координатын хоорондох зайг метрээр тооцоолох
+    Ирц бүрийн зай (м) - нэг vectorized geofence дуудлагаар.
+    GPS эсвэл байршилгүй бол ''.
     """
-    R = 6371000.0  # Дэлхийн радиус метрээр
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat/2)**2 + cos(radians(lat1))*cos(radians(lat2))*sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    return R * c
+    if not session.location:
+        return [''] * len(attendances)
+    fence = get_fence(session.location.latitude, session.location.longitude, session.location.radius_m)
+    with_gps = [a for a in attendances if a.lat and a.lon]
+    dist = fence.distances([a.lat for a in with_gps], [a.lon for a in with_gps])
+    by_pk = {a.pk: int(d) for a, d in zip(with_gps, dist)}
+    return [by_pk.get(a.pk, '') for a in attendances]
 
 
 # ============================================
@@ -240,13 +243,11 @@ def submit_attendance(request, token):
     dist = None
     
     if session.location and (lat_f is not None and lon_f is not None):
-        dist = haversine_distance(
-            session.location.latitude, 
-            session.location.longitude, 
-            lat_f, 
-            lon_f
-        )
-        allowed_ok = dist <= session.location.radius_m
+        fence = get_fence(session.location.latitude, session.location.longitude, session.location.radius_m)
+        allowed_ok, dist = fence.check(lat_f, lon_f)
+        if dist is None:
+            # check() bbox-оос гадуурх цэгт зай тооцохгүй; алдааны хариунд бодит зайг өгнө
+            dist = fence.distance_m(lat_f, lon_f)
     elif session.location:
         allowed_ok = False
     
@@ -264,13 +265,13 @@ def submit_attendance(request, token):
         return JsonResponse({
             "ok": True, 
             "message": "Ирц амжилттай бүртгэгдлээ!", 
-            "distance_m": int(dist) if dist else None
+            "distance_m": int(dist) if dist is not None else None
         })
     else:
         return JsonResponse({
             "ok": False, 
-            "error": f"Та зөв байршилд биш байна. ({int(dist) if dist else '?'}м зайтай)", 
-            "distance_m": int(dist) if dist else None
+            "error": f"Та зөв байршилд биш байна. ({int(dist) if dist is not None else '?'}м зайтай)", 
+            "distance_m": int(dist) if dist is not None else None
         })
 
 
@@ -400,15 +401,9 @@ def export_attendance_csv(request, session_id):
     ])
     
     # Data
-    for att in attendances:
-        distance = ''
-        if att.lat and att.lon and session.location:
-            distance = str(int(haversine_distance(
-                session.location.latitude, 
-                session.location.longitude, 
-                att.lat, 
-                att.lon
-            )))
+    distances = _attendance_distances(session, attendances)
+    for att, distance in zip(attendances, distances):
+        distance = str(distance)
         
         writer.writerow([
             att.student.student_code,
@@ -493,15 +488,8 @@ def export_attendance_excel(request, session_id):
         cell.border = border
     
     # Data rows
-    for row_idx, att in enumerate(attendances, start=5):
-        distance = ''
-        if att.lat and att.lon and session.location:
-            distance = int(haversine_distance(
-                session.location.latitude, 
-                session.location.longitude, 
-                att.lat, 
-                att.lon
-            ))
+    distances = _attendance_distances(session, attendances)
+    for row_idx, (att, distance) in enumerate(zip(attendances, distances), start=5):
         
         data = [
             att.student.student_code,
@@ -620,15 +608,9 @@ def export_attendance_pdf(request, session_id):
     # Table data
     data = [['№', 'Оюутны код', 'Оюутны нэр', 'Ирсэн цаг', 'Зай (м)', 'Төлөв']]
     
-    for idx, att in enumerate(attendances, start=1):
-        distance = ''
-        if att.lat and att.lon and session.location:
-            distance = str(int(haversine_distance(
-                session.location.latitude, 
-                session.location.longitude, 
-                att.lat, 
-                att.lon
-            )))
+    distances = _attendance_distances(session, attendances)
+    for idx, (att, distance) in enumerate(zip(attendances, distances), start=1):
+        distance = str(distance)
         
         data.append([
             str(idx),
@@ -711,57 +693,23 @@ def export_course_attendance_excel(request, course_id):
         enrollment__course=course
     ).distinct().order_by('student_code')
     
-    # Excel workbook үүсгэх
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Ирцийн нэгтгэл"
-    
-    # Гарчиг
-    ws.merge_cells('A1:Z1')
-    ws['A1'] = f"Ирцийн нэгтгэл - {course.name}"
-    ws['A1'].font = Font(bold=True, size=14)
-    ws['A1'].alignment = Alignment(horizontal="center")
-    
-    # Headers
-    ws.cell(row=3, column=1, value="Оюутны код")
-    ws.cell(row=3, column=2, value="Оюутны нэр")
-    
-    for col_idx, session in enumerate(sessions, start=3):
-        ws.cell(row=3, column=col_idx, value=session.created_at.strftime('%m/%d'))
-    
-    ws.cell(row=3, column=len(sessions)+3, value="Нийт")
-    ws.cell(row=3, column=len(sessions)+4, value="Ирсэн")
-    ws.cell(row=3, column=len(sessions)+5, value="Хувь")
-    
-    # Data
-    for row_idx, student in enumerate(students, start=4):
-        ws.cell(row=row_idx, column=1, value=student.student_code)
-        ws.cell(row=row_idx, column=2, value=student.full_name)
-        
-        attended_count = 0
-        for col_idx, session in enumerate(sessions, start=3):
-            att = Attendance.objects.filter(session=session, student=student).first()
-            if att:
-                if att.success:
-                    ws.cell(row=row_idx, column=col_idx, value="✓")
-                    attended_count += 1
-                else:
-                    ws.cell(row=row_idx, column=col_idx, value="✗")
-            else:
-                ws.cell(row=row_idx, column=col_idx, value="-")
-        
-        total = len(sessions)
-        percentage = (attended_count / total * 100) if total > 0 else 0
-        
-        ws.cell(row=row_idx, column=len(sessions)+3, value=total)
-        ws.cell(row=row_idx, column=len(sessions)+4, value=attended_count)
-        ws.cell(row=row_idx, column=len(sessions)+5, value=f"{percentage:.1f}%")
+    # Бүх ирцийг нэг query-ээр авч санах ойд pivot хийнэ (cell бүрт query биш)
+    matrix = AttendanceMatrix(
+        students.values_list('id', 'student_code', 'full_name'),
+        [(s.id, s.created_at.strftime('%m/%d')) for s in sessions],
+        symbols={1: "✓", 2: "✗"},
+        attended=(1,),
+    )
+    matrix.fill(
+        (student_id, session_id, 1 if success else 2)
+        for student_id, session_id, success in Attendance.objects.filter(
+            session__in=sessions
+        ).values_list('student_id', 'session_id', 'success').iterator(chunk_size=5000)
+    )
     
     # Response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
     response['Content-Disposition'] = f'attachment; filename="course_attendance_{course.code}.xlsx"'
-    wb.save(response)
+    write_xlsx(matrix, response, f"Ирцийн нэгтгэл - {course.name}")
     
     return response
@@ -61,8 +61,6 @@ urlpatterns = [
 
 
     # # Бүргэл
-    # path('admin/enrollments/', students.enrollments_list, name='enrollments_list'),
-    # path('admin/enrollment/delete/<int:enrollment_id>/', students.enrollment_delete, name='enrollment_delete'),
     
     # # sessions
     # path('admin/sessions/', sessions.sessions_list, name='sessions_list'),
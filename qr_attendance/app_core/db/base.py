@@ -0,0 +1,33 @@
+# app_core/db/base.py
+# ENGINE 'app_core.db': Django's postgresql backend (psycopg2) that borrows its
+# connection from services/db_pool and returns it on close instead of opening
+# and closing a Postgres connection per request. settings.py switches to it
+# when DB_POOL_SIZE > 0. (Django's own OPTIONS["pool"] needs psycopg 3; this
+# tree stays on psycopg2 for cursor.copy_expert.)
+import psycopg2.extras
+from django.db.backends.postgresql import base
+
+from app_core.services import db_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _pool = None
+
+    def get_new_connection(self, conn_params):
+        # Django-ийн get_new_connection-тай ижил, зөвхөн connect() -> pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get('isolation_level', base.IsolationLevel.READ_COMMITTED)
+
+        self._pool = db_pool.pool_for(self.alias, conn_params, self.Database.connect)
+        connection = self._pool.getconn()
+        if 'isolation_level' in options:
+            connection.isolation_level = self.isolation_level
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self._pool.putconn(self.connection)
+                # atomic блок дотор хаасан ч pool-д буцсан холболтыг дахин ашиглахгүй
+                self.connection = None
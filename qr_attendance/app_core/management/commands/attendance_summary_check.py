@@ -0,0 +1,42 @@
+# app_core/management/commands/attendance_summary_check.py
+from django.core.management.base import BaseCommand
+
+from app_core.services import attendance_summary
+
+
+class Command(BaseCommand):
+    help = ('attendance_summary хүснэгтийг attendance-аас дахин тооцсонтой харьцуулна. '
+            '--fix зөрүүтэй хүрээг, --rebuild бүх (эсвэл --student/--course) мөрийг дахин бичнэ. '
+            'app_core/sql/attendance_summary.sql ажилласан байх шаардлагатай.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', type=int, help='student.id')
+        parser.add_argument('--course', type=int, help='course.id')
+        parser.add_argument('--limit', type=int, default=50, help='Хэвлэх зөрүүний тоо')
+        parser.add_argument('--fix', action='store_true', help='Зөрүүтэй оюутнуудын мөрийг дахин бичнэ')
+        parser.add_argument('--rebuild', action='store_true', help='Хүрээний бүх мөрийг дахин бичнэ')
+
+    def handle(self, *args, **opts):
+        scope = {'student_id': opts['student'], 'course_id': opts['course']}
+
+        if opts['rebuild']:
+            written = attendance_summary.rebuild(**scope)
+            self.stdout.write(self.style.SUCCESS(f'Rebuild: {written} мөр бичлээ'))
+            return
+
+        mismatches = attendance_summary.check(**scope)
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('attendance_summary attendance-тай таарч байна'))
+            return
+
+        self.stdout.write(self.style.WARNING(f'{len(mismatches)} зөрүү (student, course, semester):'))
+        for m in mismatches[:opts['limit']]:
+            self.stdout.write(f"  {m['key']}: summary={m['summary']} actual={m['actual']}")
+
+        if opts['fix']:
+            # Зөрүүтэй оюутан бүрийн мөрийг (scope дотор) дахин тооцно
+            students = sorted({m['key'][0] for m in mismatches})
+            written = 0
+            for student_id in students:
+                written += attendance_summary.rebuild(student_id=student_id, course_id=opts['course'])
+            self.stdout.write(self.style.SUCCESS(f'Fix: {len(students)} оюутан, {written} мөр дахин бичлээ'))
@@ -0,0 +1,63 @@
+# app_core/management/commands/backfill_session_semester.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+
+BATCH_SQL = """
+    WITH batch AS (
+        SELECT id FROM class_session
+        WHERE semester_id IS NULL AND id > %s
+        ORDER BY id
+        LIMIT %s
+    )
+    UPDATE class_session cs
+    SET semester_id = attendance_course_semester(cs.course_id, cs.date)
+    FROM batch
+    WHERE cs.id = batch.id
+    RETURNING cs.id, cs.semester_id
+"""
+
+
+class Command(BaseCommand):
+    help = ('class_session.semester_id хоосон мөрүүдийг attendance_course_semester()-оор '
+            'багцаар бөглөнө. app_core/sql/class_session_semester.sql ажилласан байх ёстой. '
+            'Дахин ажиллуулахад аюулгүй (зөвхөн NULL мөрүүд).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true', help='Хэдэн мөр бөглөгдөхийг л тоолно')
+
+    def handle(self, *args, **opts):
+        if opts['dry_run']:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT COUNT(*),
+                           COUNT(attendance_course_semester(course_id, date))
+                    FROM class_session WHERE semester_id IS NULL
+                """)
+                pending, resolvable = cursor.fetchone()
+            self.stdout.write(f'semester_id хоосон: {pending}, тодорхойлогдох: {resolvable}, '
+                              f'semester олдохгүй: {pending - resolvable}')
+            return
+
+        last_id, filled, unresolved = 0, 0, 0
+        started = time.monotonic()
+        while True:
+            # Багц бүр тусдаа transaction - урт түгжээ үүсгэхгүй
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(BATCH_SQL, [last_id, opts['batch_size']])
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = max(r[0] for r in rows)
+            batch_filled = sum(1 for r in rows if r[1] is not None)
+            filled += batch_filled
+            unresolved += len(rows) - batch_filled
+            self.stdout.write(f'  id <= {last_id}: +{batch_filled}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {filled} session бөглөлөө, {unresolved} нь semester олдсонгүй '
+            f'({time.monotonic() - started:.1f}s)'
+        ))
@@ -0,0 +1,111 @@
+# app_core/management/commands/bench_matrix_export.py
+import io
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook
+
+from app_core.services.attendance_matrix import AttendanceMatrix, write_xlsx
+from app_core.views.export_views import load_course_matrix
+
+# Synthetic өгөгдөлд DB-гүйгээр ашиглах attendance_type (1 ирсэн, 2 тасалсан, 3 хоцорсон, 4 чөлөөтэй)
+SYNTHETIC_SYMBOLS = {1: "✓", 2: "✗", 3: "Х", 4: "Ч"}
+SYNTHETIC_ATTENDED = (1, 3, 4)
+
+
+class Command(BaseCommand):
+    help = ('Хичээлийн ирцийн matrix export benchmark: cell бүрт query хийдэг хуучин арга '
+            'ба нэг query + санах ойн pivot + write-only workbook. '
+            '--course-id өгвөл жинхэнэ DB дээр, үгүй бол synthetic өгөгдөл дээр.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course-id', type=int, help='DB дээрх хичээл')
+        parser.add_argument('--semester-id', type=int)
+        parser.add_argument('--students', type=str, default='120,1000,5000',
+                            help='Synthetic оюутны тоо (таслалаар)')
+        parser.add_argument('--sessions', type=int, default=32)
+        parser.add_argument('--fill', type=float, default=0.9, help='Ирц бүртгэлтэй cell-ийн хувь')
+        parser.add_argument('--legacy', action='store_true',
+                            help='Хуучин (энгийн Workbook, cell бүрээр) бичилтийг мөн хэмжинэ')
+
+    def handle(self, *args, **opts):
+        if opts['course_id']:
+            self._bench_db(opts)
+            return
+        for n in [int(x) for x in opts['students'].split(',') if x.strip()]:
+            self._bench_synthetic(n, opts['sessions'], opts['fill'], opts['legacy'])
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def _bench_db(self, opts):
+        t0 = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            matrix = load_course_matrix(opts['course_id'], semester_id=opts['semester_id'])
+        t_load = time.perf_counter() - t0
+        t_write, size, peak = self._write(matrix)
+
+        n_students, n_sessions = len(matrix.students), matrix.width
+        self.stdout.write(f"course={opts['course_id']} students={n_students} sessions={n_sessions}")
+        self.stdout.write(f"  queries: {len(ctx.captured_queries)} (хуучин арга: ~{n_students * n_sessions + 2})")
+        self.stdout.write(f"  load {t_load * 1000:.1f} ms, write {t_write * 1000:.1f} ms, "
+                          f"{size / 1024:.0f} KiB, peak {peak / 1024 / 1024:.1f} MiB")
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def _bench_synthetic(self, n_students, n_sessions, fill, legacy):
+        rnd = random.Random(n_students)
+        students = [(i, f'S{i:06d}', f'Student {i}') for i in range(1, n_students + 1)]
+        sessions = [(1000 + j, f'{9 + j // 16:02d}/{1 + j % 28:02d}') for j in range(n_sessions)]
+        triples = [
+            (s[0], sess[0], rnd.choice((1, 1, 1, 2, 3, 4)))
+            for s in students for sess in sessions if rnd.random() < fill
+        ]
+
+        t0 = time.perf_counter()
+        matrix = AttendanceMatrix(students, sessions, SYNTHETIC_SYMBOLS, attended=SYNTHETIC_ATTENDED)
+        matrix.fill(triples)
+        t_pivot = time.perf_counter() - t0
+        t_write, size, peak = self._write(matrix)
+
+        self.stdout.write(f"students={n_students} sessions={n_sessions} cells={n_students * n_sessions}")
+        self.stdout.write(f"  хуучин арга: {n_students * n_sessions + 2} queries; шинэ: 3 queries")
+        self.stdout.write(f"  pivot {t_pivot * 1000:.1f} ms, write-only {t_write * 1000:.1f} ms, "
+                          f"{size / 1024:.0f} KiB, peak {peak / 1024 / 1024:.1f} MiB")
+
+        if legacy:
+            t_legacy, peak_legacy = self._write_legacy(students, sessions, triples)
+            self.stdout.write(f"  legacy workbook {t_legacy * 1000:.1f} ms, "
+                              f"peak {peak_legacy / 1024 / 1024:.1f} MiB (query-гүйгээр)")
+
+    def _write(self, matrix):
+        buf = io.BytesIO()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        write_xlsx(matrix, buf, "bench")
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, buf.tell(), peak
+
+    def _write_legacy(self, students, sessions, triples):
+        """export_course_attendance_excel-ийн хуучин бичилт: энгийн Workbook, ws.cell()."""
+        lookup = {(st, se): status for st, se, status in triples}
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        wb = Workbook()
+        ws = wb.active
+        for col_idx, (_, label) in enumerate(sessions, start=3):
+            ws.cell(row=3, column=col_idx, value=label)
+        for row_idx, (sid, code, name) in enumerate(students, start=4):
+            ws.cell(row=row_idx, column=1, value=code)
+            ws.cell(row=row_idx, column=2, value=name)
+            for col_idx, (sess_id, _) in enumerate(sessions, start=3):
+                status = lookup.get((sid, sess_id))
+                ws.cell(row=row_idx, column=col_idx, value=SYNTHETIC_SYMBOLS.get(status, '-'))
+        wb.save(io.BytesIO())
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak
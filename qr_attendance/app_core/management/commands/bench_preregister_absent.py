@@ -0,0 +1,125 @@
+# app_core/management/commands/bench_preregister_absent.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app_core.services.session_prefill import preregister_absent
+
+
+class Command(BaseCommand):
+    help = ('Session үүсгэхэд "Тасалсан" урьдчилсан бүртгэл: хуучин мөр-мөрөөр INSERT '
+            'vs нэг INSERT ... SELECT. Synthetic оюутнууд үүсгээд бүгдийг rollback хийнэ.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pattern-id', type=int, required=True,
+                            help='course_schedule_pattern.id (багш/хичээл/цагийг эндээс авна)')
+        parser.add_argument('--sizes', default='50,500,5000',
+                            help='Synthetic оюутны тоо, таслалаар')
+
+    def handle(self, *args, **opts):
+        sizes = [int(x) for x in opts['sizes'].split(',') if x.strip()]
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT teacher_id, course_id, location_id, lesson_type_id, time_setting_id
+                FROM course_schedule_pattern WHERE id = %s
+            """, [opts['pattern_id']])
+            pattern = cursor.fetchone()
+        if not pattern:
+            raise CommandError('Pattern олдсонгүй')
+
+        self.stdout.write(f"{'students':>9} {'rows':>7} {'legacy ms':>10} {'legacy q':>9} "
+                          f"{'set ms':>8} {'set q':>6} {'rerun rows':>11}")
+
+        with transaction.atomic():
+            for size in sizes:
+                session_id = self._seed(size, pattern, opts['pattern_id'])
+                legacy = self._run(self._legacy, session_id, opts['pattern_id'])
+                current = self._run(preregister_absent, session_id, opts['pattern_id'])
+                # idempotency: хоёр дахь удаа ажиллуулахад 0 мөр нэмэгдэх ёстой
+                with transaction.atomic():
+                    preregister_absent(session_id, opts['pattern_id'])
+                    rerun = preregister_absent(session_id, opts['pattern_id'])
+                    transaction.set_rollback(True)
+
+                self.stdout.write(f"{size:>9} {current[2]:>7} {legacy[0]:>10.1f} {legacy[1]:>9} "
+                                  f"{current[0]:>8.1f} {current[1]:>6} {rerun:>11}")
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Done (бүх өгөгдөл rollback хийгдсэн)'))
+
+    def _seed(self, size, pattern, pattern_id):
+        """Synthetic class group + `size` students attached to the pattern, and a session."""
+        teacher_id, course_id, location_id, lesson_type_id, time_setting_id = pattern
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO class_group (school_id, program_id, year_level, name, year)
+                SELECT school_id, program_id, year_level, 'BENCH', year
+                FROM class_group ORDER BY id LIMIT 1
+                RETURNING id
+            """)
+            row = cursor.fetchone()
+            if not row:
+                raise CommandError('class_group хоосон байна; загвар болгох бүлэг хэрэгтэй')
+            class_group_id = row[0]
+
+            cursor.execute("""
+                WITH s AS (
+                    INSERT INTO student (student_code, full_name, created_at)
+                    SELECT 'BENCH-' || %s || '-' || g, 'Bench Student ' || g, now()
+                    FROM generate_series(1, %s) g
+                    RETURNING id
+                )
+                INSERT INTO student_class_group (student_id, class_group_id, created_at)
+                SELECT id, %s, now() FROM s
+            """, [size, size, class_group_id])
+            cursor.execute("""
+                INSERT INTO class_group_schedule (class_group_id, course_schedule_pattern_id, created_at)
+                VALUES (%s, %s, now())
+            """, [class_group_id, pattern_id])
+            cursor.execute("""
+                INSERT INTO class_session
+                    (teacher_id, course_id, location_id, lesson_type_id, time_setting_id, date, created_at, name)
+                VALUES (%s, %s, %s, %s, %s, CURRENT_DATE, now(), 'BENCH')
+                RETURNING id
+            """, [teacher_id, course_id, location_id, lesson_type_id, time_setting_id])
+            return cursor.fetchone()[0]
+
+    def _legacy(self, session_id, pattern_id):
+        """Хуучин create_session-ий зам: оюутан бүрт нэг INSERT."""
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT id FROM attendance_type WHERE value = 'absent' OR name ILIKE '%тасалсан%' LIMIT 1
+            """)
+            absent_type = cursor.fetchone()
+            absent_type_id = absent_type[0] if absent_type else 2
+            cursor.execute("""
+                SELECT DISTINCT s.id
+                FROM class_group_schedule cgs
+                INNER JOIN class_group cg ON cg.id = cgs.class_group_id
+                INNER JOIN student_class_group scg ON scg.class_group_id = cg.id
+                INNER JOIN student s ON s.id = scg.student_id
+                WHERE cgs.course_schedule_pattern_id = %s
+            """, [pattern_id])
+            students = cursor.fetchall()
+            for student in students:
+                cursor.execute("""
+                    INSERT INTO attendance
+                    (session_id, student_id, "timestamp", attendance_type_id, device_id, device_info)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, [session_id, student[0], now, absent_type_id, 'pre-registered', 'Автоматаар тасалсан'])
+        return len(students)
+
+    def _run(self, fn, session_id, pattern_id):
+        """Returns (ms, queries, rows); the inserted rows are rolled back."""
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                rows = fn(session_id, pattern_id)
+                ms = (time.perf_counter() - t0) * 1000
+            transaction.set_rollback(True)
+        return ms, len(ctx.captured_queries), rows
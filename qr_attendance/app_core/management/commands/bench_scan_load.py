@@ -0,0 +1,308 @@
+# app_core/management/commands/bench_scan_load.py
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from app_core.services import db_pool, session_cache, session_roster
+
+GROUP_SIZE = 30
+SCHOOL_LAT, SCHOOL_LON, SCHOOL_RADIUS = 47.9185, 106.9170, 150
+
+# --db-modes: fresh - request бүрд шинэ холболт, persistent - thread бүр CONN_MAX_AGE-тэй
+# нэг холболт, pooled - app_core.db backend (services/db_pool)
+DB_MODES = {
+    'fresh': ('django.db.backends.postgresql', 0),
+    'persistent': ('django.db.backends.postgresql', 600),
+    'pooled': ('app_core.db', 0),
+}
+
+
+class Command(BaseCommand):
+    help = ('QR scan load test: synthetic сургууль үүсгээд submit_attendance руу зэрэг POST '
+            'илгээж throughput, p50/p95/p99 latency, queries/request тайлагнана. '
+            'Зөвхөн түр (disposable) Postgres дээр ажиллуулна - tttqr.sql schema сэргээсэн DB.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--disposable', action='store_true',
+                            help='Энэ DB түр зориулалттай гэдгийг баталгаажуулна (заавал)')
+        parser.add_argument('--students', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--outside-ratio', type=float, default=0.05,
+                            help='Радиусаас гадуур scan-ы эзлэх хувь')
+        parser.add_argument('--keep', action='store_true', help='Seed өгөгдлийг устгахгүй')
+        parser.add_argument('--db-modes', default='',
+                            help='Холболтын горимуудыг ээлжлэн харьцуулах, ж: fresh,persistent,pooled '
+                                 '(хоосон бол settings-ийн горимоор нэг удаа)')
+        parser.add_argument('--pool-size', type=int, default=0,
+                            help='pooled горимын pool-ийн хэмжээ (0 бол DB_POOL_SIZE, тэр нь 0 бол --concurrency)')
+
+    def handle(self, *args, **opts):
+        if not opts['disposable']:
+            raise CommandError('Seed хийж, ирц бичдэг тул --disposable заана уу (production DB дээр бүү ажиллуул)')
+        if connection.vendor != 'postgresql':
+            raise CommandError('Scan path Postgres-ийн SQL ашигладаг (ON CONFLICT, ILIKE, uuid)')
+
+        run = uuid.uuid4().hex[:8]
+        self.stdout.write(f'seeding run={run} students={opts["students"]} ...')
+        seed = self._seed(run, opts['students'])
+        session_cache.invalidate()
+        session_roster.invalidate()
+
+        modes = [m.strip() for m in opts['db_modes'].split(',') if m.strip()]
+        unknown = set(modes) - set(DB_MODES)
+        if unknown:
+            raise CommandError(f"--db-modes: {', '.join(sorted(unknown))} (боломжтой: {', '.join(DB_MODES)})")
+
+        summary = []
+        try:
+            for i, mode in enumerate(modes or [None]):
+                if i:
+                    self._reset(seed)
+                if mode:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'--- db mode: {mode}'))
+                with self._db_mode(mode, opts):
+                    results = self._fire(seed, opts)
+                    self._report(results, opts)
+                summary.append((mode, len(results['rows']) / results['wall'], results['connects']))
+        finally:
+            if not opts['keep']:
+                self._cleanup(seed)
+
+        if len(summary) > 1:
+            self.stdout.write(self.style.MIGRATE_HEADING('--- summary'))
+            base = summary[0][1]
+            for mode, rps, connects in summary:
+                self.stdout.write(f'{mode:<11} {rps:8.1f} req/s  x{rps / base:.2f}  connects {connects}')
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    @contextmanager
+    def _db_mode(self, mode, opts):
+        """Worker thread-үүдийн шинэ DatabaseWrapper-т ENGINE / CONN_MAX_AGE-ийг солино."""
+        if mode is None:
+            yield
+            return
+        db = connections.settings[DEFAULT_DB_ALIAS]
+        saved = {key: db.get(key) for key in ('ENGINE', 'CONN_MAX_AGE')}
+        db['ENGINE'], db['CONN_MAX_AGE'] = DB_MODES[mode]
+        pool_size = opts['pool_size'] or getattr(settings, 'DB_POOL_SIZE', 0) or opts['concurrency']
+        db_pool.close_all()
+        try:
+            with override_settings(DB_POOL_SIZE=pool_size):
+                yield
+        finally:
+            db_pool.close_all()
+            db.update(saved)
+
+    def _reset(self, seed):
+        """Дараагийн горим ижил ажил хийхийн тулд өмнөх ирцийг арилгана."""
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("DELETE FROM attendance WHERE session_id = %s", [seed['session']])
+        session_cache.invalidate()
+        session_roster.invalidate()
+
+    # ---- seed ----
+
+    def _seed(self, run, n_students):
+        """Бүх мөрийг BENCH-<run> шошготой үүсгэнэ. Returns ids for cleanup."""
+        tag = f'BENCH-{run}'
+        with transaction.atomic(), connection.cursor() as cursor:
+            def one(sql, params=()):
+                cursor.execute(sql, params)
+                return cursor.fetchone()[0]
+
+            loc = one("""INSERT INTO location (name, latitude, longitude, radius_m, created_at)
+                         VALUES (%s, %s, %s, %s, now()) RETURNING id""",
+                      [tag, SCHOOL_LAT, SCHOOL_LON, SCHOOL_RADIUS])
+            dept = one("INSERT INTO department (school_id, name, code) VALUES (%s, %s, %s) RETURNING id",
+                       [loc, tag, run])
+            prog = one("INSERT INTO program (department_id, name, code) VALUES (%s, %s, %s) RETURNING id",
+                       [dept, tag, run])
+            course = one("INSERT INTO course (name, code, created_at) VALUES (%s, %s, now()) RETURNING id",
+                         [tag, run])
+            cursor.execute("SELECT id FROM ref_role WHERE name = 'teacher' LIMIT 1")
+            role = cursor.fetchone()
+            if not role:
+                raise CommandError("ref_role 'teacher' олдсонгүй - tttqr.sql schema/ref өгөгдөл сэргээнэ үү")
+            user = one("INSERT INTO app_user (email, role_id) VALUES (%s, %s) RETURNING id",
+                       [f'{run}@bench.invalid', role[0]])
+            teacher = one("INSERT INTO teacher_profile (user_id, name, created_at) VALUES (%s, %s, now()) RETURNING id",
+                          [user, tag])
+            semester = one("""INSERT INTO semester (school_year, term, name, start_date, end_date, school_id)
+                              VALUES (EXTRACT(YEAR FROM now()), 1, %s, CURRENT_DATE - 30, CURRENT_DATE + 90, %s)
+                              RETURNING id""", [tag, loc])
+            cursor.execute("SELECT id FROM lesson_type ORDER BY id LIMIT 1")
+            lesson_type = cursor.fetchone()
+            lesson_type = lesson_type[0] if lesson_type else one(
+                "INSERT INTO lesson_type (name, value) VALUES (%s, %s) RETURNING id", [tag, run])
+            cursor.execute("SELECT id FROM room_type ORDER BY id LIMIT 1")
+            room_type = cursor.fetchone()
+            room_type = room_type[0] if room_type else one(
+                "INSERT INTO room_type (code, name) VALUES (%s, %s) RETURNING id", [run, tag])
+            time_setting = one("""INSERT INTO time_setting (location_id, name, value, start_time, end_time)
+                                  VALUES (%s, %s, '08:00-09:30', '08:00', '09:30') RETURNING id""", [loc, tag])
+            room = one("""INSERT INTO class_room (school_id, room_number, room_type_id, capacity)
+                          VALUES (%s, %s, %s, %s) RETURNING id""", [loc, run, room_type, n_students])
+            pattern = one("""INSERT INTO course_schedule_pattern
+                                 (semester_id, course_id, teacher_id, day_of_week, location_id,
+                                  lesson_type_id, time_setting_id, class_room_id)
+                             VALUES (%s, %s, %s, 1, %s, %s, %s, %s) RETURNING id""",
+                          [semester, course, teacher, loc, lesson_type, time_setting, room])
+
+            cursor.execute("""
+                INSERT INTO class_group (school_id, program_id, year_level, name, year)
+                SELECT %s, %s, 1, 'B' || g, EXTRACT(YEAR FROM now())
+                FROM generate_series(1, %s) g
+                RETURNING id
+            """, [loc, prog, (n_students + GROUP_SIZE - 1) // GROUP_SIZE])
+            groups = [r[0] for r in cursor.fetchall()]
+            cursor.execute("""
+                INSERT INTO class_group_schedule (class_group_id, course_schedule_pattern_id, created_at)
+                SELECT unnest(%s::bigint[]), %s, now()
+            """, [groups, pattern])
+
+            cursor.execute("""
+                INSERT INTO student (student_code, full_name, created_at)
+                SELECT %s || '-' || lpad(g::text, 6, '0'), 'Bench Student ' || g, now()
+                FROM generate_series(1, %s) g
+                RETURNING id, student_code
+            """, [run, n_students])
+            students = cursor.fetchall()
+            cursor.execute("""
+                INSERT INTO student_class_group (student_id, class_group_id, created_at)
+                SELECT s.id, (%s::bigint[])[(s.n - 1) / %s + 1], now()
+                FROM unnest(%s::bigint[]) WITH ORDINALITY AS s(id, n)
+            """, [groups, GROUP_SIZE, [s[0] for s in students]])
+
+            token = str(uuid.uuid4())
+            session = one("""INSERT INTO class_session
+                                 (teacher_id, course_id, token, location_id, date, created_at,
+                                  lesson_type_id, time_setting_id, expires_at, name, semester_id)
+                             VALUES (%s, %s, %s, %s, CURRENT_DATE, now(), %s, %s, now() + interval '1 hour', %s, %s)
+                             RETURNING id""",
+                          [teacher, course, token, loc, lesson_type, time_setting, tag, semester])
+
+        return {
+            'run': run, 'token': token, 'session': session, 'pattern': pattern,
+            'students': students, 'groups': groups, 'loc': loc, 'dept': dept, 'prog': prog,
+            'course': course, 'user': user, 'teacher': teacher, 'semester': semester,
+            'time_setting': time_setting, 'room': room,
+        }
+
+    def _cleanup(self, seed):
+        student_ids = [s[0] for s in seed['students']]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("DELETE FROM attendance WHERE session_id = %s", [seed['session']])
+            cursor.execute("DELETE FROM device_registry WHERE student_id = ANY(%s)", [student_ids])
+            cursor.execute("DELETE FROM class_session WHERE id = %s", [seed['session']])
+            cursor.execute("DELETE FROM student_class_group WHERE student_id = ANY(%s)", [student_ids])
+            cursor.execute("DELETE FROM student WHERE id = ANY(%s)", [student_ids])
+            cursor.execute("DELETE FROM class_group_schedule WHERE course_schedule_pattern_id = %s", [seed['pattern']])
+            cursor.execute("DELETE FROM class_group WHERE id = ANY(%s)", [seed['groups']])
+            cursor.execute("DELETE FROM course_schedule_pattern WHERE id = %s", [seed['pattern']])
+            cursor.execute("DELETE FROM class_room WHERE id = %s", [seed['room']])
+            cursor.execute("DELETE FROM time_setting WHERE id = %s", [seed['time_setting']])
+            cursor.execute("DELETE FROM semester WHERE id = %s", [seed['semester']])
+            cursor.execute("DELETE FROM teacher_profile WHERE id = %s", [seed['teacher']])
+            cursor.execute("DELETE FROM app_user WHERE id = %s", [seed['user']])
+            cursor.execute("DELETE FROM course WHERE id = %s", [seed['course']])
+            cursor.execute("DELETE FROM program WHERE id = %s", [seed['prog']])
+            cursor.execute("DELETE FROM department WHERE id = %s", [seed['dept']])
+            cursor.execute("DELETE FROM location WHERE id = %s", [seed['loc']])
+        self.stdout.write(f"cleanup run={seed['run']} done")
+
+    # ---- load ----
+
+    def _fire(self, seed, opts):
+        url = f"/attendance/{seed['token']}/submit/"
+        host = next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith('.') and h != '*'), 'localhost')
+        codes = [s[1] for s in seed['students']]
+        per_thread = [opts['requests'] // opts['concurrency']] * opts['concurrency']
+        for i in range(opts['requests'] % opts['concurrency']):
+            per_thread[i] += 1
+
+        results, lock = [], threading.Lock()
+        start = threading.Barrier(opts['concurrency'] + 1)
+        connects = [0]
+
+        def on_connect(sender, connection, **kwargs):
+            with lock:
+                connects[0] += 1
+
+        def worker(count, seed_no):
+            rnd = random.Random(seed_no)
+            client = Client(HTTP_HOST=host)
+            local = []
+            start.wait()
+            try:
+                for _ in range(count):
+                    code = rnd.choice(codes)
+                    far = rnd.random() < opts['outside_ratio']
+                    jitter = 0.01 if far else 0.0005
+                    data = {
+                        'student_code': code,
+                        'device_id': f'bench-{code}',
+                        'lat': SCHOOL_LAT + rnd.uniform(-jitter, jitter),
+                        'lon': SCHOOL_LON + rnd.uniform(-jitter, jitter),
+                    }
+                    with CaptureQueriesContext(connection) as ctx:
+                        t0 = time.perf_counter()
+                        resp = client.post(url, data)
+                        ms = (time.perf_counter() - t0) * 1000
+                    body = resp.json() if resp.get('Content-Type', '').startswith('application/json') else {}
+                    outcome = 'ok' if body.get('ok') else (body.get('error') or f'http {resp.status_code}')[:60]
+                    local.append((ms, len(ctx.captured_queries), outcome))
+            finally:
+                connection.close()
+                with lock:
+                    results.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(n, i)) for i, n in enumerate(per_thread)]
+        connection_created.connect(on_connect)
+        try:
+            for t in threads:
+                t.start()
+            start.wait()
+            t0 = time.perf_counter()
+            for t in threads:
+                t.join()
+            wall = time.perf_counter() - t0
+        finally:
+            connection_created.disconnect(on_connect)
+        return {'rows': results, 'wall': wall, 'connects': connects[0], 'db_pool': db_pool.stats()}
+
+    def _report(self, results, opts):
+        rows = results['rows']
+        if not rows:
+            raise CommandError('Хариу ирсэнгүй')
+        lat = sorted(r[0] for r in rows)
+
+        def pct(p):
+            return lat[min(len(lat) - 1, int(len(lat) * p))]
+
+        self.stdout.write(f"requests:       {len(rows)} (concurrency {opts['concurrency']})")
+        self.stdout.write(f"throughput:     {len(rows) / results['wall']:.1f} req/s")
+        self.stdout.write(f"latency ms:     p50 {pct(0.50):.1f} / p95 {pct(0.95):.1f} / p99 {pct(0.99):.1f} "
+                          f"(mean {statistics.mean(lat):.1f})")
+        self.stdout.write(f"queries/req:    {statistics.mean(r[1] for r in rows):.2f} (max {max(r[1] for r in rows)})")
+        for outcome, n in Counter(r[2] for r in rows).most_common():
+            self.stdout.write(f"  {n:>6}  {outcome}")
+        self.stdout.write(f"session cache:  {session_cache.stats()}")
+        # Django-ийн connect() тоо; pooled үед бодит шинэ холболт нь db_pool-ийн created
+        self.stdout.write(f"db connects:    {results['connects']}")
+        for alias, pool in results['db_pool'].items():
+            self.stdout.write(f"db pool [{alias}]: created {pool['created']}, peak checked out "
+                              f"{pool['peak_checked_out']}/{pool['size']}, waits {pool['waits']} "
+                              f"(avg {pool['avg_wait_ms']} ms, max {pool['max_wait_ms']:.1f} ms), "
+                              f"timeouts {pool['timeouts']}")
@@ -0,0 +1,53 @@
+# app_core/management/commands/bench_submit_attendance.py
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from app_core.services import session_cache, session_roster
+from app_core.views.attendance import submit_attendance
+
+
+class Command(BaseCommand):
+    help = 'QR scan submit_attendance: queries per scan болон хугацааг хэмжинэ (бичилтийг rollback хийнэ)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--token', required=True, help='class_session.token')
+        parser.add_argument('--student-code', required=True, help='student.student_code')
+        parser.add_argument('--device-id', default='')
+        parser.add_argument('--lat', default='')
+        parser.add_argument('--lon', default='')
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **opts):
+        if opts['iterations'] < 1:
+            raise CommandError('--iterations >= 1 байх ёстой')
+
+        factory = RequestFactory()
+        data = {'student_code': opts['student_code'], 'device_id': opts['device_id']}
+        if opts['lat'] and opts['lon']:
+            data.update(lat=opts['lat'], lon=opts['lon'])
+
+        timings, query_counts, last = [], [], None
+        for _ in range(opts['iterations']):
+            request = factory.post(f"/attendance/{opts['token']}/submit/", data)
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as ctx:
+                    t0 = time.perf_counter()
+                    last = submit_attendance(request, opts['token'])
+                    timings.append((time.perf_counter() - t0) * 1000)
+                query_counts.append(len(ctx.captured_queries))
+                transaction.set_rollback(True)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f'response:        {last.status_code} {last.content.decode()[:200]}')
+        self.stdout.write(f'iterations:      {len(timings)}')
+        self.stdout.write(f'queries/scan:    {statistics.mean(query_counts):.1f} (max {max(query_counts)})')
+        self.stdout.write(f'mean / p95 (ms): {statistics.mean(timings):.2f} / {p95:.2f}')
+        self.stdout.write(f'session cache:   {session_cache.stats()}')
+        self.stdout.write(f'session roster:  {session_roster.stats()}')
+        self.stdout.write(self.style.SUCCESS('Done'))
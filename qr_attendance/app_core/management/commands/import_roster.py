@@ -0,0 +1,55 @@
+# app_core/management/commands/import_roster.py
+from django.core.management.base import BaseCommand, CommandError
+
+from app_core.services import roster_import
+
+
+class Command(BaseCommand):
+    help = ('Оюутны жагсаалтыг (CSV/XLSX) бөөнөөр оруулна: шинэ оюутан үүсгэж, бүлэгт хуваарилна. '
+            'Багана: student_code, full_name, class_group_id эсвэл class_group (+ year).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV эсвэл XLSX файл')
+        parser.add_argument('--year', help='class_group нэрээр хайх үеийн он (файлд year багана байхгүй бол)')
+        parser.add_argument('--school-id', help='Зөвхөн энэ сургуулийн бүлгүүдээс хайна')
+        parser.add_argument('--update-names', action='store_true', help='Байгаа оюутны нэрийг файлынхаар солино')
+        parser.add_argument('--dry-run', action='store_true', help='Шалгаад rollback хийнэ')
+        parser.add_argument('--batch', type=int, default=roster_import.BATCH_ROWS, help='COPY batch-ийн мөр')
+        parser.add_argument('--rejects', help='Татгалзсан мөрүүдийг энэ CSV руу бичнэ')
+
+    def handle(self, *args, **opts):
+        def progress(result):
+            rate = result.rows_read / result.read_seconds if result.read_seconds else 0
+            self.stdout.write(f'  {result.rows_read} мөр уншив, {result.accepted} staged, '
+                              f'{len(result.rejects)} татгалзав ({rate:.0f} мөр/с)')
+
+        try:
+            with open(opts['path'], 'rb') as fileobj:
+                result = roster_import.import_roster(
+                    fileobj, opts['path'],
+                    default_year=opts['year'],
+                    school_id=opts['school_id'],
+                    update_names=opts['update_names'],
+                    dry_run=opts['dry_run'],
+                    batch_rows=opts['batch'],
+                    progress=progress,
+                )
+        except (OSError, roster_import.RosterError) as exc:
+            raise CommandError(str(exc))
+
+        for line, code, reason in result.rejects[:20]:
+            self.stdout.write(self.style.WARNING(f'  мөр {line} {code}: {reason}'))
+        if len(result.rejects) > 20:
+            self.stdout.write(self.style.WARNING(f'  ... болон {len(result.rejects) - 20} мөр'))
+        if opts['rejects'] and result.rejects:
+            with open(opts['rejects'], 'w', encoding='utf-8', newline='') as out:
+                roster_import.write_rejects(result, out)
+            self.stdout.write(f"Татгалзсан мөрүүд: {opts['rejects']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[dry-run] ' if result.dry_run else ''}"
+            f'{result.rows_read} мөр, {result.accepted} зөв, {len(result.rejects)} татгалзав; '
+            f'{result.students_created} оюутан үүсэв, {result.names_updated} нэр шинэчлэв, '
+            f'{result.assigned} бүлэгт хуваарилав; '
+            f'унших {result.read_seconds:.2f}s + merge {result.merge_seconds:.2f}s '
+            f'= {result.rows_per_sec:.0f} мөр/с'))
@@ -0,0 +1,36 @@
+# app_core/management/commands/import_timetable.py
+from django.core.management.base import BaseCommand, CommandError
+
+from app_core.services import roster_import, schedule_builder
+
+
+class Command(BaseCommand):
+    help = ('Семестрийн хичээлийн хуваарийг (CSV/XLSX) бөөнөөр оруулна: pattern, бүлэг, '
+            'бүлгийн оюутнуудын элсэлтийг нэг statement-ээр үүсгэнэ. '
+            'Багана: course, teacher, day_of_week, timeslot, class_groups (+ lesson_type, class_room, frequency).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('semester_id', type=int)
+        parser.add_argument('path', help='CSV эсвэл XLSX файл')
+        parser.add_argument('--dry-run', action='store_true', help='Шалгаад rollback хийнэ')
+
+    def handle(self, *args, **opts):
+        try:
+            with open(opts['path'], 'rb') as fileobj:
+                result = schedule_builder.import_timetable(
+                    fileobj, opts['path'], opts['semester_id'], dry_run=opts['dry_run'],
+                )
+        except (OSError, roster_import.RosterError) as exc:
+            raise CommandError(str(exc))
+
+        for line, reason in result.rejects[:20]:
+            self.stdout.write(self.style.WARNING(f'  мөр {line}: {reason}'))
+        if len(result.rejects) > 20:
+            self.stdout.write(self.style.WARNING(f'  ... болон {len(result.rejects) - 20} мөр'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[dry-run] ' if result.dry_run else ''}"
+            f'{result.rows_read} мөр, {len(result.rejects)} татгалзав; '
+            f'{result.created} хуваарь үүсэв, {result.skipped_existing} өмнө нь байсан; '
+            f'{result.groups_linked} бүлэг, {result.enrollments} элсэлт; '
+            f'унших {result.read_seconds:.2f}s + бичих {result.write_seconds:.2f}s'))
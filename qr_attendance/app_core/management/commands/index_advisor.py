@@ -0,0 +1,94 @@
+# app_core/management/commands/index_advisor.py
+import shlex
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import get_runner
+
+from app_core.services import index_advisor
+
+
+class Command(BaseCommand):
+    help = ('app_core-ийн raw SQL-ийг workload (test suite эсвэл --workload команд) дээр барьж авч '
+            'statement бүрд EXPLAIN хийнэ, app_core/sql/index_pack.sql-ийн index-үүдийн '
+            'өмнөх/дараах plan cost-ийг тайлагнана. Анхдагчаар what-if (rollback); '
+            '--apply нь CREATE INDEX CONCURRENTLY-г жинхэнээр ажиллуулна.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_labels', nargs='*', default=['app_core'],
+                            help='Барих test-ийн label (анхдагч: app_core)')
+        parser.add_argument('--workload', action='append', default=[],
+                            help='Test-ийн оронд/нэмэлтээр ажиллуулах management команд, '
+                                 'жишээ нь "bench_scan_load --disposable --requests 200"')
+        parser.add_argument('--no-tests', action='store_true', help='Test suite ажиллуулахгүй')
+        parser.add_argument('--keepdb', action='store_true', help='Test DB-г хадгална')
+        parser.add_argument('--apply', action='store_true', help='Pack-ийг CONCURRENTLY-оор үүсгэнэ')
+        parser.add_argument('--limit', type=int, default=30, help='Хэвлэх statement-ийн тоо')
+
+    def handle(self, *args, **opts):
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN (FORMAT JSON) болон pg_index Postgres шаардана')
+
+        capture = index_advisor.StatementCapture()
+        with connection.execute_wrapper(capture):
+            if not opts['no_tests']:
+                self._run_tests(opts)
+            for workload in opts['workload']:
+                name, *argv = shlex.split(workload)
+                self.stdout.write(f'workload: {workload}')
+                call_command(name, *argv, stdout=self.stdout._out)
+
+        statements = capture.statements
+        if not statements:
+            raise CommandError('app_core-оос SQL барьж авсангүй - test эсвэл --workload заана уу')
+        self.stdout.write(f'{len(statements)} ялгаатай statement, '
+                          f'{sum(s["calls"] for s in statements.values())} дуудлага')
+
+        pack = index_advisor.load_pack()
+        todo, covered, blocked = index_advisor.plan_pack(pack)
+        for entry in covered:
+            self.stdout.write(f"  = {entry['name']}: ижил index байна, алгасна")
+        for entry in blocked:
+            self.stdout.write(self.style.WARNING(
+                f"  ! {entry['name']}: {entry['table']}({', '.join(entry['columns'])}) давхардалтай, "
+                f"UNIQUE үүсэхгүй - эхлээд давхардлыг цэвэрлэнэ үү"))
+        for entry in todo:
+            self.stdout.write(f"  + {entry['name']}")
+
+        before = index_advisor.measure(statements)
+        if opts['apply']:
+            for name, error in index_advisor.apply(todo):
+                self.stdout.write(self.style.ERROR(f'  x {name}: {error}'))
+            after = index_advisor.measure(statements)
+        else:
+            after = index_advisor.what_if(statements, todo)
+
+        rows = index_advisor.compare(statements, before, after, {e['name'] for e in pack})
+        self._report(rows, opts['limit'], len(statements))
+
+    def _run_tests(self, opts):
+        runner = get_runner(settings)(verbosity=0, interactive=False, keepdb=opts['keepdb'])
+        failures = runner.run_tests(opts['test_labels'])
+        if failures:
+            self.stdout.write(self.style.WARNING(f'{failures} test унасан - барьсан SQL-ийг ашиглана'))
+
+    def _report(self, rows, limit, captured):
+        total_before = sum(r['before'] * r['calls'] for r in rows)
+        total_after = sum(r['after'] * r['calls'] for r in rows)
+        self.stdout.write('')
+        self.stdout.write(f'{"before":>10} {"after":>10} {"calls":>6}  origin / statement')
+        for r in rows[:limit]:
+            self.stdout.write(f"{r['before']:>10.1f} {r['after']:>10.1f} {r['calls']:>6}  {r['origin']}")
+            self.stdout.write(f"{'':>29}{r['sql'][:140]}")
+            if r['pack_indexes']:
+                self.stdout.write(f"{'':>29}index: {', '.join(r['pack_indexes'])}")
+            for table, filt in r['seq_scans']:
+                self.stdout.write(f"{'':>29}Seq Scan {table} {filt}".rstrip())
+
+        if len(rows) < captured:
+            self.stdout.write(f'{captured - len(rows)} statement EXPLAIN хийгдсэнгүй (test DB-ийн мөр, temp table г.м.)')
+        change = (total_after - total_before) / total_before * 100 if total_before else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Нийт cost (дуудлагаар жигнэсэн): {total_before:.0f} -> {total_after:.0f} ({change:+.1f}%)'))
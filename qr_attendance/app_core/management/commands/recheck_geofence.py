@@ -0,0 +1,60 @@
+# app_core/management/commands/recheck_geofence.py
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_core.services import geofence_audit
+
+
+class Command(BaseCommand):
+    help = ('Түүхэн ирцийг одоогийн location (радиус/координат)-оор дахин шалгана. '
+            'Server-side cursor + vectorized batch; --write-back нь '
+            'app_core/sql/attendance_geofence_columns.sql баганууд шаардана.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', type=int, help='class_session.id')
+        parser.add_argument('--course', type=int, help='course.id')
+        parser.add_argument('--semester', type=int, help='semester.id')
+        parser.add_argument('--location', type=int, help='location.id (засварласан байршил)')
+        parser.add_argument('--all', action='store_true', help='Бүх ирцийг шалгана')
+        parser.add_argument('--write-back', action='store_true', help='attendance.geofence_* баганад бичнэ')
+        parser.add_argument('--report', help='CSV тайлангийн зам')
+        parser.add_argument('--outside-only', action='store_true', help='Тайланд зөвхөн гадуур мөрүүд')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **opts):
+        scope = {k: opts[k] for k in ('session', 'course', 'semester', 'location')}
+        if not any(scope.values()) and not opts['all']:
+            raise CommandError('--session/--course/--semester/--location эсвэл --all заана уу')
+
+        report = writer = None
+        if opts['report']:
+            report = open(opts['report'], 'w', newline='', encoding='utf-8-sig')
+            writer = csv.writer(report)
+            writer.writerow(['attendance_id', 'session_id', 'student_id', 'distance_m', 'verdict'])
+
+        def on_chunk(results):
+            if writer:
+                for r in results:
+                    if opts['outside_only'] and r[4] != geofence_audit.OUTSIDE:
+                        continue
+                    writer.writerow([r[0], r[1], r[2], '' if r[3] is None else round(r[3], 1), r[4]])
+            self.stdout.write(f'  +{len(results)} мөр')
+
+        try:
+            stats = geofence_audit.recheck(
+                session_id=scope['session'], course_id=scope['course'],
+                semester_id=scope['semester'], location_id=scope['location'],
+                write_back=opts['write_back'], on_chunk=on_chunk,
+                chunk_size=opts['chunk_size'],
+            )
+        finally:
+            if report:
+                report.close()
+
+        self.stdout.write(
+            f"rows={stats['rows']} inside={stats['inside']} outside={stats['outside']} "
+            f"no_gps={stats['no_gps']} no_location={stats['no_location']} "
+            f"time={stats['seconds']}s throughput={stats['rows_per_sec']} rows/s"
+        )
+        self.stdout.write(self.style.SUCCESS('Done'))
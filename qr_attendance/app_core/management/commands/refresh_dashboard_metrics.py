@@ -0,0 +1,45 @@
+# app_core/management/commands/refresh_dashboard_metrics.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app_core.services import dashboard_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Админ dashboard-ийн хугацаат статистикийг (өнөөдрийн сесс, сүүлийн 1 цагийн scan, '
+            'сургуулийн ирц) dashboard_metrics мөрөнд дахин тооцно. Cron-оос эсвэл --every-тэй ажиллуулна.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true',
+                            help='Trigger-ийн тоолуурыг (хэрэглэгч, багш, хичээл, байршил) хүснэгтээс дахин тоолно')
+        parser.add_argument('--every', type=float, default=0,
+                            help='Хэдэн секунд тутам давтах (0 = нэг удаа)')
+
+    def handle(self, *args, **opts):
+        if opts['recount']:
+            dashboard_metrics.recount()
+            self.stdout.write('Тоолуурыг дахин тооллоо')
+
+        while True:
+            close_old_connections()
+            try:
+                dashboard_metrics.refresh()
+                metrics = dashboard_metrics.snapshot()
+                self.stdout.write(
+                    f"users={metrics['total_users']} teachers={metrics['total_teachers']} "
+                    f"sessions_today={metrics['sessions_today']} scans_last_hour={metrics['scans_last_hour']} "
+                    f"schools={len(metrics['school_rates'])}"
+                )
+            except Exception:
+                if not opts['every']:
+                    raise
+                logger.exception('dashboard metrics refresh failed')
+
+            if not opts['every']:
+                break
+            time.sleep(opts['every'])
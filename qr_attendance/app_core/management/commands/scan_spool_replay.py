@@ -0,0 +1,44 @@
+# app_core/management/commands/scan_spool_replay.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_core.services import scan_spool
+
+
+class Command(BaseCommand):
+    help = ('Scan spool-ийн оруулсан мөрүүдийг дахин pending болгож (эсвэл --now шууд) '
+            'attendance руу дахин upsert хийнэ. Upsert тул давтахад аюулгүй.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-id', type=int)
+        parser.add_argument('--to-id', type=int)
+        parser.add_argument('--since-minutes', type=int, help='Сүүлийн N минутад spool-д орсон мөрүүд')
+        parser.add_argument('--failed', action='store_true',
+                            help='SCAN_SPOOL_MAX_ATTEMPTS хэтэрч failed болсон мөрүүдийг дахин pending болгоно')
+        parser.add_argument('--now', action='store_true', help='Worker хүлээхгүй, энд шууд оруулна')
+        parser.add_argument('--stats', action='store_true', help='Зөвхөн spool lag харуулна')
+
+    def handle(self, *args, **opts):
+        if opts['stats']:
+            self.stdout.write(str(scan_spool.lag()))
+            return
+
+        if (opts['from_id'] is None and opts['to_id'] is None and opts['since_minutes'] is None
+                and not opts['failed']):
+            raise CommandError('--from-id/--to-id, --since-minutes эсвэл --failed заана уу')
+
+        since = time.time() - opts['since_minutes'] * 60 if opts['since_minutes'] is not None else None
+        reset = scan_spool.replay(opts['from_id'], opts['to_id'], since, failed=opts['failed'])
+        self.stdout.write(f'{reset} мөр дахин pending боллоо')
+
+        if opts['now']:
+            total = 0
+            while True:
+                n = scan_spool.drain()
+                if not n:
+                    break
+                total += n
+            self.stdout.write(f'{total} мөр оруулав')
+
+        self.stdout.write(self.style.SUCCESS(str(scan_spool.lag())))
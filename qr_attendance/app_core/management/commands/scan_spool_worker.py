@@ -0,0 +1,54 @@
+# app_core/management/commands/scan_spool_worker.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app_core.services import scan_spool
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Scan spool-ийг (SCAN_INGEST_MODE=spool) batch upsert-ээр attendance руу оруулна'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=None, help='Нэг batch-ийн мөр (default SCAN_SPOOL_BATCH)')
+        parser.add_argument('--interval', type=float, default=0.5, help='Spool хоосон үед хүлээх секунд')
+        parser.add_argument('--once', action='store_true', help='Spool-ийг хоосолтол ажиллаад гарна')
+        parser.add_argument('--purge-after', type=int, default=7 * 24 * 3600,
+                            help='Оруулсан мөрүүдийг хэдэн секундын дараа устгах (0 = устгахгүй)')
+
+    def handle(self, *args, **opts):
+        drained_total, t0, last_report = 0, time.perf_counter(), time.monotonic()
+
+        while True:
+            close_old_connections()
+            try:
+                n = scan_spool.drain(opts['batch'])
+            except Exception:
+                # Postgres удаан/унасан: мөрүүд spool-д үлдэнэ, дараа дахин оролдоно
+                logger.exception("scan spool drain failed")
+                n = 0
+                time.sleep(max(opts['interval'], 2))
+
+            drained_total += n
+
+            if time.monotonic() - last_report >= 10 or (opts['once'] and not n):
+                lag = scan_spool.lag()
+                rate = drained_total / max(time.perf_counter() - t0, 1e-9)
+                self.stdout.write(
+                    f"drained={drained_total} rate={rate:.0f}/s pending={lag['pending']} "
+                    f"lag={lag['oldest_pending_age_s']}s failing={lag['failing']} dead={lag['dead']}"
+                )
+                if opts['purge_after']:
+                    scan_spool.purge(opts['purge_after'])
+                last_report = time.monotonic()
+
+            if not n:
+                if opts['once']:
+                    break
+                time.sleep(opts['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {drained_total} scan оруулав'))
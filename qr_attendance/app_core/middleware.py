@@ -0,0 +1,42 @@
+# app_core/middleware.py
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from app_core.services import repository, sql_trace
+
+
+class RequestScopeMiddleware:
+    """One repository memo scope per request (services.repository)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = repository.begin_scope()
+        try:
+            return self.get_response(request)
+        finally:
+            repository.end_scope(token)
+
+
+class SqlTraceMiddleware:
+    """Query count / SQL time per request (services.sql_trace): Server-Timing
+    header, app_core.sql log, SQL_QUERY_BUDGETS check.
+
+    Queries run while a StreamingHttpResponse is consumed are not counted."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'SQL_TRACE', False):
+            return self.get_response(request)
+
+        trace = sql_trace.Trace()
+        t0 = time.perf_counter()
+        with connection.execute_wrapper(trace):
+            response = self.get_response(request)
+        sql_trace.report(trace, request, response, time.perf_counter() - t0)
+        return response
@@ -0,0 +1,119 @@
+# app_core/services/attendance_matrix.py
+# Student x session attendance matrix for semester/course exports.
+#
+# The caller loads every (student_id, session_id, status) triple with ONE
+# query; the matrix pivots them in memory into a dense array('h') (one short per
+# cell, 0 = no record) and writes the workbook with openpyxl write-only mode,
+# so neither query count nor workbook memory grows per cell.
+#
+# Pure Python + openpyxl, no Django imports: irts imports this module too (see
+# QR_ATTENDANCE_DIR in irts/settings.py).
+from array import array
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+MISSING = 0
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class AttendanceMatrix:
+    """
+    students: [(student_id, code, name), ...] in output order
+    sessions: [(session_id, label), ...] in output order
+    Status codes are attendance_type ids (1..32767, smallint); `symbols` maps them to cell text and
+    `attended` lists the codes that count toward the "Ирсэн" column.
+    """
+
+    def __init__(self, students, sessions, symbols, attended=(1,), missing_symbol='-'):
+        self.students = list(students)
+        self.sessions = list(sessions)
+        self.symbols = dict(symbols)
+        self.attended = frozenset(attended)
+        self.missing_symbol = missing_symbol
+
+        self._row = {s[0]: i for i, s in enumerate(self.students)}
+        self._col = {s[0]: j for j, s in enumerate(self.sessions)}
+        self.width = len(self.sessions)
+        self.cells = array('h', [MISSING]) * (len(self.students) * self.width)
+
+    def fill(self, triples):
+        """Pivot (student_id, session_id, status) rows. Unknown ids are skipped."""
+        row, col, cells, width = self._row, self._col, self.cells, self.width
+        filled = 0
+        for student_id, session_id, status in triples:
+            i = row.get(student_id)
+            j = col.get(session_id)
+            if i is None or j is None or not status:
+                continue
+            cells[i * width + j] = status
+            filled += 1
+        return filled
+
+    def status(self, student_id, session_id):
+        return self.cells[self._row[student_id] * self.width + self._col[session_id]]
+
+    def iter_rows(self):
+        """Yield (student, [symbol per session], total, attended_count, percentage)."""
+        symbols, attended, width = self.symbols, self.attended, self.width
+        missing = self.missing_symbol
+        for i, student in enumerate(self.students):
+            line = self.cells[i * width:(i + 1) * width]
+            attended_count = sum(1 for c in line if c in attended)
+            percentage = (attended_count / width * 100) if width else 0
+            yield (
+                student,
+                [symbols.get(c, missing) if c else missing for c in line],
+                width,
+                attended_count,
+                percentage,
+            )
+
+    def counts(self):
+        """Cells per status code (0 = no record)."""
+        out = {}
+        for c in self.cells:
+            out[c] = out.get(c, 0) + 1
+        return out
+
+
+def write_xlsx(matrix, out, title, sheet_title="Ирцийн нэгтгэл"):
+    """
+    Write the matrix to `out` (file object / HttpResponse) as a write-only
+    workbook: rows are serialised as they are appended, never kept as cells.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+
+    ws.column_dimensions['A'].width = 14
+    ws.column_dimensions['B'].width = 28
+    for j in range(matrix.width):
+        ws.column_dimensions[get_column_letter(j + 3)].width = 7
+
+    def cell(value, **style):
+        c = WriteOnlyCell(ws, value=value)
+        for k, v in style.items():
+            setattr(c, k, v)
+        return c
+
+    bold = Font(bold=True)
+    header_fill = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid")
+    center = Alignment(horizontal="center")
+
+    ws.append([cell(title, font=Font(bold=True, size=14))])
+    ws.append([])
+    ws.append(
+        [cell("Оюутны код", font=bold, fill=header_fill),
+         cell("Оюутны нэр", font=bold, fill=header_fill)]
+        + [cell(label, font=bold, fill=header_fill, alignment=center) for _, label in matrix.sessions]
+        + [cell(h, font=bold, fill=header_fill) for h in ("Нийт", "Ирсэн", "Хувь")]
+    )
+
+    for student, symbols, total, attended_count, percentage in matrix.iter_rows():
+        ws.append([student[1], student[2]] + symbols + [total, attended_count, f"{percentage:.1f}%"])
+
+    wb.save(out)
+    return out
@@ -0,0 +1,163 @@
+# app_core/services/attendance_submit.py
+# QR scan submit engine: one read round-trip to resolve the student side of
+# a scan, one write round-trip to record it.
+import math
+
+from django.db import connection
+
+from app_core.services import ref_cache
+
+
+# Student and device are resolved in a single statement; the session/location
+# side comes from services.session_cache, enrollment from
+# services.session_roster and the present attendance_type from
+# services.ref_cache. The outer SELECT always returns exactly one row;
+# a missing student comes back as NULL.
+RESOLVE_SQL = """
+    WITH stu AS (
+        SELECT s.id, s.full_name
+        FROM student s
+        WHERE s.student_code = %(student_code)s
+        LIMIT 1
+    )
+    SELECT
+        stu.id, stu.full_name,
+        (SELECT dr.device_id FROM device_registry dr
+          WHERE dr.student_id = stu.id LIMIT 1) AS registered_device,
+        (SELECT dr.student_id FROM device_registry dr
+          WHERE dr.device_id = %(device_id)s LIMIT 1) AS device_owner_id
+    FROM (SELECT 1) AS one
+    LEFT JOIN stu ON TRUE
+"""
+
+# Optional first-device registration and the attendance upsert in one
+# statement. Relies on the attendance_unique (session_id, student_id)
+# constraint for ON CONFLICT.
+RECORD_SQL = """
+    WITH reg AS (
+        INSERT INTO device_registry (student_id, device_id, device_info, created_at)
+        SELECT %(student_id)s, %(device_id)s, %(device_info)s, %(now)s
+        WHERE %(register_device)s
+        ON CONFLICT (device_id) DO NOTHING
+    )
+    INSERT INTO attendance
+        (session_id, student_id, "timestamp", lat, lon, device_id, device_info, attendance_type_id)
+    VALUES
+        (%(session_id)s, %(student_id)s, %(now)s, %(lat)s, %(lon)s,
+         %(device_id)s, %(device_info)s, %(attendance_type_id)s)
+    ON CONFLICT (session_id, student_id) DO UPDATE
+    SET attendance_type_id = EXCLUDED.attendance_type_id,
+        "timestamp" = EXCLUDED."timestamp",
+        lat = EXCLUDED.lat,
+        lon = EXCLUDED.lon,
+        device_id = EXCLUDED.device_id,
+        device_info = EXCLUDED.device_info
+    RETURNING id
+"""
+
+
+def parse_coords(lat, lon):
+    """(lat, lon) as floats, or (None, None) when either is missing.
+
+    Raises ValueError for non-numeric, non-finite or out-of-range values, so a
+    bad GPS reading is rejected at submit time instead of failing the write
+    (or a whole spool batch) later.
+    """
+    if lat in (None, '') or lon in (None, ''):
+        return None, None
+    lat, lon = float(lat), float(lon)
+    if not (math.isfinite(lat) and math.isfinite(lon)) or abs(lat) > 90 or abs(lon) > 180:
+        raise ValueError(f'координат хүрээнээс гадуур: {lat}, {lon}')
+    return lat, lon
+
+
+def resolve_scan(student_code, device_id=''):
+    """Load the student/device side of a scan in one query. Returns a dict."""
+    with connection.cursor() as cursor:
+        cursor.execute(RESOLVE_SQL, {
+            'student_code': student_code,
+            'device_id': device_id or None,
+        })
+        r = cursor.fetchone()
+
+    return {
+        'student_id': r[0],
+        'student_name': r[1],
+        'registered_device': r[2],
+        'device_owner_id': r[3],
+        'present_type_id': ref_cache.attendance_type_id('present'),
+    }
+
+
+def record_scan(session_id, student_id, attendance_type_id, now,
+                lat=None, lon=None, device_id='', device_info='',
+                register_device=False):
+    """Upsert the attendance row (and first device) in one query. Returns attendance id."""
+    with connection.cursor() as cursor:
+        cursor.execute(RECORD_SQL, {
+            'session_id': session_id,
+            'student_id': student_id,
+            'attendance_type_id': attendance_type_id,
+            'now': now,
+            'lat': lat,
+            'lon': lon,
+            'device_id': device_id,
+            'device_info': device_info,
+            'register_device': bool(register_device and device_id),
+        })
+        return cursor.fetchone()[0]
+
+
+RECORD_BATCH_SQL = """
+    INSERT INTO attendance
+        (session_id, student_id, "timestamp", lat, lon, device_id, device_info, attendance_type_id)
+    VALUES {values}
+    ON CONFLICT (session_id, student_id) DO UPDATE
+    SET attendance_type_id = EXCLUDED.attendance_type_id,
+        "timestamp" = EXCLUDED."timestamp",
+        lat = EXCLUDED.lat,
+        lon = EXCLUDED.lon,
+        device_id = EXCLUDED.device_id,
+        device_info = EXCLUDED.device_info
+"""
+
+
+def record_scans(scans):
+    """
+    Batch form of record_scan (spool drain). `scans` are dicts with record_scan's
+    argument names. Returns the number of attendance rows upserted.
+    """
+    # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement:
+    # the latest scan per (session, student) wins, same as sequential upserts.
+    latest = {}
+    for s in scans:
+        latest[(s['session_id'], s['student_id'])] = s
+    if not latest:
+        return 0
+
+    devices = {}
+    for s in latest.values():
+        if s.get('register_device') and s.get('device_id'):
+            devices.setdefault(s['device_id'], s)
+
+    with connection.cursor() as cursor:
+        if devices:
+            params = []
+            for s in devices.values():
+                params += [s['student_id'], s['device_id'], s.get('device_info', ''), s['now']]
+            cursor.execute(
+                "INSERT INTO device_registry (student_id, device_id, device_info, created_at) VALUES "
+                + ",".join(["(%s, %s, %s, %s)"] * len(devices))
+                + " ON CONFLICT (device_id) DO NOTHING",
+                params,
+            )
+
+        params = []
+        for s in latest.values():
+            params += [s['session_id'], s['student_id'], s['now'], s.get('lat'), s.get('lon'),
+                       s.get('device_id', ''), s.get('device_info', ''), s['attendance_type_id']]
+        cursor.execute(
+            RECORD_BATCH_SQL.format(values=",".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(latest))),
+            params,
+        )
+        return cursor.rowcount
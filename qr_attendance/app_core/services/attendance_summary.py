@@ -0,0 +1,154 @@
+# app_core/services/attendance_summary.py
+# Reads and checks attendance_summary (app_core/sql/attendance_summary.sql).
+# The table is kept current by triggers on attendance; this module serves the
+# student pages from it and recomputes it from attendance for the
+# consistency check / rebuild command.
+from django.db import connection, transaction
+
+
+# Оюутны тухайн хичээлийн жилийн/улирлын хичээлүүд + summary мөр (PK lookup).
+# DISTINCT: нэг хичээл лекц/лаб гэх мэт хэд хэдэн pattern-тай байж болно.
+STUDENT_COURSES_SQL = """
+    SELECT
+        c.id,
+        c.name,
+        c.code,
+        COALESCE(sm.total_count, 0),
+        COALESCE(sm.present_count, 0),
+        COALESCE(sm.absent_count, 0),
+        COALESCE(sm.late_count, 0),
+        COALESCE(sm.excused_count, 0),
+        e.group_name,
+        e.group_number
+    FROM (
+        SELECT DISTINCT csp.course_id, csp.semester_id, cg.name AS group_name, cg.group_number
+        FROM student_class_group scg
+        JOIN class_group cg ON cg.id = scg.class_group_id
+        JOIN class_group_schedule cgs ON cgs.class_group_id = cg.id
+        JOIN course_schedule_pattern csp ON csp.id = cgs.course_schedule_pattern_id
+        JOIN semester sem ON sem.id = csp.semester_id
+        WHERE scg.student_id = %s
+          AND sem.school_year = %s
+          AND sem.term = %s
+    ) e
+    JOIN course c ON c.id = e.course_id
+    LEFT JOIN attendance_summary sm
+           ON sm.student_id = %s AND sm.course_id = e.course_id AND sm.semester_id = e.semester_id
+    ORDER BY c.name
+"""
+
+# attendance-аас дахин тооцсон утга (trigger-тэй ижил semester, төрлийн тодорхойлолт)
+RECOMPUTE_SQL = """
+    SELECT a.student_id, cs.course_id, sem.id AS semester_id,
+           COUNT(*) FILTER (WHERE t.kind = 'present') AS present_count,
+           COUNT(*) FILTER (WHERE t.kind = 'absent') AS absent_count,
+           COUNT(*) FILTER (WHERE t.kind = 'late') AS late_count,
+           COUNT(*) FILTER (WHERE t.kind = 'excused') AS excused_count,
+           COUNT(*) AS total_count
+    FROM attendance a
+    JOIN class_session cs ON cs.id = a.session_id
+    LEFT JOIN (SELECT id, attendance_type_kind(name, value) AS kind FROM attendance_type) t
+           ON t.id = a.attendance_type_id
+    CROSS JOIN LATERAL (SELECT COALESCE(cs.semester_id, attendance_course_semester(cs.course_id, cs.date)) AS id) sem
+    WHERE sem.id IS NOT NULL {where}
+    GROUP BY a.student_id, cs.course_id, sem.id
+"""
+
+COUNT_COLUMNS = ('present_count', 'absent_count', 'late_count', 'excused_count', 'total_count')
+
+
+def student_courses(student_id, school_year, term):
+    with connection.cursor() as cursor:
+        cursor.execute(STUDENT_COURSES_SQL, [student_id, school_year, term, student_id])
+        rows = cursor.fetchall()
+
+    courses = []
+    for row in rows:
+        # total_count = бүртгэгдсэн ирцийн мөр (хичээллэсэн хуваарийн тоо биш)
+        recorded, present, absent, late, excused = row[3], row[4], row[5], row[6], row[7]
+        attended = present + late + excused
+        courses.append({
+            'id': row[0],
+            'name': row[1],
+            'code': row[2],
+            'recorded_count': recorded,
+            'present_count': present,
+            'absent_count': absent,
+            'late_count': late,
+            'excused_count': excused,
+            'attendance_percentage': round((attended / recorded * 100) if recorded > 0 else 0, 1),
+            'group_name': row[8],
+            'group_number': row[9],
+        })
+    return courses
+
+
+def _scope(student_id=None, course_id=None, alias_student='a.student_id', alias_course='cs.course_id'):
+    where, params = [], []
+    if student_id:
+        where.append(f"{alias_student} = %s")
+        params.append(student_id)
+    if course_id:
+        where.append(f"{alias_course} = %s")
+        params.append(course_id)
+    return "".join(f" AND {w}" for w in where), params
+
+
+def check(student_id=None, course_id=None, limit=None):
+    """
+    Compare attendance_summary with a recompute from attendance.
+    Returns a list of mismatches: {key, summary: {...}|None, actual: {...}|None}.
+    """
+    where, params = _scope(student_id, course_id)
+    sm_where, sm_params = _scope(student_id, course_id, 'sm.student_id', 'sm.course_id')
+    cols = ", ".join(f"sm.{c}" for c in COUNT_COLUMNS)
+    rcols = ", ".join(f"r.{c}" for c in COUNT_COLUMNS)
+    differs = " OR ".join(f"sm.{c} IS DISTINCT FROM r.{c}" for c in COUNT_COLUMNS)
+
+    sql = f"""
+        WITH r AS ({RECOMPUTE_SQL.format(where=where)}),
+             sm AS (SELECT * FROM attendance_summary sm WHERE TRUE {sm_where})
+        SELECT COALESCE(sm.student_id, r.student_id),
+               COALESCE(sm.course_id, r.course_id),
+               COALESCE(sm.semester_id, r.semester_id),
+               sm.student_id IS NOT NULL, {cols},
+               r.student_id IS NOT NULL, {rcols}
+        FROM sm
+        FULL OUTER JOIN r
+          ON r.student_id = sm.student_id AND r.course_id = sm.course_id AND r.semester_id = sm.semester_id
+        WHERE ({differs})
+          AND NOT (r.student_id IS NULL AND sm.total_count = 0 AND sm.present_count = 0
+                   AND sm.absent_count = 0 AND sm.late_count = 0 AND sm.excused_count = 0)
+        ORDER BY 1, 2, 3
+        {"LIMIT %s" if limit else ""}
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + sm_params + ([limit] if limit else []))
+        rows = cursor.fetchall()
+
+    n = len(COUNT_COLUMNS)
+    out = []
+    for row in rows:
+        has_sm, has_r = row[3], row[4 + n]
+        out.append({
+            'key': (row[0], row[1], row[2]),
+            'summary': dict(zip(COUNT_COLUMNS, row[4:4 + n])) if has_sm else None,
+            'actual': dict(zip(COUNT_COLUMNS, row[5 + n:5 + 2 * n])) if has_r else None,
+        })
+    return out
+
+
+def rebuild(student_id=None, course_id=None):
+    """Replace summary rows in scope with a recompute from attendance. Returns rows written."""
+    where, params = _scope(student_id, course_id)
+    sm_where, sm_params = _scope(student_id, course_id, 'student_id', 'course_id')
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Rebuild хийх зуур trigger-ийн upsert хүлээнэ (дахин тооцоо давхар тоологдохгүй)
+        cursor.execute("LOCK TABLE attendance_summary IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute(f"DELETE FROM attendance_summary WHERE TRUE {sm_where}", sm_params)
+        cursor.execute(f"""
+            INSERT INTO attendance_summary
+                (student_id, course_id, semester_id, {", ".join(COUNT_COLUMNS)})
+            {RECOMPUTE_SQL.format(where=where)}
+        """, params)
+        return cursor.rowcount
@@ -0,0 +1,141 @@
+# app_core/services/bulk_enrollment.py
+# Enrolls a cohort (a class group's members or an explicit student set) into a
+# course or a schedule pattern group (class_group_schedule) with one statement:
+# the cohort, the existing enrollments, the INSERT ... ON CONFLICT DO NOTHING
+# and the per-student outcome are all CTEs of the same query, so a 300-student
+# group is one round trip instead of a SELECT + INSERT per student.
+#
+# Outcomes per student:
+#   enrolled - new row inserted
+#   already  - already enrolled in this course with this class group
+#              (pattern: in this class_group_schedule)
+#   conflict - enrolled in the same course through another class group
+#              (pattern: through another group of the same pattern), or the
+#              insert hit a unique constraint
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import connection
+
+
+ENROLLED, ALREADY, CONFLICT = 'enrolled', 'already', 'conflict'
+
+# from_group: class group-ийн гишүүд; эс бөгөөс student_ids
+COHORT_SQL = """
+    cohort AS (
+        SELECT DISTINCT x.student_id
+        FROM (
+            SELECT unnest(%(student_ids)s::bigint[]) AS student_id
+            UNION ALL
+            SELECT scg.student_id FROM student_class_group scg
+            WHERE %(from_group)s AND scg.class_group_id = %(class_group_id)s
+        ) x
+        JOIN student s ON s.id = x.student_id
+    )
+"""
+
+OUTCOME_SQL = f"""
+    SELECT s.id, s.student_code, s.full_name,
+           CASE WHEN ins.student_id IS NOT NULL THEN '{ENROLLED}'
+                WHEN ex.same THEN '{ALREADY}'
+                ELSE '{CONFLICT}' END
+    FROM existing ex
+    JOIN student s ON s.id = ex.student_id
+    LEFT JOIN ins ON ins.student_id = ex.student_id
+    ORDER BY s.student_code
+"""
+
+COURSE_SQL = f"""
+    WITH {COHORT_SQL},
+    existing AS (
+        SELECT c.student_id,
+               COUNT(e.id) > 0 AS enrolled,
+               COALESCE(bool_or(e.class_group_id IS NOT DISTINCT FROM %(class_group_id)s::bigint), FALSE) AS same
+        FROM cohort c
+        LEFT JOIN enrollment e ON e.student_id = c.student_id AND e.course_id = %(course_id)s
+        GROUP BY c.student_id
+    ),
+    ins AS (
+        INSERT INTO enrollment (student_id, course_id, class_group_id)
+        SELECT student_id, %(course_id)s::bigint, %(class_group_id)s::bigint FROM existing WHERE NOT enrolled
+        ON CONFLICT DO NOTHING
+        RETURNING student_id
+    )
+    {OUTCOME_SQL}
+"""
+
+PATTERN_SQL = f"""
+    WITH {COHORT_SQL},
+    siblings AS (
+        SELECT other.id
+        FROM class_group_schedule target
+        JOIN class_group_schedule other
+          ON other.course_schedule_pattern_id = target.course_schedule_pattern_id
+        WHERE target.id = %(class_group_schedule_id)s
+    ),
+    existing AS (
+        SELECT c.student_id,
+               COUNT(e.id) > 0 AS enrolled,
+               COALESCE(bool_or(e.class_group_schedule_id = %(class_group_schedule_id)s), FALSE) AS same
+        FROM cohort c
+        LEFT JOIN enrollment e
+          ON e.student_id = c.student_id AND e.class_group_schedule_id IN (SELECT id FROM siblings)
+        GROUP BY c.student_id
+    ),
+    ins AS (
+        INSERT INTO enrollment (student_id, class_group_schedule_id)
+        SELECT student_id, %(class_group_schedule_id)s::bigint FROM existing WHERE NOT enrolled
+        ON CONFLICT DO NOTHING
+        RETURNING student_id
+    )
+    {OUTCOME_SQL}
+"""
+
+
+@dataclass
+class EnrollResult:
+    outcomes: list = field(default_factory=list)   # [(student_id, student_code, full_name, outcome)]
+
+    @property
+    def counts(self):
+        counts = Counter(o[3] for o in self.outcomes)
+        return {k: counts.get(k, 0) for k in (ENROLLED, ALREADY, CONFLICT)}
+
+    def students(self, outcome):
+        return [o for o in self.outcomes if o[3] == outcome]
+
+    def message(self):
+        """Flash message in the style of the enrollment views."""
+        counts = self.counts
+        msg = f"Амжилттай: {counts[ENROLLED]} оюутан элслээ."
+        if counts[ALREADY]:
+            msg += f" (Давхардсан: {counts[ALREADY]})"
+        if counts[CONFLICT]:
+            codes = ', '.join(o[1] for o in self.students(CONFLICT)[:5])
+            msg += f" Өөр бүлгээр элссэн {counts[CONFLICT]}: {codes}"
+            if counts[CONFLICT] > 5:
+                msg += '...'
+        return msg
+
+
+def enroll(course_id=None, class_group_schedule_id=None, class_group_id=None, student_ids=None):
+    """
+    Enroll students into a course (course_id, rows tagged with class_group_id)
+    or into a pattern group (class_group_schedule_id).
+
+    The cohort is student_ids when given, otherwise the members of
+    class_group_id. Returns an EnrollResult with one outcome per student.
+    """
+    if (course_id is None) == (class_group_schedule_id is None):
+        raise ValueError('course_id эсвэл class_group_schedule_id-ийн аль нэг нь')
+    ids = [int(sid) for sid in student_ids or ()]
+    params = {
+        'student_ids': ids,
+        'from_group': student_ids is None,
+        'class_group_id': class_group_id,
+        'course_id': course_id,
+        'class_group_schedule_id': class_group_schedule_id,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(COURSE_SQL if course_id is not None else PATTERN_SQL, params)
+        return EnrollResult(outcomes=cursor.fetchall())
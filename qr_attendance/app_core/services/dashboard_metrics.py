@@ -0,0 +1,108 @@
+# app_core/services/dashboard_metrics.py
+# Reads the single dashboard_metrics row (app_core/sql/dashboard_metrics.sql)
+# for the admin dashboard and its auto-refresh JSON endpoint.
+# The counters are trigger-maintained; the time-window stats are recomputed
+# only by `manage.py refresh_dashboard_metrics` (cron or --every), so a
+# dashboard GET is a single-row SELECT and never writes.
+import json
+
+from django.db import connection
+from django.utils import timezone
+
+from app_core.services import ref_cache
+
+
+COLUMNS = ('total_users', 'total_teachers', 'total_courses', 'total_locations',
+           'sessions_today', 'scans_last_hour', 'school_rates',
+           'counts_updated_at', 'stats_refreshed_at')
+
+# Сургуулийн ирц: идэвхтэй семестрүүдийн attendance_summary (ирсэн + хоцорсон) / нийт
+REFRESH_SET_SQL = """
+    sessions_today = (SELECT COUNT(*) FROM class_session WHERE date = %(today)s),
+    scans_last_hour = (
+        SELECT COUNT(*) FROM attendance
+        WHERE "timestamp" >= now() - interval '1 hour' AND attendance_type_id = %(present)s
+    ),
+    school_rates = COALESCE((
+        SELECT jsonb_agg(r ORDER BY r.name)
+        FROM (
+            SELECT l.id AS location_id, l.name,
+                   SUM(sm.present_count + sm.late_count) AS present,
+                   SUM(sm.total_count) AS total,
+                   ROUND(100.0 * SUM(sm.present_count + sm.late_count) / NULLIF(SUM(sm.total_count), 0), 1) AS rate
+            FROM attendance_summary sm
+            JOIN semester sem ON sem.id = sm.semester_id AND sem.is_active
+            JOIN location l ON l.id = sem.school_id
+            GROUP BY l.id, l.name
+        ) r
+    ), '[]'::jsonb),
+    stats_refreshed_at = now()
+"""
+
+SNAPSHOT_SQL = f"SELECT {', '.join(COLUMNS)} FROM dashboard_metrics WHERE id = 1"
+
+REFRESH_SQL = f"UPDATE dashboard_metrics SET {REFRESH_SET_SQL} WHERE id = 1"
+
+RECOUNT_SQL = """
+    INSERT INTO dashboard_metrics (id, total_users, total_teachers, total_courses, total_locations)
+    SELECT 1,
+           (SELECT COUNT(*) FROM app_user),
+           (SELECT COUNT(*) FROM app_user
+             WHERE role_id = (SELECT id FROM ref_role WHERE name = 'teacher' LIMIT 1)),
+           (SELECT COUNT(*) FROM course),
+           (SELECT COUNT(*) FROM location)
+    ON CONFLICT (id) DO UPDATE SET
+        total_users = EXCLUDED.total_users,
+        total_teachers = EXCLUDED.total_teachers,
+        total_courses = EXCLUDED.total_courses,
+        total_locations = EXCLUDED.total_locations,
+        counts_updated_at = now()
+"""
+
+
+def _refresh_params():
+    # "Өнөөдөр" нь DB сервер биш TIME_ZONE-ийн огноо
+    return {'present': ref_cache.attendance_type_id('present'), 'today': timezone.localdate()}
+
+
+def snapshot():
+    """The metrics row as a dict (read-only; stats as of stats_refreshed_at)."""
+    with connection.cursor() as cursor:
+        cursor.execute(SNAPSHOT_SQL)
+        row = cursor.fetchone()
+    if row is None:
+        # dashboard_metrics.sql-ийн анхны мөр байхгүй: `refresh_dashboard_metrics --recount` үүсгэнэ
+        return {**dict.fromkeys(COLUMNS, 0), 'school_rates': [],
+                'counts_updated_at': None, 'stats_refreshed_at': None}
+    metrics = dict(zip(COLUMNS, row))
+    # Django-ийн psycopg2 backend jsonb-г задлахгүй str-ээр буцаадаг
+    if isinstance(metrics['school_rates'], str):
+        metrics['school_rates'] = json.loads(metrics['school_rates'])
+    return metrics
+
+
+def refresh():
+    """Recompute the time-window stats now (cron); creates the row if it is missing."""
+    with connection.cursor() as cursor:
+        cursor.execute(REFRESH_SQL, _refresh_params())
+        if cursor.rowcount:
+            return cursor.rowcount
+    recount()
+    with connection.cursor() as cursor:
+        cursor.execute(REFRESH_SQL, _refresh_params())
+        return cursor.rowcount
+
+
+def recount():
+    """Recount the trigger-maintained counters from the tables (drift / TRUNCATE)."""
+    with connection.cursor() as cursor:
+        cursor.execute(RECOUNT_SQL)
+
+
+def as_json(metrics):
+    """JSON-safe copy for the auto-refresh endpoint."""
+    data = dict(metrics)
+    for key in ('counts_updated_at', 'stats_refreshed_at'):
+        if data[key] is not None:
+            data[key] = data[key].isoformat()
+    return data
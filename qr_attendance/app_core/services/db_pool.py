@@ -0,0 +1,200 @@
+# app_core/services/db_pool.py
+# Per-process psycopg2 connection pool behind the app_core.db backend
+# (settings DB_POOL_SIZE > 0). In pooled mode Django still "closes" its
+# connection at the end of every request (CONN_MAX_AGE = 0), but the backend
+# hands the socket back here instead of closing it, so the next request - in
+# any thread of the worker - skips the TCP + auth + backend start-up of a fresh
+# Postgres connection.
+#
+# Checkout blocks up to DB_POOL_TIMEOUT when all DB_POOL_SIZE connections are
+# out. Idle connections are health-checked (SELECT 1) when they sat unused for
+# DB_POOL_CHECK_IDLE, closed after DB_POOL_MAX_IDLE and recycled after
+# DB_POOL_MAX_LIFETIME. stats() exposes wait time and checked-out counts.
+import logging
+import os
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+_pools = {}     # alias -> Pool
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became free within DB_POOL_TIMEOUT (Django re-raises it as OperationalError)."""
+
+
+class Pool:
+    def __init__(self, connect, size, timeout, check_idle, max_idle, max_lifetime):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition()
+        self._idle = []      # [(conn, returned_at)] хамгийн сүүлд буцаасан нь төгсгөлд
+        self._born = {}      # id(conn) -> created_at
+        self._out = 0
+        self._stats = {
+            'checkouts': 0, 'created': 0, 'closed': 0, 'health_failures': 0,
+            'waits': 0, 'wait_seconds': 0.0, 'max_wait_ms': 0.0, 'timeouts': 0, 'peak_checked_out': 0,
+        }
+
+    # ---- checkout / return ----
+
+    def getconn(self):
+        t0 = time.monotonic()
+        deadline = t0 + self.timeout
+        waited = False
+        with self._cond:
+            while not self._idle and self._out >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f'db pool: {self.size} холболт бүгд ашиглагдаж байна ({self.timeout}s)')
+                waited = True
+                self._cond.wait(remaining)
+            wait = time.monotonic() - t0
+            self._out += 1
+            self._stats['checkouts'] += 1
+            self._stats['peak_checked_out'] = max(self._stats['peak_checked_out'], self._out)
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_seconds'] += wait
+                self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait * 1000)
+            entry = self._idle.pop() if self._idle else None
+
+        # Сүлжээний ажил lock-оос гадуур
+        try:
+            conn = self._healthy(entry) if entry else None
+            return conn if conn is not None else self._new()
+        except BaseException:
+            with self._cond:
+                self._out -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn):
+        reuse = not conn.closed and not self._expired(conn)
+        if reuse and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+            reuse = conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+
+        now = time.monotonic()
+        with self._cond:
+            self._out -= 1
+            if reuse:
+                self._idle.append((conn, now))
+            # Удаан хүлээсэн (жагсаалтын эхэнд байгаа) холболтуудыг хаана
+            stale = []
+            while self._idle and now - self._idle[0][1] > self.max_idle:
+                stale.append(self._idle.pop(0)[0])
+            self._cond.notify()
+        if not reuse:
+            stale.append(conn)
+        for old in stale:
+            self._discard(old)
+
+    # ---- helpers ----
+
+    def _new(self):
+        conn = self._connect()
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._stats['created'] += 1
+        return conn
+
+    def _expired(self, conn):
+        born = self._born.get(id(conn))
+        return born is None or time.monotonic() - born > self.max_lifetime
+
+    def _healthy(self, entry):
+        """The idle connection, or None if it is closed, too old or fails SELECT 1."""
+        conn, returned_at = entry
+        if conn.closed or self._expired(conn):
+            self._discard(conn)
+            return None
+        if time.monotonic() - returned_at >= self.check_idle:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                conn.rollback()
+            except psycopg2.Error:
+                with self._cond:
+                    self._stats['health_failures'] += 1
+                self._discard(conn)
+                return None
+        return conn
+
+    def _discard(self, conn):
+        with self._cond:
+            self._born.pop(id(conn), None)
+            self._stats['closed'] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def close_idle(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            waits = self._stats['waits']
+            return {
+                **self._stats,
+                'size': self.size,
+                'checked_out': self._out,
+                'idle': len(self._idle),
+                'avg_wait_ms': round(self._stats['wait_seconds'] * 1000 / waits, 2) if waits else 0.0,
+            }
+
+
+def pool_for(alias, conn_params, connect):
+    """The process's pool for a DATABASES alias, created on first use."""
+    pool = _pools.get(alias)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pools_lock:
+        pool = _pools.get(alias)
+        # fork-ийн дараа эцэг процессын socket-уудыг хаалгүйгээр орхино
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[alias] = Pool(
+                lambda: connect(**conn_params),
+                size=getattr(settings, 'DB_POOL_SIZE', 10) or 10,
+                timeout=getattr(settings, 'DB_POOL_TIMEOUT', 10),
+                check_idle=getattr(settings, 'DB_POOL_CHECK_IDLE', 30),
+                max_idle=getattr(settings, 'DB_POOL_MAX_IDLE', 300),
+                max_lifetime=getattr(settings, 'DB_POOL_MAX_LIFETIME', 1800),
+            )
+        return pool
+
+
+def close_all():
+    """Close idle connections and forget the pools (bench mode switches, shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close_idle()
+
+
+def stats():
+    """{alias: pool counters} for this worker process; {} when pooling is off."""
+    return {alias: pool.stats() for alias, pool in list(_pools.items()) if pool.pid == os.getpid()}
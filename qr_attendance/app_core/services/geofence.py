@@ -0,0 +1,124 @@
+# app_core/services/geofence.py
+# Geofence checks for attendance scans.
+#
+# A Geofence precomputes everything about a location that does not depend on
+# the scan: centre in radians, cos(lat) and a lat/lon bounding box around the
+# radius. Points outside the bounding box are rejected before any trig runs;
+# the rest get one haversine using those constants. Batches go through NumPy.
+#
+# Pure Python + optional NumPy, no Django imports: the irts project imports
+# this module too (irts/settings.py puts qr_attendance on sys.path).
+from functools import lru_cache
+from math import asin, cos, radians, sin, sqrt
+
+try:
+    import numpy as np
+except ImportError:  # batch API falls back to a Python loop
+    np = None
+
+EARTH_RADIUS_M = 6371000.0
+# метр / градус (өргөргийн дагуу)
+M_PER_DEG = EARTH_RADIUS_M * 3.141592653589793 / 180.0
+
+
+class Geofence:
+    __slots__ = ('lat', 'lon', 'radius_m', 'lat_rad', 'lon_rad', 'cos_lat',
+                 'min_lat', 'max_lat', 'min_lon', 'max_lon')
+
+    def __init__(self, lat, lon, radius_m=100):
+        self.lat = float(lat)
+        self.lon = float(lon)
+        self.radius_m = float(radius_m or 100)
+        self.lat_rad = radians(self.lat)
+        self.lon_rad = radians(self.lon)
+        self.cos_lat = cos(self.lat_rad)
+
+        # Bounding box with a small margin so it never rejects a point the
+        # haversine would accept.
+        dlat = self.radius_m / M_PER_DEG * 1.01
+        dlon = dlat / max(self.cos_lat, 1e-6)
+        self.min_lat, self.max_lat = self.lat - dlat, self.lat + dlat
+        self.min_lon, self.max_lon = self.lon - dlon, self.lon + dlon
+
+    def in_bbox(self, lat, lon):
+        return self.min_lat <= lat <= self.max_lat and self.min_lon <= lon <= self.max_lon
+
+    def distance_m(self, lat, lon):
+        """Haversine distance from the centre in meters."""
+        lat_rad = radians(lat)
+        s_dlat = sin((lat_rad - self.lat_rad) / 2)
+        s_dlon = sin((radians(lon) - self.lon_rad) / 2)
+        a = s_dlat * s_dlat + self.cos_lat * cos(lat_rad) * s_dlon * s_dlon
+        return 2 * EARTH_RADIUS_M * asin(sqrt(min(a, 1.0)))
+
+    def contains(self, lat, lon):
+        """Inside the radius? Points outside the bounding box skip the trig."""
+        lat, lon = float(lat), float(lon)
+        return self.in_bbox(lat, lon) and self.distance_m(lat, lon) <= self.radius_m
+
+    def check(self, lat, lon):
+        """(inside, distance_m) for one point.
+
+        A point outside the bounding box is rejected without the haversine and
+        comes back as (False, None); otherwise the distance is returned for the
+        scan response.
+        """
+        lat, lon = float(lat), float(lon)
+        if not self.in_bbox(lat, lon):
+            return False, None
+        distance = self.distance_m(lat, lon)
+        return distance <= self.radius_m, distance
+
+    # ---- batch API ----
+
+    def distances(self, lats, lons):
+        """Distances in meters for arrays of points (NaN in -> NaN out)."""
+        if np is None:
+            return [self.distance_m(float(a), float(b)) for a, b in zip(lats, lons)]
+        lat_rad = np.radians(np.asarray(lats, dtype=np.float64))
+        lon_rad = np.radians(np.asarray(lons, dtype=np.float64))
+        s_dlat = np.sin((lat_rad - self.lat_rad) / 2)
+        s_dlon = np.sin((lon_rad - self.lon_rad) / 2)
+        a = s_dlat * s_dlat + self.cos_lat * np.cos(lat_rad) * s_dlon * s_dlon
+        return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def check_many(self, lats, lons, with_distance=True):
+        """
+        Check thousands of points at once. Returns (inside, distances).
+        With with_distance=False only bounding-box candidates get a haversine;
+        the others come back as +inf.
+        """
+        if np is None:
+            if with_distance:
+                dist = [self.distance_m(float(a), float(b)) for a, b in zip(lats, lons)]
+            else:
+                dist = [self.check(a, b)[1] for a, b in zip(lats, lons)]
+                dist = [float('inf') if d is None else d for d in dist]
+            return [d <= self.radius_m for d in dist], dist
+
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if with_distance:
+            dist = self.distances(lats, lons)
+        else:
+            candidates = ((lats >= self.min_lat) & (lats <= self.max_lat) &
+                          (lons >= self.min_lon) & (lons <= self.max_lon))
+            dist = np.full(lats.shape, np.inf)
+            dist[candidates] = self.distances(lats[candidates], lons[candidates])
+        return dist <= self.radius_m, dist
+
+
+@lru_cache(maxsize=1024)
+def _fence(lat, lon, radius_m):
+    return Geofence(lat, lon, radius_m)
+
+
+def get_fence(lat, lon, radius_m=100):
+    """Shared Geofence per location (its lat, lon, radius) - location rows rarely change.
+    Only pass location centres here, never scan coordinates."""
+    return _fence(float(lat), float(lon), float(radius_m or 100))
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Plain point-to-point distance in meters (no precomputation, not cached)."""
+    return Geofence(lat1, lon1).distance_m(float(lat2), float(lon2))
@@ -0,0 +1,130 @@
+# app_core/services/geofence_audit.py
+# Re-validate historical attendance against the *current* location rows
+# (after a radius_m or coordinate fix). Rows are read in chunks by keyset on
+# attendance.id (a.id > last id), each chunk's points are grouped by location
+# and checked in one vectorized Geofence.check_many call per location, and
+# results are written back (attendance.geofence_*) and/or handed to a report
+# callback.
+# Memory is bounded by chunk_size regardless of how many rows match, and each
+# chunk's write-back commits on its own: no transaction spans the whole run,
+# so live scans and teacher edits only ever wait for one chunk's UPDATE.
+import time
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app_core.services.geofence import get_fence
+
+
+CHUNK_SQL = """
+    SELECT a.id, a.session_id, a.student_id, a.lat, a.lon,
+           l.id, l.latitude, l.longitude, l.radius_m
+    FROM attendance a
+    JOIN class_session cs ON cs.id = a.session_id
+    LEFT JOIN location l ON l.id = cs.location_id
+    WHERE {where} AND a.id > %s
+    ORDER BY a.id
+    LIMIT %s
+"""
+
+WRITE_BACK_SQL = """
+    UPDATE attendance a
+    SET geofence_distance_m = v.distance_m::real,
+        geofence_ok = v.ok::boolean,
+        geofence_checked_at = %s
+    FROM (VALUES {values}) AS v(id, distance_m, ok)
+    WHERE a.id = v.id::bigint
+"""
+
+INSIDE, OUTSIDE, NO_GPS, NO_LOCATION = 'inside', 'outside', 'no_gps', 'no_location'
+
+
+def _scope(session_id=None, course_id=None, semester_id=None, location_id=None):
+    where, params = [], []
+    if session_id:
+        where.append("a.session_id = %s")
+        params.append(session_id)
+    if course_id:
+        where.append("cs.course_id = %s")
+        params.append(course_id)
+    if semester_id:
+        # semester_id нөхөгдөөгүй (backfill_session_semester) хуучин мөрүүдэд resolver
+        where.append("""(cs.semester_id = %s OR (cs.semester_id IS NULL
+                         AND attendance_course_semester(cs.course_id, cs.date) = %s))""")
+        params += [semester_id, semester_id]
+    if location_id:
+        where.append("cs.location_id = %s")
+        params.append(location_id)
+    return " AND ".join(where) or "TRUE", params
+
+
+def _check_chunk(rows):
+    """[(attendance_id, session_id, student_id, distance_m|None, verdict)] for one chunk."""
+    out = []
+    by_location = {}
+    for r in rows:
+        if r[5] is None:
+            out.append((r[0], r[1], r[2], None, NO_LOCATION))
+        elif r[3] is None or r[4] is None:
+            out.append((r[0], r[1], r[2], None, NO_GPS))
+        else:
+            by_location.setdefault(r[5], []).append(r)
+
+    for group in by_location.values():
+        fence = get_fence(group[0][6], group[0][7], group[0][8])
+        lats = np.fromiter((r[3] for r in group), dtype=np.float64, count=len(group))
+        lons = np.fromiter((r[4] for r in group), dtype=np.float64, count=len(group))
+        inside, dist = fence.check_many(lats, lons)
+        out += [(r[0], r[1], r[2], d, INSIDE if ok else OUTSIDE)
+                for r, ok, d in zip(group, inside.tolist(), dist.tolist())]
+    return out
+
+
+def _write_back(results, checked_at):
+    values, params = [], []
+    for att_id, _, _, distance, verdict in results:
+        values.append("(%s, %s, %s)")
+        params += [att_id, distance, {INSIDE: True, OUTSIDE: False}.get(verdict)]
+    with connection.cursor() as cursor:
+        cursor.execute(WRITE_BACK_SQL.format(values=",".join(values)), [checked_at] + params)
+
+
+def recheck(session_id=None, course_id=None, semester_id=None, location_id=None,
+            write_back=False, on_chunk=None, chunk_size=5000):
+    """
+    Walk matching attendance rows chunk by chunk and re-run the geofence check.
+    With write_back each chunk's UPDATE is its own transaction.
+    on_chunk(results) receives each chunk's result tuples (e.g. a CSV writer).
+    Returns counters plus rows/sec.
+    """
+    where, params = _scope(session_id, course_id, semester_id, location_id)
+    stats = {'rows': 0, INSIDE: 0, OUTSIDE: 0, NO_GPS: 0, NO_LOCATION: 0}
+    checked_at = timezone.now()
+    t0 = time.perf_counter()
+
+    sql = CHUNK_SQL.format(where=where)
+    last_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [last_id, chunk_size])
+            rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        results = _check_chunk(rows)
+        if write_back:
+            with transaction.atomic():
+                _write_back(results, checked_at)
+        if on_chunk:
+            on_chunk(results)
+        stats['rows'] += len(results)
+        for r in results:
+            stats[r[4]] += 1
+        if len(rows) < chunk_size:
+            break
+
+    elapsed = time.perf_counter() - t0
+    stats['seconds'] = round(elapsed, 3)
+    stats['rows_per_sec'] = round(stats['rows'] / elapsed) if elapsed else 0
+    return stats
@@ -0,0 +1,210 @@
+# app_core/services/index_advisor.py
+# Captures the SQL app_core sends during a workload (the test suite or a
+# bench command), EXPLAINs every distinct statement, and measures the index
+# pack in app_core/sql/index_pack.sql against it: plan costs before, after,
+# and the Seq Scans nothing in the pack addresses.
+# What-if mode builds the pack inside a transaction that is rolled back
+# (plain CREATE INDEX, SHARE lock on each table while it runs); apply mode runs
+# the CONCURRENTLY statements for real.
+import json
+import os
+import re
+import traceback
+from pathlib import Path
+
+from django.db import connection, transaction
+
+
+PACK_PATH = Path(__file__).resolve().parent.parent / 'sql' / 'index_pack.sql'
+
+PACK_RE = re.compile(
+    r'CREATE\s+(UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+ON\s+(\w+)\s*\(([^)]*)\)',
+    re.IGNORECASE,
+)
+
+EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete')
+
+APP_DIR = os.sep + 'app_core' + os.sep
+SKIP_DIRS = (APP_DIR + 'management' + os.sep, APP_DIR + 'services' + os.sep + 'index_advisor')
+
+# Хүснэгтийн одоо байгаа index-үүдийн баганын дараалал (PK/UNIQUE constraint-ийг оруулаад)
+EXISTING_INDEXES_SQL = """
+    SELECT i.indisunique, array_agg(a.attname::text ORDER BY k.ord)
+    FROM pg_index i
+    CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+    WHERE i.indrelid = to_regclass(%s) AND i.indisvalid
+    GROUP BY i.indexrelid, i.indisunique
+"""
+
+DUPLICATES_SQL = "SELECT COUNT(*) FROM (SELECT 1 FROM {table} GROUP BY {columns} HAVING COUNT(*) > 1) d"
+
+
+def load_pack(path=PACK_PATH):
+    """[{'name', 'table', 'columns', 'unique', 'sql'}] in file order."""
+    pack = []
+    for line in Path(path).read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if not line or line.startswith('--'):
+            continue
+        m = PACK_RE.match(line)
+        if not m:
+            continue
+        pack.append({
+            'name': m.group(2),
+            'table': m.group(3),
+            'columns': [c.strip() for c in m.group(4).split(',')],
+            'unique': bool(m.group(1)),
+            'sql': line.rstrip(';'),
+        })
+    return pack
+
+
+class StatementCapture:
+    """connection.execute_wrapper: app_core-оос гарсан statement бүрийг (sql, params) хадгална.
+
+    Ижил SQL текстийг нэг л удаа (анхны params-тай нь) хадгалж, хэдэн удаа
+    ажилласныг тоолно.
+    """
+
+    def __init__(self):
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        origin = sql.lstrip().lower().startswith(EXPLAINABLE) and self._origin()
+        if origin:
+            entry = self.statements.get(sql)
+            if entry is None:
+                first = next(iter(params), None) if many else params
+                self.statements[sql] = entry = {'sql': sql, 'params': first, 'calls': 0, 'origin': origin}
+            entry['calls'] += 1
+        return execute(sql, params, many, context)
+
+    @staticmethod
+    def _origin():
+        """'views/attendance.py:160' - хамгийн ойрын app_core frame, эсвэл None."""
+        for frame in reversed(traceback.extract_stack()):
+            if APP_DIR in frame.filename and not any(d in frame.filename for d in SKIP_DIRS):
+                return f'{frame.filename.split(APP_DIR, 1)[1]}:{frame.lineno}'
+        return None
+
+
+def explain(sql, params):
+    """Total Cost + plan tree, or None when the statement can't be planned standalone."""
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+    except Exception:
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _walk(child)
+
+
+def seq_scans(plan):
+    return [(n['Relation Name'], n.get('Filter', '')) for n in _walk(plan)
+            if n['Node Type'] == 'Seq Scan' and 'Relation Name' in n]
+
+
+def indexes_used(plan):
+    return {n['Index Name'] for n in _walk(plan) if 'Index Name' in n}
+
+
+def covering_index(entry):
+    """Pack мөртэй ижил баганын дараалалтай index аль хэдийн байвал True.
+
+    UNIQUE мөрийг зөвхөн UNIQUE index (жишээ нь dump-ийн attendance_unique) хангана.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(EXISTING_INDEXES_SQL, [entry['table']])
+        for is_unique, columns in cursor.fetchall():
+            if list(columns) == entry['columns'] and (is_unique or not entry['unique']):
+                return True
+    return False
+
+
+def duplicate_groups(entry):
+    with connection.cursor() as cursor:
+        cursor.execute(DUPLICATES_SQL.format(table=entry['table'], columns=', '.join(entry['columns'])))
+        return cursor.fetchone()[0]
+
+
+def plan_pack(pack):
+    """Pack-ийг хэрэгжүүлэх боломжоор нь ангилна: todo / covered / blocked (UNIQUE давхардал)."""
+    todo, covered, blocked = [], [], []
+    for entry in pack:
+        if covering_index(entry):
+            covered.append(entry)
+        elif entry['unique'] and duplicate_groups(entry):
+            blocked.append(entry)
+        else:
+            todo.append(entry)
+    return todo, covered, blocked
+
+
+def measure(statements):
+    """{sql: plan|None} for every captured statement."""
+    return {sql: explain(sql, s['params']) for sql, s in statements.items()}
+
+
+def what_if(statements, todo):
+    """Pack-ийг transaction дотор үүсгэж EXPLAIN хийгээд rollback хийнэ."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        for entry in todo:
+            cursor.execute(entry['sql'].replace(' CONCURRENTLY', ''))
+        for table in {e['table'] for e in todo}:
+            cursor.execute(f'ANALYZE {table}')
+        after = measure(statements)
+        transaction.set_rollback(True)
+    return after
+
+
+def apply(todo):
+    """CONCURRENTLY statement-уудыг autocommit-оор ажиллуулна.
+
+    Алдаа гарвал үлдсэн INVALID index-ийг устгаад [(name, error)] буцаана.
+    """
+    if not connection.get_autocommit():
+        raise RuntimeError('CREATE INDEX CONCURRENTLY transaction дотор ажиллахгүй')
+    failed = []
+    with connection.cursor() as cursor:
+        for entry in todo:
+            try:
+                cursor.execute(entry['sql'])
+            except Exception as exc:
+                failed.append((entry['name'], str(exc).strip()))
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {entry['name']}")
+        for table in {e['table'] for e in todo}:
+            cursor.execute(f'ANALYZE {table}')
+    return failed
+
+
+def compare(statements, before, after, pack_names):
+    """Statement бүрийн өмнөх/дараах cost, ашигласан pack index, үлдсэн Seq Scan.
+
+    Хамгийн их буурсан нь эхэнд.
+    """
+    rows = []
+    for sql, s in statements.items():
+        b, a = before.get(sql), after.get(sql)
+        if b is None:
+            continue
+        a = a or b
+        rows.append({
+            'sql': ' '.join(sql.split()),
+            'origin': s['origin'],
+            'calls': s['calls'],
+            'before': b['Total Cost'],
+            'after': a['Total Cost'],
+            'pack_indexes': sorted(indexes_used(a) & pack_names),
+            'seq_scans': seq_scans(a),
+        })
+    rows.sort(key=lambda r: (r['after'] - r['before']) * r['calls'])
+    return rows
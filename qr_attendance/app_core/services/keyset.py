@@ -0,0 +1,144 @@
+# app_core/services/keyset.py
+# Keyset (seek) pagination for the admin list views and their JSON APIs.
+# A page is "the next N rows after this sort key" - WHERE (k1, k2, id) > (...)
+# on an index - instead of OFFSET or fetching the whole table, so page cost
+# stays flat as the table grows. The position travels as an opaque signed
+# cursor token (?after=... / ?before=...).
+import datetime
+from dataclasses import dataclass
+
+from django.core import signing
+from django.db import connection
+
+
+SALT = 'app_core.keyset'
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+@dataclass
+class Page:
+    rows: list
+    next_cursor: str = None
+    prev_cursor: str = None
+    limit: int = DEFAULT_LIMIT
+    # "?..." links for templates (set when paginate() gets the request)
+    next_query: str = None
+    prev_query: str = None
+    first_query: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def as_json(self):
+        return {'next': self.next_cursor, 'prev': self.prev_cursor, 'limit': self.limit}
+
+
+def _plain(value):
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def encode(values):
+    return signing.dumps([_plain(v) for v in values], salt=SALT, compress=True)
+
+
+def decode(token):
+    """Key values from a cursor token; None for a missing or tampered token."""
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        return None
+
+
+def _query(request, **cursor):
+    params = request.GET.copy()
+    for key in ('after', 'before', 'page'):
+        params.pop(key, None)
+    params.update({k: v for k, v in cursor.items() if v})
+    return '?' + params.urlencode()
+
+
+def limit_from(request, default=DEFAULT_LIMIT):
+    try:
+        limit = int(request.GET.get('limit') or request.GET.get('per_page') or default)
+    except ValueError:
+        limit = default
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def paginate(sql, params, keys, request=None, after=None, before=None, limit=DEFAULT_LIMIT,
+             descending=False):
+    """
+    Run one page of `sql`.
+
+    sql     - SELECT ... with a `{keyset}` placeholder inside its WHERE,
+              after every other %s, where the "AND (keys) > (cursor)"
+              condition goes; no ORDER BY or LIMIT, they are appended here.
+              The key values are read from the last len(keys) columns of
+              each row, so select them last.
+    keys    - sort key expressions ending with a unique column (usually id),
+              e.g. ['s.student_code', 's.id'], all sorted the same direction.
+              Keep them NOT NULL (COALESCE) - row comparison skips NULLs.
+    request - when given, after/before/limit come from its query string.
+
+    Returns a Page whose rows have the trailing key columns stripped.
+    """
+    if request is not None:
+        after = request.GET.get('after')
+        before = request.GET.get('before')
+        limit = limit_from(request, limit)
+
+    after_key, before_key = decode(after), decode(before)
+    backwards = before_key is not None and after_key is None
+    seek = before_key if backwards else after_key
+
+    # backwards paging walks the index the other way, then flips the page
+    reverse = descending != backwards
+    condition = ''
+    seek_params = []
+    if seek is not None and len(seek) == len(keys):
+        cols = ', '.join(keys)
+        marks = ', '.join(['%s'] * len(keys))
+        condition = f" AND ({cols}) {'<' if reverse else '>'} ({marks})"
+        seek_params = list(seek)
+
+    direction = 'DESC' if reverse else 'ASC'
+    order = ', '.join(f'{k} {direction}' for k in keys)
+    query = sql.format(keyset=condition) + f' ORDER BY {order} LIMIT %s'
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, list(params) + seek_params + [limit + 1])
+        rows = cursor.fetchall()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    n = len(keys)
+    page = Page(rows=[r[:-n] for r in rows], limit=limit)
+    if rows:
+        first_key, last_key = rows[0][-n:], rows[-1][-n:]
+        if backwards:
+            page.prev_cursor = encode(first_key) if more else None
+            page.next_cursor = encode(last_key)
+        else:
+            page.next_cursor = encode(last_key) if more else None
+            page.prev_cursor = encode(first_key) if seek_params else None
+
+    if request is not None:
+        if page.has_next:
+            page.next_query = _query(request, after=page.next_cursor)
+        if page.has_prev:
+            page.prev_query = _query(request, before=page.prev_cursor)
+            page.first_query = _query(request)
+    return page
@@ -0,0 +1,51 @@
+# app_core/services/qr_render.py
+# QR rendering with an LRU cache keyed by (data/url, box_size, border, format).
+# A session's QR never changes, so page reloads and the qr.png endpoint reuse
+# the same bytes instead of rebuilding the matrix and re-encoding the PNG.
+# The SVG path uses qrcode's path image factory and never touches PIL.
+import base64
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+
+
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+@lru_cache(maxsize=512)
+def render_qr(data, box_size=10, border=4, fmt='png'):
+    """Return (bytes, etag) for the QR of `data`. Cached per process."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unsupported QR format: {fmt}")
+
+    qr = qrcode.QRCode(box_size=box_size, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    buf = BytesIO()
+    if fmt == 'svg':
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buf)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buf, format="PNG")
+    content = buf.getvalue()
+    return content, '"%s"' % hashlib.sha1(content).hexdigest()
+
+
+def qr_base64(data, box_size=10, border=4, cache=True):
+    """
+    Base64 PNG for templates that still inline `data:image/png;base64,...`.
+    cache=False for one-off data (rotating tokens) so it does not evict real entries.
+    """
+    render = render_qr if cache else render_qr.__wrapped__
+    content, _ = render(data, box_size, border, 'png')
+    return base64.b64encode(content).decode()
+
+
+def cache_info():
+    return render_qr.cache_info()._asdict()
@@ -0,0 +1,45 @@
+# app_core/services/qr_token.py
+# Rotating, short-lived QR tokens signed with HMAC (django.core.signing,
+# keyed by SECRET_KEY). The token carries the session id and its issue time,
+# so a forged or stale token is rejected without touching the database.
+#
+#   scan token   - shown on the teacher display, re-issued every QR_ROTATE_SECONDS
+#   submit token - handed out by the scan page so the student has time to type
+from django.conf import settings
+from django.core import signing
+
+_SCAN_SALT = 'app_core.qr.scan'
+_SUBMIT_SALT = 'app_core.qr.submit'
+
+
+def rotate_seconds():
+    return getattr(settings, 'QR_ROTATE_SECONDS', 15)
+
+
+def _sign(session_id, salt):
+    return signing.TimestampSigner(salt=salt).sign(str(int(session_id)))
+
+
+def _verify(value, salt, max_age):
+    try:
+        return int(signing.TimestampSigner(salt=salt).unsign(value, max_age=max_age))
+    except (signing.BadSignature, ValueError):
+        # SignatureExpired нь BadSignature-ийн дэд анги
+        return None
+
+
+def sign_scan(session_id):
+    return _sign(session_id, _SCAN_SALT)
+
+
+def verify_scan(value):
+    """Session id, or None if forged/expired. One rotation of grace for slow cameras."""
+    return _verify(value, _SCAN_SALT, 2 * rotate_seconds())
+
+
+def sign_submit(session_id):
+    return _sign(session_id, _SUBMIT_SALT)
+
+
+def verify_submit(value):
+    return _verify(value, _SUBMIT_SALT, getattr(settings, 'QR_SUBMIT_MAX_AGE', 300))
@@ -0,0 +1,226 @@
+# app_core/services/ref_cache.py
+# Process-wide cache of the small reference tables (attendance_type,
+# lesson_type, room_type, time_setting, location, ref_role). Each table is
+# loaded whole on first use and served from memory until its TTL runs out or a
+# look_up CRUD view calls invalidate(). With REF_CACHE_LISTEN on, invalidations are also
+# sent as NOTIFY ref_cache, '<table>' and a listener thread in every worker
+# drops its copy, so other workers don't wait for the TTL.
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'ref_cache'
+
+TABLE_SQL = {
+    'attendance_type': "SELECT id, name, value FROM attendance_type ORDER BY id",
+    'lesson_type': "SELECT id, name, value FROM lesson_type ORDER BY id",
+    'room_type': "SELECT id, code, name FROM room_type ORDER BY id",
+    'time_setting': """SELECT id, location_id, name, value, start_time, end_time
+                       FROM time_setting ORDER BY id""",
+    'location': "SELECT id, name, latitude, longitude, radius_m FROM location ORDER BY name, id",
+    'ref_role': "SELECT id, name FROM ref_role ORDER BY id",
+}
+
+# attendance_type-ийн value эсвэл нэрээр (хуучин өгөгдөлд value хоосон байж болно).
+# sql/attendance_summary.sql-ийн attendance_type_kind() ижил дүрэмтэй.
+TYPE_MATCH = {
+    'present': 'ирсэн',
+    'absent': 'тасалсан',
+    'late': 'хоцорсон',
+    'excused': 'чөлөө',
+}
+TYPE_FALLBACK = {'present': 1, 'absent': 2, 'late': 3, 'excused': 4}
+
+_lock = threading.Lock()
+_tables = {}    # table -> (monotonic deadline, rows tuple)
+_generation = {}   # table -> invalidation counter; a load started before a drop isn't stored
+_stats = {'hits': 0, 'loads': 0, 'invalidations': 0, 'notifications': 0}
+_listener = None
+
+
+def _max_ttl():
+    return getattr(settings, 'REF_CACHE_MAX_TTL', 300)
+
+
+def _listen_enabled():
+    return getattr(settings, 'REF_CACHE_LISTEN', False) and connection.vendor == 'postgresql'
+
+
+def rows(table):
+    """All rows of a reference table as tuples, in TABLE_SQL column order."""
+    now = time.monotonic()
+    with _lock:
+        entry = _tables.get(table)
+        if entry and entry[0] > now:
+            _stats['hits'] += 1
+            return entry[1]
+        generation = _generation.get(table, 0)
+
+    if _listen_enabled():
+        _ensure_listener()
+    with connection.cursor() as cursor:
+        cursor.execute(TABLE_SQL[table])
+        data = tuple(cursor.fetchall())
+    with _lock:
+        # SELECT-ийн явцад invalidate/NOTIFY ирсэн бол хуучин байж болзошгүй тул хадгалахгүй
+        if _generation.get(table, 0) == generation:
+            _tables[table] = (now + _max_ttl(), data)
+        _stats['loads'] += 1
+    return data
+
+
+def _drop(tables):
+    with _lock:
+        for table in tables:
+            _tables.pop(table, None)
+            _generation[table] = _generation.get(table, 0) + 1
+        _stats['invalidations'] += 1
+
+
+def invalidate(*tables):
+    """Drop the given tables (all when none given) once the current transaction commits."""
+    tables = tables or tuple(TABLE_SQL)
+
+    def _commit():
+        _drop(tables)
+        if _listen_enabled():
+            with connection.cursor() as cursor:
+                for table in tables:
+                    cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, table])
+
+    transaction.on_commit(_commit)
+
+
+# ---- typed accessors ----
+
+def attendance_types():
+    """[(id, name, value)] ordered by id."""
+    return list(rows('attendance_type'))
+
+
+def attendance_type_kind(name, value):
+    """'present' / 'absent' / 'late' / 'excused' for an attendance_type row, or None."""
+    if value in TYPE_MATCH:
+        return value
+    for kind, match in TYPE_MATCH.items():
+        if name and match in name.lower():
+            return kind
+    return None
+
+
+def attendance_type_id(kind):
+    """id of the attendance_type of a TYPE_MATCH kind, matched by value then by name."""
+    for type_id, name, value in rows('attendance_type'):
+        if attendance_type_kind(name, value) == kind:
+            return type_id
+    return TYPE_FALLBACK[kind]
+
+
+def lesson_types():
+    return [{'id': r[0], 'name': r[1], 'value': r[2]} for r in rows('lesson_type')]
+
+
+def room_types():
+    return [{'id': r[0], 'code': r[1], 'name': r[2]} for r in rows('room_type')]
+
+
+def locations():
+    """[{'id', 'name', 'latitude', 'longitude', 'radius_m'}] ordered by name."""
+    return [
+        {'id': r[0], 'name': r[1], 'latitude': r[2], 'longitude': r[3], 'radius_m': r[4]}
+        for r in rows('location')
+    ]
+
+
+def location_choices():
+    """[(id, name)] ordered by name - the school/location dropdowns."""
+    return [(r[0], r[1]) for r in rows('location')]
+
+
+def location(location_id):
+    """One location dict, or None."""
+    if location_id is None:
+        return None
+    return next((loc for loc in locations() if loc['id'] == int(location_id)), None)
+
+
+def timeslots(location_id=None, order='id'):
+    """time_setting rows (optionally one location's) as dicts.
+
+    order='start_time' sorts like ORDER BY start_time NULLS LAST, id.
+    """
+    if location_id is not None:
+        location_id = int(location_id)
+    items = [
+        {'id': r[0], 'location_id': r[1], 'name': r[2], 'value': r[3],
+         'start_time': r[4], 'end_time': r[5]}
+        for r in rows('time_setting')
+        if location_id is None or r[1] == location_id
+    ]
+    if order == 'start_time':
+        items.sort(key=lambda t: (t['start_time'] is None, t['start_time'] or 0, t['id']))
+    return items
+
+
+def timeslot(time_setting_id):
+    """One time_setting dict, or None."""
+    if time_setting_id is None:
+        return None
+    return next((t for t in timeslots() if t['id'] == int(time_setting_id)), None)
+
+
+def role_id(name):
+    """ref_role id by name ('admin', 'teacher'), or None."""
+    return next((r[0] for r in rows('ref_role') if r[1] == name), None)
+
+
+def stats():
+    with _lock:
+        return {**_stats, 'tables': sorted(_tables), 'listening': _listener is not None}
+
+
+# ---- LISTEN/NOTIFY ----
+
+def _ensure_listener():
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        _listener = threading.Thread(target=_listen_forever, name='ref-cache-listener', daemon=True)
+        _listener.start()
+
+
+def _listen_forever():
+    import psycopg2
+
+    params = connection.get_connection_params()
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(**params)
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            # Холболт тасарсан хооронд ирсэн NOTIFY алдагдсан байж болно
+            _drop(tuple(TABLE_SQL))
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    with _lock:
+                        _stats['notifications'] += 1
+                    _drop([note.payload] if note.payload in TABLE_SQL else tuple(TABLE_SQL))
+        except Exception:
+            logger.exception('ref_cache listener disconnected, retrying')
+            if conn is not None:
+                conn.close()
+            time.sleep(5)
@@ -0,0 +1,186 @@
+# app_core/services/repository.py
+# Read helpers for the admin dropdown / filter data (schools, semesters,
+# departments, programs, class groups, courses, class rooms) that
+# used to be copy-pasted as _get_* functions across the views.
+# Rows are namedtuples (no per-row dict, attribute access works in templates);
+# use as_json() for the *_json template variables. Students are not listed
+# whole - pages search them through app_core/services/search.py.
+# Inside a request (app_core.middleware.RequestScopeMiddleware) each call is
+# memoized by arguments, so loading the same list twice in one request costs
+# one query. Results are shared tuples - don't mutate them.
+import contextvars
+import functools
+import json
+from collections import namedtuple
+
+from django.db import connection
+
+from app_core.services import ref_cache
+
+
+School = namedtuple('School', 'id name')
+Semester = namedtuple('Semester', 'id school_id school_year term name start_date end_date is_active created_at')
+Department = namedtuple('Department', 'id school_id name code')
+Program = namedtuple('Program', 'id department_id school_id name code')
+ClassGroup = namedtuple('ClassGroup', 'id name year school_id semester_id program_id program_name '
+                                      'program_code department_id department_name student_count')
+Course = namedtuple('Course', 'id name code')
+ClassRoom = namedtuple('ClassRoom', 'id school_id room_number room_type_id capacity')
+
+_scope = contextvars.ContextVar('repository_scope', default=None)
+
+
+def begin_scope():
+    """Start a memo scope (one per request). Returns the token for end_scope()."""
+    return _scope.set({})
+
+
+def end_scope(token):
+    _scope.reset(token)
+
+
+def clear():
+    """Forget memoized results in the current scope (after a write in the same request)."""
+    memo = _scope.get()
+    if memo is not None:
+        memo.clear()
+
+
+def _memoized(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        memo = _scope.get()
+        if memo is None:
+            return fn(*args, **kwargs)
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in memo:
+            memo[key] = fn(*args, **kwargs)
+        return memo[key]
+    return wrapper
+
+
+def _fetch(row_type, sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return tuple(map(row_type._make, cursor.fetchall()))
+
+
+def _where(conditions):
+    clauses = [sql for sql, value in conditions if value]
+    params = [value for _, value in conditions if value]
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+def as_json(rows):
+    """JSON array of objects for the *_json template variables (dates as strings)."""
+    return json.dumps([r._asdict() for r in rows], ensure_ascii=False, default=str)
+
+
+# ---- lookups ----
+
+def schools():
+    """Locations used as schools, ordered by name (served from ref_cache)."""
+    return tuple(School(*choice) for choice in ref_cache.location_choices())
+
+
+@_memoized
+def semesters(school_id=None):
+    where, params = _where([('school_id = %s', school_id)])
+    return _fetch(Semester, f"""
+        SELECT id, school_id, school_year, term, name, start_date, end_date, is_active, created_at
+        FROM semester{where}
+        ORDER BY school_id, school_year DESC, term DESC
+    """, params)
+
+
+@_memoized
+def semester(semester_id):
+    rows = _fetch(Semester, """
+        SELECT id, school_id, school_year, term, name, start_date, end_date, is_active, created_at
+        FROM semester WHERE id = %s
+    """, [semester_id])
+    return rows[0] if rows else None
+
+
+@_memoized
+def departments(school_id=None):
+    where, params = _where([('school_id = %s', school_id)])
+    return _fetch(Department, f"""
+        SELECT id, school_id, name, COALESCE(code, '')
+        FROM department{where}
+        ORDER BY school_id, code, name
+    """, params)
+
+
+@_memoized
+def programs(school_id=None, department_id=None):
+    where, params = _where([('d.school_id = %s', school_id), ('p.department_id = %s', department_id)])
+    return _fetch(Program, f"""
+        SELECT p.id, p.department_id, d.school_id, p.name, COALESCE(p.code, '')
+        FROM program p
+        JOIN department d ON d.id = p.department_id{where}
+        ORDER BY p.code, p.name
+    """, params)
+
+
+@functools.lru_cache(maxsize=None)
+def _class_group_columns():
+    """class_group's columns; school_id / semester_id are not on every install."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'class_group' AND table_schema = current_schema()
+        """)
+        return frozenset(r[0] for r in cursor.fetchall())
+
+
+@_memoized
+def class_groups(school_id=None, year=None, department_id=None, program_id=None):
+    """
+    Class groups with program/department names and member count. school_id
+    falls back to the department's school, semester_id to NULL, when
+    class_group has no such column.
+    """
+    columns = _class_group_columns()
+    school_col = 'cg.school_id' if 'school_id' in columns else 'd.school_id'
+    semester_col = 'cg.semester_id' if 'semester_id' in columns else 'NULL::bigint'
+    where, params = _where([
+        (f'{school_col} = %s', school_id),
+        ('cg.year = %s', year),
+        ('d.id = %s', department_id),
+        ('p.id = %s', program_id),
+    ])
+    return _fetch(ClassGroup, f"""
+        SELECT cg.id, COALESCE(cg.name, ''), cg.year, {school_col}, {semester_col},
+               p.id, COALESCE(p.name, ''), COALESCE(p.code, ''),
+               d.id, COALESCE(d.name, ''),
+               (SELECT COUNT(*) FROM student_class_group scg WHERE scg.class_group_id = cg.id)
+        FROM class_group cg
+        JOIN program p ON p.id = cg.program_id
+        JOIN department d ON d.id = p.department_id{where}
+        ORDER BY cg.year DESC, p.code, cg.name
+    """, params)
+
+
+@_memoized
+def courses():
+    return _fetch(Course, "SELECT id, name, COALESCE(code, '') FROM course ORDER BY code")
+
+
+@_memoized
+def class_rooms(school_id):
+    return _fetch(ClassRoom, """
+        SELECT id, school_id, room_number, room_type_id, capacity
+        FROM class_room
+        WHERE school_id = %s
+        ORDER BY room_number
+    """, [school_id])
+
+
+def class_group_student_ids(class_group_id):
+    """Member ids of a class group. Not memoized - read right after membership writes."""
+    if not class_group_id:
+        return ()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT student_id FROM student_class_group WHERE class_group_id = %s", [class_group_id])
+        return tuple(r[0] for r in cursor.fetchall())
@@ -0,0 +1,387 @@
+# app_core/services/roster_import.py
+# Bulk student roster import (manage.py import_roster, /admin/students/import/).
+# A CSV/XLSX roster is streamed row by row and validated in Python against
+# in-memory maps of the existing student codes, class groups and per-year
+# group memberships (loaded once, one query each). Accepted rows are COPYed in
+# batches into a temp staging table and merged with three set-based statements
+# (update names, insert students, assign groups) in one transaction, so a
+# start-of-year roster of thousands of students is one upload instead of one
+# form post / one SELECT + INSERT per student.
+#
+# Columns (header row, case-insensitive, English or Mongolian):
+#   student_code | код            required
+#   full_name    | нэр            required for new students
+#   class_group_id                optional, or
+#   class_group  | бүлэг          group name, matched within `year` / --year
+#   year         | он             optional
+import csv
+import io
+import os
+import time
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+
+from app_core.services.bulk_enrollment import ALREADY, CONFLICT, ENROLLED
+from app_core.services.search import fold
+
+
+BATCH_ROWS = 5000
+CODE_MAX = 50     # student.student_code varchar(50)
+NAME_MAX = 200    # student.full_name varchar(200)
+
+HEADERS = {
+    'student_code': ('student_code', 'code', 'код', 'оюутны код'),
+    'full_name': ('full_name', 'name', 'нэр', 'овог нэр'),
+    'class_group_id': ('class_group_id',),
+    'class_group': ('class_group', 'group', 'бүлэг', 'анги'),
+    'year': ('year', 'он'),
+}
+
+STAGE_SQL = """
+    CREATE TEMP TABLE roster_stage (
+        line           INTEGER NOT NULL,
+        student_code   TEXT    NOT NULL,
+        full_name      TEXT    NOT NULL,
+        class_group_id BIGINT
+    ) ON COMMIT DROP
+"""
+
+COPY_SQL = "COPY roster_stage (line, student_code, full_name, class_group_id) FROM STDIN WITH (FORMAT csv)"
+
+UPDATE_NAMES_SQL = """
+    UPDATE student s SET full_name = r.full_name
+    FROM roster_stage r
+    WHERE s.student_code = r.student_code
+      AND r.full_name <> ''
+      AND s.full_name IS DISTINCT FROM r.full_name
+"""
+
+INSERT_STUDENTS_SQL = """
+    INSERT INTO student (student_code, full_name)
+    SELECT student_code, full_name FROM roster_stage
+    WHERE full_name <> ''
+    ON CONFLICT (student_code) DO NOTHING
+"""
+
+# Нэг онд нэг л бүлэг: энэ бүлэгт эсвэл тухайн оны өөр бүлэгт байгаа бол алгасна
+NOT_IN_YEAR_SQL = """
+    NOT EXISTS (
+        SELECT 1 FROM student_class_group scg
+        JOIN class_group other ON other.id = scg.class_group_id
+        WHERE scg.student_id = {student}
+          AND (scg.class_group_id = cg.id OR other.year = cg.year)
+    )
+"""
+
+ASSIGN_STAGED_SQL = f"""
+    INSERT INTO student_class_group (student_id, class_group_id, created_at)
+    SELECT s.id, cg.id, now()
+    FROM roster_stage r
+    JOIN student s ON s.student_code = r.student_code
+    JOIN class_group cg ON cg.id = r.class_group_id
+    WHERE {NOT_IN_YEAR_SQL.format(student='s.id')}
+"""
+
+# Сонгосон оюутнууд: бүлгийн оны одоогийн гишүүнчлэл (энэ бүлэг эхэнд), элсүүлэлт,
+# оюутан бүрийн үр дүн - нэг statement
+ASSIGN_IDS_SQL = f"""
+    WITH target AS (
+        SELECT id, year FROM class_group WHERE id = %(class_group_id)s
+    ),
+    ids AS (
+        SELECT DISTINCT x.id
+        FROM unnest(%(student_ids)s::bigint[]) AS x(id)
+        JOIN student s ON s.id = x.id
+    ),
+    membership AS (
+        SELECT DISTINCT ON (ids.id) ids.id AS student_id, other.id AS class_group_id, other.name
+        FROM ids
+        JOIN student_class_group scg ON scg.student_id = ids.id
+        JOIN class_group other ON other.id = scg.class_group_id
+        JOIN target t ON other.id = t.id OR other.year = t.year
+        ORDER BY ids.id, other.id = t.id DESC
+    ),
+    ins AS (
+        INSERT INTO student_class_group (student_id, class_group_id, created_at)
+        SELECT ids.id, t.id, now()
+        FROM ids CROSS JOIN target t
+        WHERE NOT EXISTS (SELECT 1 FROM membership m WHERE m.student_id = ids.id)
+        ON CONFLICT DO NOTHING
+        RETURNING student_id
+    )
+    SELECT ids.id,
+           CASE WHEN ins.student_id IS NOT NULL THEN '{ENROLLED}'
+                WHEN cur.class_group_id = %(class_group_id)s::bigint THEN '{ALREADY}'
+                ELSE '{CONFLICT}' END,
+           cur.name
+    FROM ids
+    LEFT JOIN ins ON ins.student_id = ids.id
+    LEFT JOIN membership cur ON cur.student_id = ids.id
+    ORDER BY ids.id
+"""
+
+
+class RosterError(Exception):
+    """The file as a whole can't be imported (format, missing columns)."""
+
+
+@dataclass
+class ImportResult:
+    rows_read: int = 0
+    accepted: int = 0
+    rejects: list = field(default_factory=list)   # [(line, student_code, reason)]
+    students_created: int = 0
+    names_updated: int = 0
+    assigned: int = 0
+    read_seconds: float = 0.0
+    merge_seconds: float = 0.0
+    dry_run: bool = False
+
+    @property
+    def seconds(self):
+        return self.read_seconds + self.merge_seconds
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+
+# ---- reading ----
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)   # Excel-ийн тоон код: 2021001.0
+    return str(value).strip()
+
+
+def _columns(header, headers, required):
+    """{field: column index} from the header row."""
+    names = [_cell(h).lower() for h in header]
+    columns = {}
+    for key, aliases in headers.items():
+        for i, name in enumerate(names):
+            if name in aliases:
+                columns[key] = i
+                break
+    for need in required:
+        options = (need,) if isinstance(need, str) else need
+        if not any(option in columns for option in options):
+            raise RosterError(f"{' / '.join(options)} ({headers[options[0]][-1]}) багана олдсонгүй")
+    return columns
+
+
+def _iter_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.reader(text, dialect)
+
+
+def _iter_xlsx(fileobj):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_rows(fileobj, filename, headers=HEADERS, required=('student_code',)):
+    """(line, {field: str}) for each data row; line is the 1-based row in the file.
+
+    fileobj is a binary file (open(path, 'rb') or a Django UploadedFile).
+    headers maps field -> accepted header names; each required entry is a
+    field or a tuple of alternative fields (services/schedule_builder reuses this).
+    """
+    fileobj = getattr(fileobj, 'file', fileobj)   # UploadedFile -> BytesIO / temp file
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        rows = _iter_xlsx(fileobj)
+    elif ext in ('.csv', '.txt', ''):
+        rows = _iter_csv(fileobj)
+    else:
+        raise RosterError(f'{ext} файл дэмжихгүй (CSV эсвэл XLSX)')
+
+    header = next(rows, None)
+    if header is None:
+        raise RosterError('Файл хоосон байна')
+    columns = _columns(header, headers, required)
+    for line, row in enumerate(rows, start=2):
+        values = {key: _cell(row[i]) if i < len(row) else '' for key, i in columns.items()}
+        if any(values.values()):
+            yield line, values
+
+
+# ---- validation ----
+
+class _Validator:
+    """Checks rows against the current tables, loaded once into memory."""
+
+    def __init__(self, default_year=None, school_id=None):
+        self.default_year = str(default_year) if default_year else None
+        self.seen = set()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT student_code, id FROM student")
+            self.students = dict(cursor.fetchall())
+
+            cursor.execute("SELECT id, COALESCE(name, ''), year, school_id FROM class_group")
+            self.groups = {}     # id -> (name, year)
+            self.by_name = {}    # (folded name, year) -> [id]
+            for group_id, name, year, group_school in cursor.fetchall():
+                if school_id and str(group_school) != str(school_id):
+                    continue
+                self.groups[group_id] = (name, year)
+                self.by_name.setdefault((fold(name), str(year)), []).append(group_id)
+
+            cursor.execute("""
+                SELECT scg.student_id, cg.year, cg.id
+                FROM student_class_group scg
+                JOIN class_group cg ON cg.id = scg.class_group_id
+            """)
+            self.memberships = {}   # (student_id, year) -> class_group_id
+            for student_id, year, group_id in cursor.fetchall():
+                self.memberships[(student_id, str(year))] = group_id
+
+    def _group(self, values):
+        """(class_group_id or None, reject reason or None)."""
+        if values.get('class_group_id'):
+            try:
+                group_id = int(values['class_group_id'])
+            except ValueError:
+                return None, 'class_group_id тоо биш'
+            if group_id not in self.groups:
+                return None, f'class_group_id {group_id} олдсонгүй'
+            return group_id, None
+
+        name = values.get('class_group')
+        if not name:
+            return None, None
+        year = values.get('year') or self.default_year
+        if year:
+            ids = self.by_name.get((fold(name), year), [])
+        else:
+            ids = [i for (n, _), group_ids in self.by_name.items() if n == fold(name) for i in group_ids]
+        if not ids:
+            return None, f'"{name}" бүлэг олдсонгүй'
+        if len(ids) > 1:
+            return None, f'"{name}" бүлэг олон байна - он эсвэл class_group_id заана уу'
+        return ids[0], None
+
+    def check(self, values):
+        """(staging row or None, reject reason or None)."""
+        code, name = values.get('student_code', ''), values.get('full_name', '')
+        if not code:
+            return None, 'student_code хоосон'
+        if len(code) > CODE_MAX:
+            return None, f'student_code {CODE_MAX} тэмдэгтээс урт'
+        if len(name) > NAME_MAX:
+            return None, f'full_name {NAME_MAX} тэмдэгтээс урт'
+        if code in self.seen:
+            return None, 'файлд давхардсан код'
+        student_id = self.students.get(code)
+        if student_id is None and not name:
+            return None, 'шинэ оюутны full_name хоосон'
+
+        group_id, reason = self._group(values)
+        if reason:
+            return None, reason
+        if group_id and student_id is not None:
+            year = self.groups[group_id][1]
+            current = self.memberships.get((student_id, str(year)))
+            if current is not None and current != group_id:
+                return None, f'{year} онд "{self.groups.get(current, ("?",))[0]}" бүлэгт элссэн'
+
+        self.seen.add(code)
+        return (code, name, group_id), None
+
+
+# ---- load ----
+
+def _copy(cursor, batch):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for line, (code, name, group_id) in batch:
+        writer.writerow([line, code, name, '' if group_id is None else group_id])
+    buf.seek(0)
+    cursor.copy_expert(COPY_SQL, buf)
+
+
+def import_roster(fileobj, filename, default_year=None, school_id=None, update_names=False,
+                  dry_run=False, batch_rows=BATCH_ROWS, progress=None):
+    """
+    Validate and load a roster file. Returns an ImportResult.
+
+    All-or-nothing: the merge runs in one transaction; dry_run validates and
+    merges, then rolls back (the counts show what would change).
+    progress(result) is called after every COPY batch.
+    """
+    result = ImportResult(dry_run=dry_run)
+    t0 = time.perf_counter()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        validator = _Validator(default_year=default_year, school_id=school_id)
+        cursor.execute(STAGE_SQL)
+
+        batch = []
+        for line, values in iter_rows(fileobj, filename):
+            result.rows_read += 1
+            staged, reason = validator.check(values)
+            if reason:
+                result.rejects.append((line, values.get('student_code', ''), reason))
+                continue
+            batch.append((line, staged))
+            if len(batch) >= batch_rows:
+                _copy(cursor, batch)
+                result.accepted += len(batch)
+                batch = []
+                result.read_seconds = time.perf_counter() - t0
+                if progress:
+                    progress(result)
+        if batch:
+            _copy(cursor, batch)
+            result.accepted += len(batch)
+        result.read_seconds = time.perf_counter() - t0
+
+        t1 = time.perf_counter()
+        cursor.execute("ANALYZE roster_stage")
+        if update_names:
+            cursor.execute(UPDATE_NAMES_SQL)
+            result.names_updated = cursor.rowcount
+        cursor.execute(INSERT_STUDENTS_SQL)
+        result.students_created = cursor.rowcount
+        cursor.execute(ASSIGN_STAGED_SQL)
+        result.assigned = cursor.rowcount
+        result.merge_seconds = time.perf_counter() - t1
+
+        if dry_run:
+            transaction.set_rollback(True)
+    return result
+
+
+def assign_to_group(class_group_id, student_ids):
+    """Add students to a class group in one statement; skips those already in
+    this group or in another group of the same year.
+
+    Returns [(student_id, outcome, current group name or None)], outcome as in
+    bulk_enrollment (enrolled / already / conflict)."""
+    ids = [int(sid) for sid in student_ids]
+    if not ids:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(ASSIGN_IDS_SQL, {'class_group_id': class_group_id, 'student_ids': ids})
+        return cursor.fetchall()
+
+
+def write_rejects(result, fileobj):
+    """Rejected rows as CSV (line, student_code, reason)."""
+    writer = csv.writer(fileobj)
+    writer.writerow(['line', 'student_code', 'reason'])
+    writer.writerows(result.rejects)
@@ -0,0 +1,234 @@
+# app_core/services/scan_spool.py
+# Optional write-behind ingestion for QR scans (SCAN_INGEST_MODE = 'spool').
+# submit_attendance validates the scan, appends it to a local SQLite spool in
+# WAL mode and answers right away; `manage.py scan_spool_worker` drains the
+# spool into attendance in batches with upserts. A slow Postgres then shows up
+# as spool lag instead of student-facing timeouts.
+#
+# Rows are never deleted on drain, only stamped with drained_at, so
+# `manage.py scan_spool_replay` can re-apply any range (upserts are idempotent).
+#
+# A batch that fails is retried row by row, so one bad row (FK violation after a
+# student/session was deleted, bad data) doesn't hold up the scans behind it.
+# A row that keeps failing is stamped failed_at after SCAN_SPOOL_MAX_ATTEMPTS
+# and leaves the drain query (dead letter; `scan_spool_replay --failed`).
+# Connection errors are not counted against a row - Postgres being down leaves
+# the whole batch pending.
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, transaction
+
+from app_core.services.attendance_submit import parse_coords, record_scans
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS scan_spool (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        enqueued_at REAL NOT NULL,
+        payload     TEXT NOT NULL,
+        drained_at  REAL,
+        attempts    INTEGER NOT NULL DEFAULT 0,
+        last_error  TEXT,
+        failed_at   REAL
+    );
+"""
+
+# failed_at-гүй хуучин spool файлд нэмнэ (CREATE TABLE IF NOT EXISTS багана нэмэхгүй)
+READY_INDEX = """
+    DROP INDEX IF EXISTS scan_spool_pending;
+    CREATE INDEX IF NOT EXISTS scan_spool_ready ON scan_spool (id)
+        WHERE drained_at IS NULL AND failed_at IS NULL;
+"""
+
+# Postgres руу холбогдож чадахгүй байгаа нь мөрийн алдаа биш
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+_local = threading.local()
+
+
+def enabled():
+    return getattr(settings, 'SCAN_INGEST_MODE', 'sync') == 'spool'
+
+
+def _path():
+    return Path(getattr(settings, 'SCAN_SPOOL_PATH', settings.BASE_DIR / 'var' / 'scan_spool.sqlite3'))
+
+
+def _conn():
+    """One SQLite connection per thread; WAL lets the worker read while requests append."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        path = _path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")  # accepted гэж хариулсан scan алдагдах ёсгүй
+        conn.executescript(SCHEMA)
+        columns = {r[1] for r in conn.execute("PRAGMA table_info(scan_spool)")}
+        if 'failed_at' not in columns:
+            conn.execute("ALTER TABLE scan_spool ADD COLUMN failed_at REAL")
+        conn.executescript(READY_INDEX)
+        _local.conn = conn
+    return conn
+
+
+def enqueue(session_id, student_id, attendance_type_id, now,
+            lat=None, lon=None, device_id='', device_info='', register_device=False):
+    """Durably append one scan (same arguments as record_scan). Returns spool id.
+
+    lat/lon are coerced to floats here (ValueError if invalid) so the drain
+    never meets a value Postgres will reject.
+    """
+    lat, lon = parse_coords(lat, lon)
+    payload = json.dumps({
+        'session_id': session_id,
+        'student_id': student_id,
+        'attendance_type_id': attendance_type_id,
+        'now': now.isoformat(),
+        'lat': lat,
+        'lon': lon,
+        'device_id': device_id,
+        'device_info': device_info,
+        'register_device': bool(register_device and device_id),
+    })
+    cur = _conn().execute(
+        "INSERT INTO scan_spool (enqueued_at, payload) VALUES (?, ?)", (time.time(), payload)
+    )
+    return cur.lastrowid
+
+
+def _max_attempts():
+    return getattr(settings, 'SCAN_SPOOL_MAX_ATTEMPTS', 5)
+
+
+def _load(payload):
+    scan = json.loads(payload)
+    scan['now'] = datetime.fromisoformat(scan['now'])
+    return scan
+
+
+def drain(batch_size=None):
+    """
+    Apply up to batch_size pending scans to Postgres in one transaction; if the
+    batch fails, apply its rows one at a time. Returns the number of spool rows
+    drained (0 when the spool is empty or nothing could be applied).
+    Raises on connection errors, leaving the rows pending.
+    """
+    batch_size = batch_size or getattr(settings, 'SCAN_SPOOL_BATCH', 200)
+    conn = _conn()
+    rows = conn.execute(
+        "SELECT id, payload FROM scan_spool WHERE drained_at IS NULL AND failed_at IS NULL "
+        "ORDER BY id LIMIT ?",
+        (batch_size,),
+    ).fetchall()
+    if not rows:
+        return 0
+
+    try:
+        scans = [_load(payload) for _, payload in rows]
+        with transaction.atomic():
+            record_scans(scans)
+    except TRANSIENT_ERRORS:
+        raise
+    except Exception:
+        logger.warning("scan spool batch of %d failed, applying row by row", len(rows), exc_info=True)
+        return _drain_rows(conn, rows)
+
+    _mark_drained(conn, [r[0] for r in rows])
+    return len(rows)
+
+
+def _drain_rows(conn, rows):
+    """Fallback for a failed batch: one transaction per row."""
+    drained = []
+    for spool_id, payload in rows:
+        try:
+            with transaction.atomic():
+                record_scans([_load(payload)])
+        except TRANSIENT_ERRORS:
+            _mark_drained(conn, drained)
+            raise
+        except Exception as e:
+            _mark_failed(conn, spool_id, e)
+        else:
+            drained.append(spool_id)
+    _mark_drained(conn, drained)
+    return len(drained)
+
+
+def _mark_drained(conn, ids):
+    if not ids:
+        return
+    marks = ",".join("?" * len(ids))
+    conn.execute(
+        f"UPDATE scan_spool SET drained_at = ?, attempts = attempts + 1, last_error = NULL WHERE id IN ({marks})",
+        [time.time()] + ids,
+    )
+
+
+def _mark_failed(conn, spool_id, error):
+    """Count the attempt; past SCAN_SPOOL_MAX_ATTEMPTS the row becomes a dead letter."""
+    conn.execute("""
+        UPDATE scan_spool
+        SET attempts = attempts + 1,
+            last_error = ?,
+            failed_at = CASE WHEN attempts + 1 >= ? THEN ? END
+        WHERE id = ?
+    """, (str(error)[:500], _max_attempts(), time.time(), spool_id))
+    logger.warning("scan spool row %s failed: %s", spool_id, error)
+
+
+def replay(from_id=None, to_id=None, since=None, failed=False):
+    """Mark a range of already-drained rows (failed=True: dead-lettered rows)
+    pending again. Returns rows reset."""
+    where, params = ["failed_at IS NOT NULL" if failed else "drained_at IS NOT NULL"], []
+    if from_id is not None:
+        where.append("id >= ?")
+        params.append(from_id)
+    if to_id is not None:
+        where.append("id <= ?")
+        params.append(to_id)
+    if since is not None:
+        where.append("enqueued_at >= ?")
+        params.append(since)
+    cur = _conn().execute(
+        f"UPDATE scan_spool SET drained_at = NULL, failed_at = NULL, attempts = 0 WHERE {' AND '.join(where)}",
+        params,
+    )
+    return cur.rowcount
+
+
+def purge(older_than_seconds):
+    """Delete drained rows older than the given age. Returns rows deleted."""
+    cur = _conn().execute(
+        "DELETE FROM scan_spool WHERE drained_at IS NOT NULL AND drained_at < ?",
+        (time.time() - older_than_seconds,),
+    )
+    return cur.rowcount
+
+
+def lag():
+    """Spool-lag metric: pending rows and age of the oldest pending scan (seconds)."""
+    conn = _conn()
+    pending, oldest, failing = conn.execute("""
+        SELECT COUNT(*), MIN(enqueued_at), SUM(CASE WHEN last_error IS NOT NULL THEN 1 ELSE 0 END)
+        FROM scan_spool WHERE drained_at IS NULL AND failed_at IS NULL
+    """).fetchone()
+    dead = conn.execute("SELECT COUNT(*) FROM scan_spool WHERE failed_at IS NOT NULL").fetchone()[0]
+    return {
+        'mode': getattr(settings, 'SCAN_INGEST_MODE', 'sync'),
+        'pending': pending,
+        'oldest_pending_age_s': round(time.time() - oldest, 3) if oldest else 0.0,
+        'failing': failing or 0,
+        'dead': dead,
+    }
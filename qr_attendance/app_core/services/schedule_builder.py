@@ -0,0 +1,329 @@
+# app_core/services/schedule_builder.py
+# Creates course_schedule_pattern rows together with their class groups
+# (class_group_schedule) and the groups' students (enrollment) in one statement:
+# pattern ids are drawn from the sequence up front so the pattern, group link
+# and enrollment INSERTs are chained CTEs over the same unnest() input. One
+# pattern from schedule_edit and a whole semester timetable (manage.py
+# import_timetable, thousands of patterns) take the same single round trip.
+#
+# A pattern that already exists for the semester (same course, teacher, day and
+# time_setting) is skipped, so re-importing a timetable only adds the new rows.
+#
+# Timetable columns (header row, case-insensitive, English or Mongolian):
+#   course       | хичээл         course code (or course_id)
+#   teacher      | багш           teacher_profile name (or teacher_id)
+#   day_of_week  | гараг          0-6 or Даваа..Ням
+#   timeslot     | цаг            time_setting name / value of the school (or time_setting_id)
+#   lesson_type  | төрөл          name / value (or lesson_type_id), optional
+#   class_room   | өрөө           room number of the school (or class_room_id)
+#   frequency    | давтамж        optional, default 1
+#   class_groups | бүлэг          group names of the semester's year, separated by ; or ,
+#                                 (or class_group_ids)
+import re
+import time
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+
+from app_core.services import ref_cache, repository
+from app_core.services.roster_import import RosterError, iter_rows
+from app_core.services.search import fold
+
+
+DAYS = ('даваа', 'мягмар', 'лхагва', 'пүрэв', 'баасан', 'бямба', 'ням')
+
+HEADERS = {
+    'course': ('course', 'course_code', 'хичээл'),
+    'course_id': ('course_id',),
+    'teacher': ('teacher', 'багш'),
+    'teacher_id': ('teacher_id',),
+    'day_of_week': ('day_of_week', 'day', 'гараг'),
+    'timeslot': ('timeslot', 'time', 'цаг'),
+    'time_setting_id': ('time_setting_id',),
+    'lesson_type': ('lesson_type', 'type', 'төрөл'),
+    'lesson_type_id': ('lesson_type_id',),
+    'class_room': ('class_room', 'room', 'өрөө'),
+    'class_room_id': ('class_room_id',),
+    'frequency': ('frequency', 'давтамж'),
+    'class_groups': ('class_groups', 'groups', 'бүлэг'),
+    'class_group_ids': ('class_group_ids',),
+}
+REQUIRED = (('course', 'course_id'), ('teacher', 'teacher_id'), 'day_of_week',
+            ('timeslot', 'time_setting_id'), ('class_groups', 'class_group_ids'))
+
+PATTERN_FIELDS = ('course_id', 'teacher_id', 'day_of_week', 'lesson_type_id', 'location_id',
+                  'frequency', 'time_setting_id', 'class_room_id')
+
+CREATE_SQL = """
+    WITH src AS (
+        SELECT nextval(pg_get_serial_sequence('course_schedule_pattern', 'id')) AS id, r.*
+        FROM unnest(
+            %(n)s::int[], %(course_id)s::bigint[], %(teacher_id)s::bigint[], %(day_of_week)s::int[],
+            %(lesson_type_id)s::bigint[], %(location_id)s::bigint[], %(frequency)s::int[],
+            %(time_setting_id)s::bigint[], %(class_room_id)s::bigint[]
+        ) AS r(n, course_id, teacher_id, day_of_week, lesson_type_id, location_id, frequency,
+               time_setting_id, class_room_id)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM course_schedule_pattern p
+            WHERE p.semester_id = %(semester_id)s
+              AND p.course_id = r.course_id
+              AND p.teacher_id = r.teacher_id
+              AND p.day_of_week = r.day_of_week
+              AND p.time_setting_id IS NOT DISTINCT FROM r.time_setting_id
+        )
+    ),
+    patterns AS (
+        INSERT INTO course_schedule_pattern
+            (id, semester_id, course_id, teacher_id, day_of_week, lesson_type_id, location_id,
+             frequency, time_setting_id, class_room_id)
+        SELECT id, %(semester_id)s, course_id, teacher_id, day_of_week, lesson_type_id, location_id,
+               frequency, time_setting_id, class_room_id
+        FROM src
+        RETURNING id
+    ),
+    links AS (
+        INSERT INTO class_group_schedule (class_group_id, course_schedule_pattern_id)
+        SELECT DISTINCT l.class_group_id, src.id
+        FROM unnest(%(link_n)s::int[], %(link_group)s::bigint[]) AS l(n, class_group_id)
+        JOIN src ON src.n = l.n
+        RETURNING id, class_group_id
+    ),
+    enrolled AS (
+        INSERT INTO enrollment (student_id, class_group_schedule_id)
+        SELECT scg.student_id, links.id
+        FROM links
+        JOIN student_class_group scg ON scg.class_group_id = links.class_group_id
+        ON CONFLICT DO NOTHING
+        RETURNING 1
+    )
+    SELECT COALESCE((SELECT array_agg(n ORDER BY n) FROM src), '{}'),
+           COALESCE((SELECT array_agg(id ORDER BY n) FROM src), '{}'),
+           (SELECT COUNT(*) FROM links),
+           (SELECT COUNT(*) FROM enrolled)
+"""
+
+
+@dataclass
+class BuildResult:
+    pattern_ids: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)    # input positions that already existed
+    groups_linked: int = 0
+    enrollments: int = 0
+
+
+@dataclass
+class TimetableResult:
+    rows_read: int = 0
+    rejects: list = field(default_factory=list)    # [(line, reason)]
+    created: int = 0
+    skipped_existing: int = 0
+    groups_linked: int = 0
+    enrollments: int = 0
+    read_seconds: float = 0.0
+    write_seconds: float = 0.0
+    dry_run: bool = False
+
+    @property
+    def seconds(self):
+        return self.read_seconds + self.write_seconds
+
+
+def create_patterns(semester_id, patterns):
+    """
+    Insert patterns of one semester with their class groups and enrollments.
+
+    patterns: [{course_id, teacher_id, day_of_week, lesson_type_id, location_id,
+    frequency, time_setting_id, class_room_id, class_group_ids}]; missing optional
+    keys are NULL (frequency 1). Returns a BuildResult.
+    """
+    params = {key: [] for key in ('n',) + PATTERN_FIELDS}
+    params.update(semester_id=semester_id, link_n=[], link_group=[])
+    for n, pattern in enumerate(patterns):
+        params['n'].append(n)
+        for key in PATTERN_FIELDS:
+            value = pattern.get(key)
+            params[key].append(int(value) if value not in (None, '') else (1 if key == 'frequency' else None))
+        for group_id in pattern.get('class_group_ids') or ():
+            params['link_n'].append(n)
+            params['link_group'].append(int(group_id))
+
+    if not params['n']:
+        return BuildResult()
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL, params)
+        created, ids, linked, enrolled = cursor.fetchone()
+    return BuildResult(
+        pattern_ids=list(ids),
+        skipped=sorted(set(params['n']) - set(created)),
+        groups_linked=linked,
+        enrollments=enrolled,
+    )
+
+
+def create_pattern(semester_id, class_group_ids, **fields):
+    """One pattern (schedule_edit). Returns its id, or None if it already exists."""
+    result = create_patterns(semester_id, [{**fields, 'class_group_ids': class_group_ids}])
+    return result.pattern_ids[0] if result.pattern_ids else None
+
+
+# ---- timetable import ----
+
+class _Resolver:
+    """Names in a timetable row -> ids, from maps loaded once per import."""
+
+    def __init__(self, semester):
+        self.semester = semester
+        school_id = semester.school_id
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT id, code FROM course")
+            courses = cursor.fetchall()
+            cursor.execute("SELECT id, name FROM teacher_profile")
+            teachers = cursor.fetchall()
+        self.course_ids = {r[0] for r in courses}
+        self.courses = _index((fold(code), course_id) for course_id, code in courses if code)
+        self.teacher_ids = {r[0] for r in teachers}
+        self.teachers = _index((fold(name), teacher_id) for teacher_id, name in teachers if name)
+
+        slots = ref_cache.timeslots(school_id) if school_id else ref_cache.timeslots()
+        self.slot_ids = {t['id'] for t in slots}
+        self.slots = _index(
+            (fold(key), t['id']) for t in slots for key in {t['name'], t['value']} if key
+        )
+        lesson_types = ref_cache.lesson_types()
+        self.lesson_type_ids = {lt['id'] for lt in lesson_types}
+        self.lesson_types = _index(
+            (fold(key), lt['id']) for lt in lesson_types for key in {lt['name'], lt['value']} if key
+        )
+        rooms = repository.class_rooms(school_id) if school_id else ()
+        self.room_ids = {r.id for r in rooms}
+        self.rooms = _index((fold(str(r.room_number)), r.id) for r in rooms)
+        groups = repository.class_groups(school_id, semester.school_year)
+        self.group_ids = {g.id for g in groups}
+        self.groups = _index((fold(g.name), g.id) for g in groups)
+
+    def _one(self, values, name_key, id_key, known_ids, by_name, label, required=True):
+        """(id or None, reject reason or None)."""
+        if values.get(id_key):
+            try:
+                value = int(values[id_key])
+            except ValueError:
+                return None, f'{id_key} тоо биш'
+            if value not in known_ids:
+                return None, f'{id_key} {value} олдсонгүй'
+            return value, None
+        name = values.get(name_key, '')
+        if not name:
+            return None, (f'{label} хоосон' if required else None)
+        ids = by_name.get(fold(name), [])
+        if not ids:
+            return None, f'{label} "{name}" олдсонгүй'
+        if len(ids) > 1:
+            return None, f'{label} "{name}" олон байна - {id_key} заана уу'
+        return ids[0], None
+
+    def _day(self, text):
+        text = fold(text)
+        if text.isdigit() and 0 <= int(text) <= 6:
+            return int(text)
+        return DAYS.index(text) if text in DAYS else None
+
+    def _groups(self, values):
+        if values.get('class_group_ids'):
+            try:
+                ids = [int(x) for x in re.split(r'[;,|\s]+', values['class_group_ids']) if x]
+            except ValueError:
+                return None, 'class_group_ids тоо биш'
+            missing = [str(i) for i in ids if i not in self.group_ids]
+            if missing:
+                return None, f'class_group_ids {", ".join(missing)} энэ сургууль/онд олдсонгүй'
+            return ids, None
+        ids = []
+        for name in re.split(r'[;,|]', values.get('class_groups', '')):
+            name = name.strip()
+            if not name:
+                continue
+            found = self.groups.get(fold(name), [])
+            if len(found) != 1:
+                return None, f'бүлэг "{name}" {"олон байна" if found else "олдсонгүй"}'
+            ids.append(found[0])
+        if not ids:
+            return None, 'бүлэг хоосон'
+        return ids, None
+
+    def pattern(self, values):
+        """(pattern dict or None, reject reason or None)."""
+        pattern = {'location_id': self.semester.school_id}
+        for key, name_key, id_key, known, by_name, label, required in (
+            ('course_id', 'course', 'course_id', self.course_ids, self.courses, 'хичээл', True),
+            ('teacher_id', 'teacher', 'teacher_id', self.teacher_ids, self.teachers, 'багш', True),
+            ('time_setting_id', 'timeslot', 'time_setting_id', self.slot_ids, self.slots, 'цаг', True),
+            ('lesson_type_id', 'lesson_type', 'lesson_type_id', self.lesson_type_ids, self.lesson_types,
+             'төрөл', False),
+            ('class_room_id', 'class_room', 'class_room_id', self.room_ids, self.rooms, 'өрөө', False),
+        ):
+            pattern[key], reason = self._one(values, name_key, id_key, known, by_name, label, required)
+            if reason:
+                return None, reason
+
+        pattern['day_of_week'] = self._day(values.get('day_of_week', ''))
+        if pattern['day_of_week'] is None:
+            return None, f'гараг "{values.get("day_of_week", "")}" буруу (0-6 эсвэл Даваа..Ням)'
+        frequency = values.get('frequency') or '1'
+        if not frequency.isdigit() or int(frequency) < 1:
+            return None, 'давтамж 1-ээс бага биш бүхэл тоо байна'
+        pattern['frequency'] = int(frequency)
+
+        pattern['class_group_ids'], reason = self._groups(values)
+        if reason:
+            return None, reason
+        return pattern, None
+
+
+def _index(pairs):
+    index = {}
+    for key, value in pairs:
+        index.setdefault(key, []).append(value)
+    return index
+
+
+def _key(pattern):
+    return (pattern['course_id'], pattern['teacher_id'], pattern['day_of_week'], pattern['time_setting_id'])
+
+
+def import_timetable(fileobj, filename, semester_id, dry_run=False):
+    """
+    Validate a timetable file against the semester's school and create its
+    patterns in one statement. Returns a TimetableResult; dry_run rolls back.
+    """
+    semester = repository.semester(semester_id)
+    if semester is None:
+        raise RosterError(f'семестр {semester_id} олдсонгүй')
+
+    result = TimetableResult(dry_run=dry_run)
+    t0 = time.perf_counter()
+    resolver = _Resolver(semester)
+    patterns, seen = [], {}
+    for line, values in iter_rows(fileobj, filename, headers=HEADERS, required=REQUIRED):
+        result.rows_read += 1
+        pattern, reason = resolver.pattern(values)
+        if pattern and _key(pattern) in seen:
+            reason = f'{seen[_key(pattern)]}-р мөртэй давхардсан'
+        if reason:
+            result.rejects.append((line, reason))
+            continue
+        seen[_key(pattern)] = line
+        patterns.append(pattern)
+    result.read_seconds = time.perf_counter() - t0
+
+    t1 = time.perf_counter()
+    with transaction.atomic():
+        built = create_patterns(semester_id, patterns)
+        if dry_run:
+            transaction.set_rollback(True)
+    result.write_seconds = time.perf_counter() - t1
+
+    result.created = len(built.pattern_ids)
+    result.skipped_existing = len(built.skipped)
+    result.groups_linked = built.groups_linked
+    result.enrollments = built.enrollments
+    return result
@@ -0,0 +1,124 @@
+# app_core/services/search.py
+# Typeahead search over students (student_code, full_name) and courses
+# (code, name) backed by the expression indexes in app_core/sql/search_index.sql.
+# Pages ask for the top-k matches as the user types instead of rendering every
+# student into the HTML. Ranking: exact code, code prefix, name prefix, then
+# trigram similarity (so "Батболд" still finds "Батболт").
+# The SQL expressions must stay identical to the indexed ones in search_index.sql.
+from django.db import connection
+
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 500
+TRIGRAM_MIN = 3   # pg_trgm 3-тэмдэгтээс богино үгэнд index ашиглаж чадахгүй
+
+# search_fold()-тэй ижил: Кирилл томыг жижиг болгоод lower()
+_UPPER = 'АБВГДЕЁЖЗИЙКЛМНОӨПРСТУҮФХЦЧШЩЪЫЬЭЮЯ'
+_LOWER = 'абвгдеёжзийклмноөпрстуүфхцчшщъыьэюя'
+_FOLD = str.maketrans(_UPPER, _LOWER)
+
+STUDENT_CODE = 'search_fold(s.student_code)'
+STUDENT_NAME = 'search_fold(s.full_name)'
+STUDENT_HAY = f"{STUDENT_CODE} || ' ' || {STUDENT_NAME}"
+
+COURSE_CODE = 'search_fold(c.code)'
+COURSE_NAME = 'search_fold(c.name)'
+COURSE_HAY = f"{COURSE_CODE} || ' ' || {COURSE_NAME}"
+
+IN_CLASS_GROUP = """ AND EXISTS (
+    SELECT 1 FROM student_class_group scg
+    WHERE scg.student_id = s.id AND scg.class_group_id = %(class_group_id)s
+)"""
+
+
+def fold(text):
+    return (text or '').strip().translate(_FOLD).lower()
+
+
+def _like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _clamp(limit):
+    try:
+        limit = int(limit or DEFAULT_LIMIT)
+    except (TypeError, ValueError):
+        limit = DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _match(code, name, hay, q):
+    """WHERE condition for a folded query; '' for an empty query."""
+    if not q:
+        return ''
+    condition = f'{code} LIKE %(prefix)s OR {name} LIKE %(prefix)s'
+    if len(q) >= TRIGRAM_MIN:
+        condition += f' OR ({hay}) LIKE %(contains)s OR ({hay}) %% %(q)s'
+    return f' AND ({condition})'
+
+
+def _order(code, name, hay, key, q):
+    if not q:
+        return f'{name}, {key}'
+    return (f'{code} = %(q)s DESC, {code} LIKE %(prefix)s DESC, {name} LIKE %(prefix)s DESC, '
+            f'similarity({hay}, %(q)s) DESC, {name}, {key}')
+
+
+def contains_pattern(text):
+    """LIKE pattern for "hay contains text" against STUDENT_HAY / COURSE_HAY."""
+    return '%' + _like_escape(fold(text)) + '%'
+
+
+def _params(q, limit, **extra):
+    escaped = _like_escape(q)
+    return {'q': q, 'prefix': escaped + '%', 'contains': '%' + escaped + '%', 'limit': _clamp(limit), **extra}
+
+
+def students(q, limit=DEFAULT_LIMIT, class_group_id=None):
+    """[{'id', 'student_code', 'full_name'}] best matches first.
+
+    Empty q lists by name - only useful together with class_group_id
+    (the members of one group).
+    """
+    q = fold(q)
+    sql = f"""
+        SELECT s.id, COALESCE(s.student_code, ''), COALESCE(s.full_name, '')
+        FROM student s
+        WHERE TRUE{_match(STUDENT_CODE, STUDENT_NAME, STUDENT_HAY, q)}{IN_CLASS_GROUP if class_group_id else ''}
+        ORDER BY {_order(STUDENT_CODE, STUDENT_NAME, STUDENT_HAY, 's.id', q)}
+        LIMIT %(limit)s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, _params(q, limit, class_group_id=class_group_id))
+        return [{'id': r[0], 'student_code': r[1], 'full_name': r[2]} for r in cursor.fetchall()]
+
+
+def courses(q, limit=DEFAULT_LIMIT):
+    """[{'id', 'code', 'name'}] best matches first."""
+    q = fold(q)
+    sql = f"""
+        SELECT c.id, COALESCE(c.code, ''), COALESCE(c.name, '')
+        FROM course c
+        WHERE TRUE{_match(COURSE_CODE, COURSE_NAME, COURSE_HAY, q)}
+        ORDER BY {_order(COURSE_CODE, COURSE_NAME, COURSE_HAY, 'c.id', q)}
+        LIMIT %(limit)s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, _params(q, limit))
+        return [{'id': r[0], 'code': r[1], 'name': r[2]} for r in cursor.fetchall()]
+
+
+def student_id_exact(text):
+    """id of the student whose code (preferred) or full name equals text, case-folded; or None."""
+    q = fold(text)
+    if not q:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT s.id FROM student s
+            WHERE {STUDENT_CODE} = %(q)s OR {STUDENT_NAME} = %(q)s
+            ORDER BY {STUDENT_CODE} = %(q)s DESC, s.id
+            LIMIT 1
+        """, {'q': q})
+        row = cursor.fetchone()
+    return row[0] if row else None
@@ -0,0 +1,141 @@
+# app_core/services/session_cache.py
+# In-process token -> session/location snapshot cache for the QR scan path.
+# A scan burst hits the same token hundreds of times; only the first request
+# per worker touches class_session/course/time_setting/lesson_type/location.
+import threading
+import time
+
+import pytz
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+
+SNAPSHOT_SQL = """
+    SELECT cs.id, cs.course_id, c.name, c.code, cs.date,
+           ts.value AS timeslot, lt.name AS lesson_type,
+           cs.location_id, cs.token, cs.expires_at, cs.name,
+           l.id, l.name, l.latitude, l.longitude, l.radius_m
+    FROM class_session cs
+    JOIN course c ON c.id = cs.course_id
+    LEFT JOIN time_setting ts ON ts.id = cs.time_setting_id
+    LEFT JOIN lesson_type lt ON lt.id = cs.lesson_type_id
+    LEFT JOIN location l ON l.id = cs.location_id
+    WHERE {where}
+    LIMIT 1
+"""
+
+_lock = threading.Lock()
+_entries = {}   # token or 'id:<session_id>' -> (monotonic deadline, snapshot)
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+
+def _max_ttl():
+    # Өөр worker дээр хийсэн засвар хамгийн ихдээ энэ хугацаанд хоцорно
+    return getattr(settings, 'SESSION_CACHE_MAX_TTL', 60)
+
+
+def _aware(dt):
+    if dt and timezone.is_naive(dt):
+        return timezone.make_aware(dt, pytz.utc)
+    return dt
+
+
+def _load(where, param):
+    with connection.cursor() as cursor:
+        cursor.execute(SNAPSHOT_SQL.format(where=where), [param])
+        row = cursor.fetchone()
+    if not row:
+        return None
+    return {
+        'session': {
+            'id': row[0],
+            'course_id': row[1],
+            'course_name': row[2],
+            'course_code': row[3],
+            'date': row[4],
+            'timeslot': row[5],
+            'lesson_type': row[6],
+            'location_id': row[7],
+            'token': str(row[8]),
+            'expires_at': _aware(row[9]),
+            'name': row[10],
+        },
+        'location': {
+            'id': row[11],
+            'name': row[12],
+            'latitude': row[13],
+            'longitude': row[14],
+            'radius_m': row[15],
+        } if row[11] else None,
+    }
+
+
+def _evict_expired(now):
+    """Drop entries past their deadline (caller holds _lock); runs on insert, i.e. on misses."""
+    for key in [k for k, (deadline, _) in _entries.items() if deadline <= now]:
+        del _entries[key]
+        _stats['evictions'] += 1
+
+
+def _get(key, where, param):
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] > now:
+            _stats['hits'] += 1
+            return entry[1]
+        _stats['misses'] += 1
+        if entry:
+            del _entries[key]
+
+    snapshot = _load(where, param)
+    if snapshot is None:
+        return None
+
+    ttl = _max_ttl()
+    expires_at = snapshot['session']['expires_at']
+    if expires_at:
+        ttl = min(ttl, (expires_at - timezone.now()).total_seconds())
+    if ttl > 0:
+        with _lock:
+            _evict_expired(time.monotonic())
+            _entries[key] = (now + ttl, snapshot)
+    return snapshot
+
+
+def get_session(token):
+    """
+    Return {'session': {...}, 'location': {...} | None} for a QR token, or None.
+    Cached until min(expires_at, SESSION_CACHE_MAX_TTL); unknown tokens are not cached.
+    """
+    return _get(str(token), 'cs.token = %s', str(token))
+
+
+def get_session_by_id(session_id):
+    """Same snapshot, keyed by class_session.id (rotating signed QR tokens carry the id)."""
+    return _get(f'id:{int(session_id)}', 'cs.id = %s', int(session_id))
+
+
+def invalidate(token=None):
+    """Drop one token (or everything when token is None)."""
+    with _lock:
+        if token is None:
+            _entries.clear()
+        else:
+            token = str(token)
+            _entries.pop(token, None)
+            for key in [k for k, (_, snap) in _entries.items() if snap['session']['token'] == token]:
+                del _entries[key]
+        _stats['invalidations'] += 1
+
+
+def stats():
+    """Hit/miss counters for this worker process."""
+    with _lock:
+        total = _stats['hits'] + _stats['misses']
+        return {
+            **_stats,
+            'size': len(_entries),
+            'hit_rate': round(_stats['hits'] / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,39 @@
+# app_core/services/session_prefill.py
+# Pre-register every student of a pattern as "Тасалсан" (absent) when a
+# session is created. One INSERT ... SELECT over the class-group join instead
+# of one INSERT per student; ON CONFLICT makes re-runs a no-op.
+from django.db import connection
+from django.utils import timezone
+
+from app_core.services import ref_cache
+
+
+PREREGISTER_ABSENT_SQL = """
+    INSERT INTO attendance
+        (session_id, student_id, "timestamp", attendance_type_id, device_id, device_info)
+    SELECT DISTINCT %(session_id)s, scg.student_id, %(marked_at)s,
+           %(absent_type_id)s,
+           'pre-registered', 'Автоматаар тасалсан'
+    FROM class_group_schedule cgs
+    INNER JOIN student_class_group scg ON scg.class_group_id = cgs.class_group_id
+    WHERE cgs.course_schedule_pattern_id = %(pattern_id)s
+    ON CONFLICT (session_id, student_id) DO NOTHING
+"""
+
+
+def preregister_absent(session_id, pattern_id, marked_at=None):
+    """
+    Insert an absent attendance row for every student of the pattern's class
+    groups. Existing rows (already scanned, or a previous run) are left alone.
+    Returns the number of rows inserted.
+    """
+    if not session_id or not pattern_id:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(PREREGISTER_ABSENT_SQL, {
+            'session_id': session_id,
+            'pattern_id': pattern_id,
+            'marked_at': marked_at or timezone.now(),
+            'absent_type_id': ref_cache.attendance_type_id('absent'),
+        })
+        return cursor.rowcount
@@ -0,0 +1,108 @@
+# app_core/services/session_roster.py
+# Per-session enrollment roster: the set of student ids allowed to scan a
+# session, built once when the session is created (or lazily on first scan in
+# another worker). Membership and duplicate-scan checks become set lookups
+# instead of the class_group_schedule -> student_class_group ->
+# course_schedule_pattern join on every scan.
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+
+# Same rule as the old per-scan COUNT(*): any class group scheduled for the
+# session's course.
+ROSTER_SQL = """
+    SELECT DISTINCT scg.student_id
+    FROM class_group_schedule cgs
+    INNER JOIN student_class_group scg ON scg.class_group_id = cgs.class_group_id
+    INNER JOIN course_schedule_pattern csp ON csp.id = cgs.course_schedule_pattern_id
+    WHERE csp.course_id = %s
+"""
+
+_lock = threading.Lock()
+_rosters = {}   # session_id -> {'deadline', 'members': frozenset, 'scanned': set}
+_stats = {'builds': 0, 'hits': 0, 'invalidations': 0, 'evictions': 0}
+
+
+def _ttl(expires_at):
+    # Snapshot-оос тусдаа дээд хугацаа: roster нь session-ийн туршид бараг өөрчлөгддөггүй
+    ttl = getattr(settings, 'SESSION_ROSTER_MAX_TTL', 900)
+    if expires_at:
+        ttl = min(ttl, (expires_at - timezone.now()).total_seconds())
+    return ttl
+
+
+def build(session_id, course_id, expires_at=None):
+    """(Re)build the roster for a session. Returns the member frozenset."""
+    with connection.cursor() as cursor:
+        cursor.execute(ROSTER_SQL, [course_id])
+        members = frozenset(r[0] for r in cursor.fetchall())
+
+    ttl = _ttl(expires_at)
+    now = time.monotonic()
+    with _lock:
+        _stats['builds'] += 1
+        _evict_expired(now)
+        if ttl > 0:
+            _rosters[int(session_id)] = {
+                'deadline': now + ttl,
+                'members': members,
+                'scanned': set(),
+            }
+    return members
+
+
+def _evict_expired(now):
+    """Drop rosters past their deadline (caller holds _lock)."""
+    for key in [k for k, entry in _rosters.items() if entry['deadline'] <= now]:
+        del _rosters[key]
+        _stats['evictions'] += 1
+
+
+def _entry(session_id):
+    entry = _rosters.get(int(session_id))
+    if entry and entry['deadline'] > time.monotonic():
+        return entry
+    return None
+
+
+def is_enrolled(session, student_id):
+    """`session` is a session_cache snapshot['session']."""
+    with _lock:
+        entry = _entry(session['id'])
+        if entry:
+            _stats['hits'] += 1
+            return student_id in entry['members']
+    return student_id in build(session['id'], session['course_id'], session.get('expires_at'))
+
+
+def already_scanned(session_id, student_id):
+    """True if this worker already recorded the student for the session."""
+    with _lock:
+        entry = _entry(session_id)
+        return bool(entry) and student_id in entry['scanned']
+
+
+def mark_scanned(session_id, student_id):
+    with _lock:
+        entry = _entry(session_id)
+        if entry:
+            entry['scanned'].add(student_id)
+
+
+def invalidate(session_id=None):
+    """Drop one roster, or all of them when class-group membership changes."""
+    with _lock:
+        if session_id is None:
+            _rosters.clear()
+        else:
+            _rosters.pop(int(session_id), None)
+        _stats['invalidations'] += 1
+
+
+def stats():
+    with _lock:
+        return {**_stats, 'size': len(_rosters)}
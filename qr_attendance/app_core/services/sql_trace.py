@@ -0,0 +1,122 @@
+# app_core/services/sql_trace.py
+# Per-request SQL accounting for SqlTraceMiddleware. A Trace is installed with
+# connection.execute_wrapper(), so every connection.cursor().execute() in the
+# views and services is counted without touching them: query count, total SQL
+# time, the slowest statements, statements repeated with different params
+# (N+1 loops) and exact duplicates (same SQL and params).
+#
+# Budgets (settings SQL_QUERY_BUDGETS) cap the query count per URL name; with
+# SQL_BUDGET_RAISE on (tests, bench runs) an over-budget request raises
+# QueryBudgetExceeded, otherwise it is logged.
+import json
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+
+
+logger = logging.getLogger('app_core.sql')
+
+SQL_PREVIEW = 300   # логт statement-ийн эхний хэсэг
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more queries than its SQL_QUERY_BUDGETS entry."""
+
+
+class Trace:
+    def __init__(self, slow_ms=None, top=None):
+        self.slow_ms = getattr(settings, 'SQL_TRACE_SLOW_MS', 200) if slow_ms is None else slow_ms
+        self.top = getattr(settings, 'SQL_TRACE_TOP', 3) if top is None else top
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()      # sql -> executions
+        self.duplicates = Counter()      # (sql, params) -> executions
+        self.slowest = []                # [(seconds, sql)], self.top хүртэл
+
+    def __call__(self, execute, sql, params, many, context):
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self._record(sql, params, time.perf_counter() - t0)
+
+    def _record(self, sql, params, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[sql] += 1
+        try:
+            self.duplicates[(sql, repr(params))] += 1
+        except Exception:
+            pass
+        if len(self.slowest) < self.top or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, sql))
+            self.slowest.sort(key=lambda s: s[0], reverse=True)
+            del self.slowest[self.top:]
+
+    @property
+    def ms(self):
+        return self.seconds * 1000
+
+    def repeated(self, min_count=2):
+        """[(sql, executions)] run more than once in this request, most first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= min_count]
+
+    def duplicate_count(self):
+        """Executions that repeated an earlier statement with the same params."""
+        return sum(n - 1 for n in self.duplicates.values() if n > 1)
+
+    def has_slow(self):
+        return bool(self.slowest) and self.slowest[0][0] * 1000 >= self.slow_ms
+
+    def server_timing(self):
+        return f'db;dur={self.ms:.1f};desc="{self.count} queries"'
+
+    def as_dict(self):
+        return {
+            'queries': self.count,
+            'sql_ms': round(self.ms, 1),
+            'duplicates': self.duplicate_count(),
+            'repeated': [{'sql': sql[:SQL_PREVIEW], 'count': n} for sql, n in self.repeated()[:self.top]],
+            'slowest': [{'sql': sql[:SQL_PREVIEW], 'ms': round(s * 1000, 1)} for s, sql in self.slowest],
+        }
+
+
+def budget_for(url_name):
+    """Query budget for a URL name ('*' is the default); None = no budget."""
+    budgets = getattr(settings, 'SQL_QUERY_BUDGETS', {})
+    if url_name and url_name in budgets:
+        return budgets[url_name]
+    return budgets.get('*')
+
+
+def report(trace, request, response, total_seconds):
+    """Server-Timing header, structured log line and budget check for one request."""
+    match = getattr(request, 'resolver_match', None)
+    url_name = match.view_name if match else None
+    budget = budget_for(url_name)
+    over = budget is not None and trace.count > budget
+
+    response['Server-Timing'] = f'{trace.server_timing()}, app;dur={total_seconds * 1000:.1f}'
+
+    mode = getattr(settings, 'SQL_TRACE_LOG', 'budget')
+    if mode == 'all' or (mode == 'budget' and (over or trace.has_slow())):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': url_name,
+            'status': response.status_code,
+            'ms': round(total_seconds * 1000, 1),
+            'budget': budget,
+            **trace.as_dict(),
+        }
+        level = logging.WARNING if over or trace.has_slow() else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False, default=str))
+
+    if over and getattr(settings, 'SQL_BUDGET_RAISE', False):
+        repeated = ', '.join(f'{n}x {sql[:80]}' for sql, n in trace.repeated()[:3])
+        raise QueryBudgetExceeded(
+            f'{url_name or request.path}: {trace.count} queries > budget {budget}'
+            + (f' (repeated: {repeated})' if repeated else '')
+        )
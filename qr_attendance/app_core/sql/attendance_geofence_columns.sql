@@ -0,0 +1,4 @@
+-- Geofence recheck result columns (manage.py recheck_geofence --write-back)
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS geofence_distance_m REAL;     /* NULL = GPS/байршилгүй */
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS geofence_ok BOOLEAN;
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS geofence_checked_at TIMESTAMP WITHOUT TIME ZONE;
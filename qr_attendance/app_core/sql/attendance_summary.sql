@@ -0,0 +1,141 @@
+-- Per-student per-course per-semester attendance totals (student_attendance page).
+-- Maintained by statement-level triggers on attendance, so every write path
+-- (scan submit, spool worker, teacher marking, absent pre-registration) keeps it
+-- current; `manage.py attendance_summary_check` compares it with attendance and
+-- can rebuild drifted rows.
+--
+-- Counts are by attendance_type kind (attendance_type_kind(): value code, then
+-- name - the same rule as ref_cache.attendance_type_kind), not by fixed ids.
+--
+-- total_count = RECORDED attendance rows for the student in that course/semester,
+-- not sessions held. Session creation pre-registers enrolled students as absent,
+-- so the two usually agree, but a session without a row for the student (added
+-- to the group later, row deleted) is not counted. Pages label it "Бүртгэгдсэн".
+--
+-- Requires class_session_semester.sql (semester_id, attendance_course_semester).
+
+CREATE TABLE IF NOT EXISTS attendance_summary (
+    student_id    BIGINT   NOT NULL,
+    course_id     BIGINT   NOT NULL,
+    semester_id   BIGINT   NOT NULL,
+    present_count INTEGER  NOT NULL DEFAULT 0,   /* kind 'present' */
+    absent_count  INTEGER  NOT NULL DEFAULT 0,   /* 'absent' */
+    late_count    INTEGER  NOT NULL DEFAULT 0,   /* 'late' */
+    excused_count INTEGER  NOT NULL DEFAULT 0,   /* 'excused' */
+    total_count   INTEGER  NOT NULL DEFAULT 0,   /* recorded rows, any type */
+    updated_at    TIMESTAMP WITHOUT TIME ZONE DEFAULT now(),
+    PRIMARY KEY (student_id, course_id, semester_id)
+);
+CREATE INDEX IF NOT EXISTS attendance_summary_course_idx ON attendance_summary (course_id, semester_id);
+
+
+-- 'present' / 'absent' / 'late' / 'excused' (or NULL) for an attendance_type row:
+-- the value code if it is one, else the first kind whose Mongolian name occurs in
+-- the name. Keep in step with ref_cache.TYPE_MATCH.
+CREATE OR REPLACE FUNCTION attendance_type_kind(p_name TEXT, p_value TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE
+        WHEN p_value IN ('present', 'absent', 'late', 'excused') THEN p_value
+        WHEN position('ирсэн' IN lower(p_name)) > 0 THEN 'present'
+        WHEN position('тасалсан' IN lower(p_name)) > 0 THEN 'absent'
+        WHEN position('хоцорсон' IN lower(p_name)) > 0 THEN 'late'
+        WHEN position('чөлөө' IN lower(p_name)) > 0 THEN 'excused'
+    END
+$$;
+
+
+-- One upsert per statement: +1 for new rows, -1 for old rows, summed per key.
+-- An UPDATE that keeps attendance_type_id nets out to zero and touches nothing.
+CREATE OR REPLACE FUNCTION attendance_summary_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    delta_sql TEXT;
+BEGIN
+    delta_sql := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT session_id, student_id, attendance_type_id, 1 AS d FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT session_id, student_id, attendance_type_id, -1 AS d FROM old_rows'
+        ELSE 'SELECT session_id, student_id, attendance_type_id, 1 AS d FROM new_rows
+              UNION ALL
+              SELECT session_id, student_id, attendance_type_id, -1 AS d FROM old_rows'
+    END;
+
+    EXECUTE format($f$
+        INSERT INTO attendance_summary AS sm
+            (student_id, course_id, semester_id,
+             present_count, absent_count, late_count, excused_count, total_count, updated_at)
+        SELECT * FROM (
+            SELECT x.student_id, cs.course_id, sem.id AS semester_id,
+                   COALESCE(SUM(x.d) FILTER (WHERE t.kind = 'present'), 0) AS present_count,
+                   COALESCE(SUM(x.d) FILTER (WHERE t.kind = 'absent'), 0) AS absent_count,
+                   COALESCE(SUM(x.d) FILTER (WHERE t.kind = 'late'), 0) AS late_count,
+                   COALESCE(SUM(x.d) FILTER (WHERE t.kind = 'excused'), 0) AS excused_count,
+                   SUM(x.d) AS total_count,
+                   now() AS updated_at
+            FROM (%s) x
+            JOIN class_session cs ON cs.id = x.session_id
+            LEFT JOIN (SELECT id, attendance_type_kind(name, value) AS kind FROM attendance_type) t
+                   ON t.id = x.attendance_type_id
+            CROSS JOIN LATERAL (SELECT COALESCE(cs.semester_id, attendance_course_semester(cs.course_id, cs.date)) AS id) sem
+            WHERE sem.id IS NOT NULL
+            GROUP BY x.student_id, cs.course_id, sem.id
+        ) d
+        WHERE (d.present_count, d.absent_count, d.late_count, d.excused_count, d.total_count)
+              <> (0, 0, 0, 0, 0)
+        ON CONFLICT (student_id, course_id, semester_id) DO UPDATE SET
+            present_count = sm.present_count + EXCLUDED.present_count,
+            absent_count  = sm.absent_count  + EXCLUDED.absent_count,
+            late_count    = sm.late_count    + EXCLUDED.late_count,
+            excused_count = sm.excused_count + EXCLUDED.excused_count,
+            total_count   = sm.total_count   + EXCLUDED.total_count,
+            updated_at    = now()
+    $f$, delta_sql);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS attendance_summary_ins ON attendance;
+DROP TRIGGER IF EXISTS attendance_summary_upd ON attendance;
+DROP TRIGGER IF EXISTS attendance_summary_del ON attendance;
+CREATE TRIGGER attendance_summary_ins AFTER INSERT ON attendance
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_summary_sync();
+CREATE TRIGGER attendance_summary_upd AFTER UPDATE ON attendance
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_summary_sync();
+CREATE TRIGGER attendance_summary_del AFTER DELETE ON attendance
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION attendance_summary_sync();
+
+
+-- fk_att_session is ON DELETE CASCADE; the cascaded delete would run after the
+-- class_session row is gone and the trigger could no longer resolve the course.
+-- Delete the attendance first, while the session still exists.
+CREATE OR REPLACE FUNCTION class_session_drop_attendance() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM attendance WHERE session_id = OLD.id;
+    RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS class_session_drop_attendance ON class_session;
+CREATE TRIGGER class_session_drop_attendance BEFORE DELETE ON class_session
+    FOR EACH ROW EXECUTE FUNCTION class_session_drop_attendance();
+
+
+-- Initial fill (manage.py attendance_summary_check --rebuild does the same).
+INSERT INTO attendance_summary
+    (student_id, course_id, semester_id,
+     present_count, absent_count, late_count, excused_count, total_count)
+SELECT a.student_id, cs.course_id, sem.id,
+       COUNT(*) FILTER (WHERE t.kind = 'present'),
+       COUNT(*) FILTER (WHERE t.kind = 'absent'),
+       COUNT(*) FILTER (WHERE t.kind = 'late'),
+       COUNT(*) FILTER (WHERE t.kind = 'excused'),
+       COUNT(*)
+FROM attendance a
+JOIN class_session cs ON cs.id = a.session_id
+LEFT JOIN (SELECT id, attendance_type_kind(name, value) AS kind FROM attendance_type) t
+       ON t.id = a.attendance_type_id
+CROSS JOIN LATERAL (SELECT COALESCE(cs.semester_id, attendance_course_semester(cs.course_id, cs.date)) AS id) sem
+WHERE sem.id IS NOT NULL
+GROUP BY a.student_id, cs.course_id, sem.id
+ON CONFLICT (student_id, course_id, semester_id) DO NOTHING;
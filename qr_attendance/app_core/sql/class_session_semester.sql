@@ -0,0 +1,40 @@
+-- class_session.semester_id: the semester a session belongs to, resolved once
+-- (creation time / manage.py backfill_session_semester) instead of matching
+-- EXTRACT(YEAR/MONTH FROM cs.date) against semester.school_year/term per query.
+-- Run before attendance_summary.sql.
+
+ALTER TABLE class_session ADD COLUMN IF NOT EXISTS semester_id BIGINT;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'fk_class_session_semester') THEN
+        ALTER TABLE class_session
+            ADD CONSTRAINT fk_class_session_semester FOREIGN KEY (semester_id)
+            REFERENCES semester(id) ON DELETE SET NULL NOT VALID;
+    END IF;
+END $$;
+
+-- course + semester (student pages, exports, summary), semester-wide scans,
+-- teacher + course + semester (pattern_detail)
+CREATE INDEX IF NOT EXISTS class_session_course_semester_idx ON class_session (course_id, semester_id, date);
+CREATE INDEX IF NOT EXISTS class_session_semester_idx ON class_session (semester_id);
+CREATE INDEX IF NOT EXISTS class_session_teacher_course_semester_idx
+    ON class_session (teacher_id, course_id, semester_id, date);
+
+
+-- Session -> semester: the course's scheduled semester whose dates contain the
+-- session, falling back to the school_year/term month rule the pages used.
+-- Used by session-creating views without a pattern, the backfill command and
+-- as a fallback for sessions whose semester_id is still NULL.
+CREATE OR REPLACE FUNCTION attendance_course_semester(p_course_id BIGINT, p_date DATE)
+RETURNS BIGINT LANGUAGE sql STABLE AS $$
+    SELECT sem.id
+    FROM course_schedule_pattern csp
+    JOIN semester sem ON sem.id = csp.semester_id
+    WHERE csp.course_id = p_course_id
+      AND (p_date BETWEEN sem.start_date AND sem.end_date
+           OR (sem.school_year = EXTRACT(YEAR FROM p_date)
+               AND sem.term = CASE WHEN EXTRACT(MONTH FROM p_date) BETWEEN 8 AND 12 THEN 1 ELSE 2 END))
+    ORDER BY (p_date BETWEEN sem.start_date AND sem.end_date) DESC, sem.id DESC
+    LIMIT 1
+$$;
@@ -0,0 +1,114 @@
+-- Admin dashboard metrics in one row (app_core/services/dashboard_metrics.py).
+--
+-- Counters (users, teachers, courses, locations) are kept current by
+-- statement-level triggers on app_user / course / location, so every write
+-- path - admin CRUD, registration, imports - updates them. TRUNCATE is not
+-- covered; re-run this file or `manage.py refresh_dashboard_metrics --recount`.
+--
+-- Time-window stats (today's sessions, scans in the last hour, attendance rate
+-- per school) go stale by themselves and are refreshed only by
+-- `manage.py refresh_dashboard_metrics` (cron, or --every N as a worker); the
+-- dashboard reads the row and shows stats_refreshed_at.
+
+CREATE TABLE IF NOT EXISTS dashboard_metrics (
+    id                 SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    total_users        BIGINT   NOT NULL DEFAULT 0,
+    total_teachers     BIGINT   NOT NULL DEFAULT 0,
+    total_courses      BIGINT   NOT NULL DEFAULT 0,
+    total_locations    BIGINT   NOT NULL DEFAULT 0,
+    sessions_today     INTEGER  NOT NULL DEFAULT 0,
+    scans_last_hour    INTEGER  NOT NULL DEFAULT 0,
+    school_rates       JSONB    NOT NULL DEFAULT '[]',   /* [{location_id, name, present, total, rate}] */
+    counts_updated_at  TIMESTAMP WITHOUT TIME ZONE DEFAULT now(),
+    stats_refreshed_at TIMESTAMP WITHOUT TIME ZONE          /* NULL = never */
+);
+
+
+-- +1 per new row, -1 per old row. app_user also moves total_teachers when a
+-- row enters or leaves the teacher role (UPDATE of role_id).
+CREATE OR REPLACE FUNCTION dashboard_metrics_count() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    counter TEXT;
+    role_col TEXT;
+    delta_sql TEXT;
+BEGIN
+    counter := CASE TG_TABLE_NAME
+        WHEN 'app_user' THEN 'total_users'
+        WHEN 'course' THEN 'total_courses'
+        ELSE 'total_locations'
+    END;
+    role_col := CASE WHEN TG_TABLE_NAME = 'app_user' THEN 'role_id' ELSE 'NULL::bigint' END;
+    delta_sql := CASE TG_OP
+        WHEN 'INSERT' THEN format('SELECT %s AS role_id, 1 AS d FROM new_rows', role_col)
+        WHEN 'DELETE' THEN format('SELECT %s AS role_id, -1 AS d FROM old_rows', role_col)
+        ELSE format('SELECT %1$s AS role_id, 1 AS d FROM new_rows
+                     UNION ALL
+                     SELECT %1$s AS role_id, -1 AS d FROM old_rows', role_col)
+    END;
+
+    EXECUTE format($f$
+        UPDATE dashboard_metrics m SET
+            %1$I = m.%1$I + d.total,
+            total_teachers = m.total_teachers + d.teachers,
+            counts_updated_at = now()
+        FROM (
+            SELECT COALESCE(SUM(x.d), 0) AS total,
+                   COALESCE(SUM(x.d) FILTER (
+                       WHERE x.role_id = (SELECT id FROM ref_role WHERE name = 'teacher' LIMIT 1)), 0) AS teachers
+            FROM (%2$s) x
+        ) d
+        WHERE m.id = 1 AND (d.total <> 0 OR d.teachers <> 0)
+    $f$, counter, delta_sql);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS dashboard_metrics_ins ON app_user;
+DROP TRIGGER IF EXISTS dashboard_metrics_upd ON app_user;
+DROP TRIGGER IF EXISTS dashboard_metrics_del ON app_user;
+CREATE TRIGGER dashboard_metrics_ins AFTER INSERT ON app_user
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_metrics_count();
+CREATE TRIGGER dashboard_metrics_upd AFTER UPDATE OF role_id ON app_user
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_metrics_count();
+CREATE TRIGGER dashboard_metrics_del AFTER DELETE ON app_user
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_metrics_count();
+
+DROP TRIGGER IF EXISTS dashboard_metrics_ins ON course;
+DROP TRIGGER IF EXISTS dashboard_metrics_del ON course;
+CREATE TRIGGER dashboard_metrics_ins AFTER INSERT ON course
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_metrics_count();
+CREATE TRIGGER dashboard_metrics_del AFTER DELETE ON course
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_metrics_count();
+
+DROP TRIGGER IF EXISTS dashboard_metrics_ins ON location;
+DROP TRIGGER IF EXISTS dashboard_metrics_del ON location;
+CREATE TRIGGER dashboard_metrics_ins AFTER INSERT ON location
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_metrics_count();
+CREATE TRIGGER dashboard_metrics_del AFTER DELETE ON location
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION dashboard_metrics_count();
+
+
+-- Initial fill / resync (refresh_dashboard_metrics --recount does the same).
+INSERT INTO dashboard_metrics (id, total_users, total_teachers, total_courses, total_locations)
+SELECT 1,
+       (SELECT COUNT(*) FROM app_user),
+       (SELECT COUNT(*) FROM app_user
+         WHERE role_id = (SELECT id FROM ref_role WHERE name = 'teacher' LIMIT 1)),
+       (SELECT COUNT(*) FROM course),
+       (SELECT COUNT(*) FROM location)
+ON CONFLICT (id) DO UPDATE SET
+    total_users = EXCLUDED.total_users,
+    total_teachers = EXCLUDED.total_teachers,
+    total_courses = EXCLUDED.total_courses,
+    total_locations = EXCLUDED.total_locations,
+    counts_updated_at = now();
+
+-- "scans in the last hour" reads attendance by time
+CREATE INDEX IF NOT EXISTS attendance_timestamp_idx ON attendance ("timestamp");
@@ -0,0 +1,22 @@
+-- Secondary indexes for the raw-SQL hot paths (manage.py index_advisor).
+-- The dumps only carry PK/UNIQUE constraints; these cover the other side of
+-- the joins the views run on every scan / page. CONCURRENTLY: run outside a
+-- transaction (psql without -1, or `manage.py index_advisor --apply`).
+-- One statement per line - index_advisor reads this file.
+
+-- attendance(session_id, student_id) UNIQUE нь scan-ы ON CONFLICT-д заавал хэрэгтэй.
+-- Dump-д attendance_unique constraint байгаа бол index_advisor алгасна.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS attendance_session_student_uniq ON attendance (session_id, student_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS attendance_student_session_idx ON attendance (student_id, session_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS device_registry_student_idx ON device_registry (student_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS student_class_group_group_idx ON student_class_group (class_group_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS class_group_schedule_pattern_idx ON class_group_schedule (course_schedule_pattern_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS class_session_date_idx ON class_session (date, time_setting_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS class_session_teacher_date_idx ON class_session (teacher_id, date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS class_group_school_year_idx ON class_group (school_id, year);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS time_setting_location_idx ON time_setting (location_id, start_time);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS teacher_profile_user_idx ON teacher_profile (user_id);
+
+-- Keyset pagination (app_core/services/keyset.py): ORDER BY (key, id) + WHERE (key, id) > cursor
+CREATE INDEX CONCURRENTLY IF NOT EXISTS student_code_id_idx ON student (student_code, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS class_session_date_id_idx ON class_session (date, id);
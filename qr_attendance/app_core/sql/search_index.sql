@@ -0,0 +1,32 @@
+-- Typeahead search over student (student_code, full_name) and course (code, name)
+-- for app_core/services/search.py (/api/search/students/, /api/search/courses/).
+--
+-- search_fold() case-folds Cyrillic (incl. Ө/Ү) with translate() before lower(),
+-- so the result doesn't depend on the database locale (lower() under C/POSIX
+-- leaves Cyrillic as-is). It is IMMUTABLE so the expression indexes below can
+-- use it; search.py queries the exact same expressions.
+--
+-- Prefix lookups ("B2101", "Бат") use the text_pattern_ops btrees, substring and
+-- misspelled lookups (3+ chars) the pg_trgm GIN indexes.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE OR REPLACE FUNCTION search_fold(t text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT lower(translate(COALESCE(t, ''),
+        'АБВГДЕЁЖЗИЙКЛМНОӨПРСТУҮФХЦЧШЩЪЫЬЭЮЯ',
+        'абвгдеёжзийклмноөпрстуүфхцчшщъыьэюя'))
+$$;
+
+CREATE INDEX IF NOT EXISTS student_code_fold_idx ON student (search_fold(student_code) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS student_name_fold_idx ON student (search_fold(full_name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS student_search_trgm_idx ON student
+    USING gin ((search_fold(student_code) || ' ' || search_fold(full_name)) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS course_code_fold_idx ON course (search_fold(code) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS course_name_fold_idx ON course (search_fold(name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS course_search_trgm_idx ON course
+    USING gin ((search_fold(code) || ' ' || search_fold(name)) gin_trgm_ops);
+
+ANALYZE student;
+ANALYZE course;
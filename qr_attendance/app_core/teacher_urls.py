@@ -3,7 +3,7 @@ from django.urls import path
 from app_core.views.teacher import teacher
 from app_core.views import export_views
 from .views.session_attendance import (
-    session_generate, generate_qr_session, teacher_qr_display,
+    session_generate, generate_qr_session, teacher_qr_display, teacher_qr_rotate,
     attendance_check, attendance_mark, attendance_list_view
 )
 from .views import attendance
@@ -13,11 +13,13 @@ urlpatterns = [
     path('teacher/create_session/', teacher.create_session, name='create_session'),
     path('session/<int:session_id>/export/csv/', export_views.session_export_csv, name='session_export_csv'),
     path('daily-schedule/export/csv/', export_views.daily_schedule_export_csv, name='daily_schedule_export_csv'),
+    path('course/<int:course_id>/export/matrix.xlsx', export_views.course_attendance_matrix_xlsx, name='course_attendance_matrix_xlsx'),
     
     
     path('teacher/pattern/<int:pattern_id>/generate/', session_generate, name='session_generate'),
     path('teacher/pattern/<int:pattern_id>/generate/post/', generate_qr_session, name='generate_qr_session'),
     path('teacher/session/<int:session_id>/qr/', teacher_qr_display, name='teacher_qr_display'),
+    path('teacher/session/<int:session_id>/qr/rotate/', teacher_qr_rotate, name='teacher_qr_rotate'),
     path('teacher/session/<int:session_id>/attendance/', attendance_list_view, name='attendance_list'),
         
     path('teacher/schedule_list/', teacher.teacher_schedule_list, name='teacher_schedule_list'),
@@ -37,4 +39,9 @@ urlpatterns = [
     # Student attendance routes
     path('attendance/<uuid:token>/scan/', attendance.scan_page, name='scan_page'),
     path('attendance/<uuid:token>/submit/', attendance.submit_attendance, name='submit_attendance'),
+    # Rotating HMAC-signed QR (teacher_qr_display)
+    path('attendance/r/<str:signed>/scan/', attendance.scan_page_signed, name='scan_page_signed'),
+    path('attendance/r/<str:signed>/submit/', attendance.submit_attendance_signed, name='submit_attendance_signed'),
+    path('attendance/<uuid:token>/qr.png', attendance.qr_image, name='attendance_qr_png'),
+    path('attendance/<uuid:token>/qr.svg', attendance.qr_image, {'fmt': 'svg'}, name='attendance_qr_svg'),
 ]
@@ -0,0 +1,76 @@
+# app_core/tests.py
+# Query budgets (SQL_QUERY_BUDGETS) for the hot typeahead endpoints. The app
+# tables have no migrations, so the test database gets the few tables these
+# views read plus app_core/sql/search_index.sql.
+import re
+from pathlib import Path
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from app_core.services import sql_trace
+
+
+SQL_DIR = Path(__file__).resolve().parent / 'sql'
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS student (
+        id BIGSERIAL PRIMARY KEY, student_code VARCHAR(50), full_name VARCHAR(255)
+    );
+    CREATE TABLE IF NOT EXISTS course (
+        id BIGSERIAL PRIMARY KEY, code VARCHAR(50), name VARCHAR(255)
+    );
+    CREATE TABLE IF NOT EXISTS student_class_group (
+        id BIGSERIAL PRIMARY KEY, student_id BIGINT NOT NULL, class_group_id BIGINT NOT NULL
+    );
+"""
+
+
+def _queries(response):
+    """Query count from the Server-Timing header written by SqlTraceMiddleware."""
+    match = re.search(r'desc="(\d+) queries"', response['Server-Timing'])
+    return int(match.group(1))
+
+
+@override_settings(SQL_TRACE=True, SQL_BUDGET_RAISE=True)
+class SearchQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            cursor.execute(SCHEMA)
+            cursor.execute((SQL_DIR / 'search_index.sql').read_text(encoding='utf-8'))
+            cursor.executemany(
+                "INSERT INTO student (student_code, full_name) VALUES (%s, %s)",
+                [(f'B21{i:04d}', f'Батболд {i}') for i in range(200)],
+            )
+            cursor.executemany(
+                "INSERT INTO student_class_group (student_id, class_group_id) "
+                "SELECT id, 7 FROM student WHERE student_code = %s",
+                [(f'B21{i:04d}',) for i in range(0, 200, 2)],
+            )
+            cursor.executemany(
+                "INSERT INTO course (code, name) VALUES (%s, %s)",
+                [(f'CS{i:03d}', f'Программчлал {i}') for i in range(50)],
+            )
+
+    def setUp(self):
+        self.client.cookies['user_id'] = '1'
+
+    def assertWithinBudget(self, url_name, params):
+        response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'])
+        self.assertLessEqual(_queries(response), sql_trace.budget_for(url_name))
+
+    def test_search_students_within_budget(self):
+        self.assertWithinBudget('api_search_students', {'q': 'батболд', 'limit': 50})
+        self.assertWithinBudget('api_search_students', {'q': 'B21', 'class_group_id': 7})
+
+    def test_search_courses_within_budget(self):
+        self.assertWithinBudget('api_search_courses', {'q': 'прогр'})
+
+    def test_over_budget_raises(self):
+        with override_settings(SQL_QUERY_BUDGETS={'api_search_courses': 0}):
+            with self.assertRaises(sql_trace.QueryBudgetExceeded):
+                self.client.get(reverse('api_search_courses'), {'q': 'CS0'})
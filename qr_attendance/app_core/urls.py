@@ -1,12 +1,17 @@
 # app_core/urls.py
 from django.urls import path
-from app_core.views import courses, admin, attendance, sessions
+from app_core.views import courses, admin, attendance, sessions, search
 from app_core.views.enrollment import enrollment 
 
 urlpatterns = [
     # Админ dashboard (болон багшийн CRUD-рүү холбох)
     path('admin/dashboard/', admin.admin_dashboard, name='admin_dashboard'),
+    path('admin/dashboard/metrics/', admin.admin_dashboard_metrics, name='admin_dashboard_metrics'),
     path('admin/teacher-list/', admin.admin_teacher_list, name='admin_teacher_list'),
+    path('admin/cache/session/stats/', admin.admin_session_cache_stats, name='admin_session_cache_stats'),
+    path('admin/scan-spool/stats/', admin.admin_scan_spool_stats, name='admin_scan_spool_stats'),
+    path('admin/db/pool/stats/', admin.admin_db_pool_stats, name='admin_db_pool_stats'),
+    path('admin/attendance/recheck-geofence/', admin.admin_recheck_geofence, name='admin_recheck_geofence'),
     path('admin/courses/', courses.courses_crud, name='courses_crud'),
 
     # sessions
@@ -26,4 +31,8 @@ urlpatterns = [
     # APIs
     path("api/assigned-students/", enrollment.get_assigned_students_api, name="api_assigned_students"),
     path("api/enrolled-students/", enrollment.get_enrolled_students_api, name="api_enrolled_students"),
+    path("api/sessions/", sessions.api_sessions_list, name="api_sessions_list"),
+    path("api/enrollments/", enrollment.api_enrollments_list, name="api_enrollments_list"),
+    path("api/search/students/", search.api_search_students, name="api_search_students"),
+    path("api/search/courses/", search.api_search_courses, name="api_search_courses"),
 ]
@@ -8,124 +8,6 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
-def _get_semesters(semester_id):    
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT id, school_year, term, start_date, end_date, name, school_id
-            FROM semester
-            WHERE id = %s
-        """, [semester_id]) 
-        sem = cursor.fetchone()
-    semester = {
-        'id': sem[0],
-        'school_year': sem[1],
-        'term': sem[2],
-        'start_date': sem[3],
-        'end_date': sem[4],
-        'name': sem[5],
-        'school_id': sem[6],
-    }
-    return semester
-
-def _get_room_types():
-    with connection.cursor() as cursor:
-        cursor.execute(""" SELECT id, code, name FROM room_type """) 
-        cr = cursor.fetchall()
-    room_types =[]
-    if cr:
-        for room_type in cr:
-            c = {
-                'id': room_type[0],
-                'code': room_type[1],
-                'name': room_type[2]
-            }
-            room_types.append(c)
-    return room_types
-
-def _get_students():
-    with connection.cursor() as cursor:
-        cursor.execute(""" SELECT id, student_code, full_name FROM student """) 
-        cr = cursor.fetchall()
-    students =[]
-    if cr:
-        for student in cr:
-            c = {
-                'id': student[0],
-                'student_code': student[1],
-                'full_name': student[2]
-            }
-            students.append(c)
-    return students
-
-def _get_class_rooms(school_id):
-    with connection.cursor() as cursor:
-        cursor.execute(""" 
-            SELECT id, school_id, room_number, room_type_id, capacity
-	        FROM class_room
-            WHERE school_id = %s
-        """, [school_id]) 
-        cr = cursor.fetchall()
-
-    class_rooms =[]
-    if cr:
-        for class_room in cr:
-            c = {
-                'id': class_room[0],
-                'school_id': class_room[1],
-                'room_number': class_room[2],
-                'room_type_id': class_room[3],
-                'capacity': class_room[4]
-            }
-            class_rooms.append(c)
-    return class_rooms
-
-def _get_programs(school_id):
-    with connection.cursor() as cursor:
-        cursor.execute(""" 
-            SELECT A.id, A.name, A.code
-	        FROM program A
-            INNER JOIN department B ON B.id = A.department_id
-            WHERE school_id = %s
-        """, [school_id]) 
-        cr = cursor.fetchall()
-
-    programs =[]
-    if cr:
-        for program in cr:
-            c = {
-                'id': program[0],
-                'code': program[1],
-                'name': program[2],
-            }
-            programs.append(c)
-    return programs
-
-def _get_class_groups(school_id, year):
-    with connection.cursor() as cursor:
-        cursor.execute(""" 
-			SELECT C.id, C.name, C.program_id,
-				COUNT(D.class_group_id) AS student_count
-			FROM program A
-			INNER JOIN department B ON B.id = A.department_id
-			INNER JOIN class_group C ON C.program_id = A.id
-			LEFT JOIN student_class_group D ON D.class_group_id = C.id
-			WHERE B.school_id = %s AND C.year = %s
-			GROUP BY C.id, C.name, C.program_id
-        """, [school_id, year]) 
-        cr = cursor.fetchall()
-
-    class_groups =[]
-    if cr:
-        for class_group in cr:
-            c = {
-                'id': class_group[0],
-                'name': class_group[1],
-                'program_id': class_group[2],
-                'student_count': class_group[3],
-            }
-            class_groups.append(c)
-    return class_groups
-
 def _get_current_semester_pattern(semester_id, pattern_id):
     if pattern_id is not None:
         with connection.cursor() as cursor:
@@ -1,7 +1,10 @@
 # app_core/views/admin.py
 from django.shortcuts import render, redirect
+from django.conf import settings
+from django.http import JsonResponse
 from django.db import connection, transaction
 from ..utils import get_cookie_safe, _is_admin, _generate_password, _hash_md5, set_cookie_safe
+from app_core.services import dashboard_metrics, db_pool, session_cache, scan_spool, geofence_audit, ref_cache
 
 # -------------------------
 # Admin dashboard (unchanged)
@@ -10,41 +13,15 @@ def admin_dashboard(request):
     if not _is_admin(request):
         return redirect('login')
 
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT COUNT(*) FROM app_user")
-        total_users = cursor.fetchone()[0]
-
-        cursor.execute("""SELECT COUNT(*) 
-                       FROM app_user 
-                       WHERE role_id = (SELECT id FROM ref_role WHERE name='teacher' LIMIT 1) 
-                       """)
-        total_teachers = cursor.fetchone()[0]
-
-        cursor.execute("SELECT COUNT(*) FROM course")
-        total_courses = cursor.fetchone()[0]
-
-        cursor.execute("SELECT COUNT(*) FROM location")
-        total_locations = cursor.fetchone()[0]
-
-        cursor.execute("""
-            SELECT u.id, u.email, COALESCE(t.name,'-') AS name, u.is_verified
-            FROM app_user u
-            LEFT JOIN teacher_profile t ON t.user_id = u.id
-            WHERE u.role_id = (SELECT id FROM ref_role WHERE name='teacher' LIMIT 1)
-            ORDER BY u.id DESC
-            LIMIT 100
-        """)
-        rows = cursor.fetchall()
+    # dashboard_metrics-ийн нэг мөр (trigger-ээр тоологддог + хугацаат статистик)
+    return render(request, 'admin/dashboard.html', dashboard_metrics.snapshot())
 
-    teachers = [{'id': r[0], 'email': r[1], 'name': r[2], 'is_verified': r[3]} for r in rows]
 
-    return render(request, 'admin/dashboard.html', {
-        'total_users': total_users,
-        'total_teachers': total_teachers,
-        'total_courses': total_courses,
-        'total_locations': total_locations,
-        'teachers': teachers
-    })
+def admin_dashboard_metrics(request):
+    """Dashboard-ийн auto-refresh JSON."""
+    if not _is_admin(request):
+        return JsonResponse({'ok': False, 'error': 'forbidden'}, status=403)
+    return JsonResponse({'ok': True, 'metrics': dashboard_metrics.as_json(dashboard_metrics.snapshot())})
 
 # app_core/views/admin.py
 
@@ -75,9 +52,7 @@ def admin_teacher_list(request):
         try:
             with transaction.atomic():
                 with connection.cursor() as cursor:
-                    # teacher role ID
-                    cursor.execute("SELECT id FROM ref_role WHERE name='teacher' LIMIT 1")
-                    role_id = cursor.fetchone()[0]
+                    role_id = ref_cache.role_id('teacher')
 
                     # create user
                     cursor.execute("""
@@ -180,6 +155,7 @@ def admin_teacher_list(request):
     page_size = 10
     offset = (page - 1) * page_size
 
+    teacher_role_id = ref_cache.role_id('teacher')
     where = ""
     params = []
 
@@ -198,9 +174,9 @@ def admin_teacher_list(request):
             SELECT COUNT(*)
             FROM app_user u
             LEFT JOIN teacher_profile t ON t.user_id = u.id
-            WHERE u.role_id = (SELECT id FROM ref_role WHERE name='teacher')
+            WHERE u.role_id = %s
             {where}
-        """, params)
+        """, [teacher_role_id] + params)
         total = cursor.fetchone()[0]
 
     # LIST
@@ -213,11 +189,11 @@ def admin_teacher_list(request):
                 u.is_verified
             FROM app_user u
             LEFT JOIN teacher_profile t ON t.user_id = u.id
-            WHERE u.role_id = (SELECT id FROM ref_role WHERE name='teacher')
+            WHERE u.role_id = %s
             {where}
             ORDER BY t.name ASC NULLS LAST
             LIMIT %s OFFSET %s
-        """, params + [page_size, offset])
+        """, [teacher_role_id] + params + [page_size, offset])
         rows = cursor.fetchall()
 
     teachers = [
@@ -235,3 +211,73 @@ def admin_teacher_list(request):
         "search": search,
         "page_range": range(1, last_page + 1),
     })
+
+
+# -------------------------
+# QR scan token cache counters (энэ worker process-ийн)
+# -------------------------
+def admin_session_cache_stats(request):
+    if not _is_admin(request):
+        return JsonResponse({'ok': False, 'error': 'forbidden'}, status=403)
+    return JsonResponse({'ok': True, 'session_cache': session_cache.stats()})
+
+
+# -------------------------
+# Scan write-behind spool lag
+# -------------------------
+def admin_scan_spool_stats(request):
+    if not _is_admin(request):
+        return JsonResponse({'ok': False, 'error': 'forbidden'}, status=403)
+    return JsonResponse({'ok': True, 'scan_spool': scan_spool.lag()})
+
+
+# -------------------------
+# DB connection pool: хүлээлт, ашиглагдаж буй холболт (энэ worker process-ийн)
+# -------------------------
+def admin_db_pool_stats(request):
+    if not _is_admin(request):
+        return JsonResponse({'ok': False, 'error': 'forbidden'}, status=403)
+    return JsonResponse({
+        'ok': True,
+        'pooled': settings.DB_POOL_SIZE > 0,
+        'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+        'db_pool': db_pool.stats(),
+    })
+
+
+# -------------------------
+# Geofence recheck (session / course / semester / location)
+# Том хэмжээнд `manage.py recheck_geofence` ашиглана
+# -------------------------
+def admin_recheck_geofence(request):
+    if not _is_admin(request):
+        return JsonResponse({'ok': False, 'error': 'forbidden'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'ok': False, 'error': 'POST шаардлагатай'}, status=405)
+
+    scope = {}
+    for key in ('session_id', 'course_id', 'semester_id', 'location_id'):
+        value = request.POST.get(key)
+        if value:
+            if not value.isdigit():
+                return JsonResponse({'ok': False, 'error': f'{key} буруу'}, status=400)
+            scope[key] = int(value)
+    if not scope:
+        return JsonResponse({'ok': False, 'error': 'session_id/course_id/semester_id/location_id заана уу'}, status=400)
+
+    outside = []
+
+    def collect(results):
+        for r in results:
+            if r[4] == geofence_audit.OUTSIDE and len(outside) < 200:
+                outside.append({'attendance_id': r[0], 'session_id': r[1],
+                                'student_id': r[2], 'distance_m': round(r[3], 1)})
+
+    try:
+        stats = geofence_audit.recheck(
+            write_back=request.POST.get('write_back') == '1', on_chunk=collect, **scope
+        )
+    except Exception as e:
+        return JsonResponse({'ok': False, 'error': f'DB алдаа: {str(e)}'}, status=500)
+
+    return JsonResponse({'ok': True, 'stats': stats, 'outside': outside})
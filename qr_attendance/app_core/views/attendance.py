@@ -1,104 +1,81 @@
 # views.py
 import logging
-from math import radians, sin, cos, sqrt, asin
-from django.db import connection, transaction
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, Http404
 from django.shortcuts import render
+from django.urls import reverse
 from django.utils import timezone
-import pytz
+from app_core.services import session_cache, session_roster, qr_render, qr_token, scan_spool, geofence
+from app_core.services.attendance_submit import parse_coords, resolve_scan, record_scan
 
 logger = logging.getLogger(__name__)
 
-def haversine_m(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points in meters"""
-    try:
-        R = 6371000.0
-        dlat = radians(float(lat2) - float(lat1))
-        dlon = radians(float(lon2) - float(lon1))
-        a = sin(dlat / 2) ** 2 + cos(radians(float(lat1))) * cos(radians(float(lat2))) * sin(dlon / 2) ** 2
-        c = 2 * asin(sqrt(a))
-        return R * c
-    except (ValueError, TypeError) as e:
-        logger.exception("Haversine calculation error")
-        return None
-
-
 def scan_page(request, token):
     """QR scan page - displays session info and location requirements"""
-    error = None
+    return _render_scan(request, lambda: session_cache.get_session(token))
+
+
+def scan_page_signed(request, signed):
+    """Rotating QR scan page - HMAC token is verified before any DB access"""
+    session_id = qr_token.verify_scan(signed)
+    if session_id is None:
+        return _render_scan(request, lambda: None, error='QR код хүчингүй эсвэл хугацаа дууссан. Дэлгэц дээрх шинэ QR-г уншуулна уу.')
+    return _render_scan(
+        request, lambda: session_cache.get_session_by_id(session_id),
+        submit_token=qr_token.sign_submit(session_id),
+    )
+
+
+def _render_scan(request, load_snapshot, submit_token=None, error=None):
     session = None
     loc = None
 
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT cs.id, cs.course_id, c.name, c.code, cs.date,
-                       ts.value as timeslot, lt.name as lesson_type,
-                       cs.location_id, cs.token, cs.expires_at, cs.name
-                FROM class_session cs
-                JOIN course c ON c.id = cs.course_id
-                LEFT JOIN time_setting ts ON ts.id = cs.time_setting_id
-                LEFT JOIN lesson_type lt ON lt.id = cs.lesson_type_id
-                WHERE cs.token = %s
-            """, [token])
-            row = cursor.fetchone()
-
-        if not row:
-            error = 'Token буруу эсвэл session олдсонгүй.'
+        snapshot = load_snapshot()
+
+        if not snapshot:
+            error = error or 'Token буруу эсвэл session олдсонгүй.'
         else:
             now = timezone.now()
-            expires_at = row[9]
-
-            # Make expires_at timezone-aware if naive
-            if expires_at and timezone.is_naive(expires_at):
-                expires_at = timezone.make_aware(expires_at, pytz.utc)
+            expires_at = snapshot['session']['expires_at']
 
             if expires_at and expires_at < now:
                 error = 'Session-ий хугацаа дууссан байна.'
             else:
-                session = {
-                    'id': row[0],
-                    'course_id': row[1],
-                    'course_name': row[2],
-                    'course_code': row[3],
-                    'date': row[4],
-                    'timeslot': row[5],
-                    'lesson_type': row[6],
-                    'location_id': row[7],
-                    'token': str(row[8]),
-                    'expires_at': expires_at,
-                    'name': row[10]
-                }
-
-                if session['location_id']:
-                    with connection.cursor() as cursor:
-                        cursor.execute("""
-                            SELECT id, name, latitude, longitude, radius_m
-                            FROM location
-                            WHERE id = %s
-                        """, [session['location_id']])
-                        lr = cursor.fetchone()
-                        if lr:
-                            loc = {
-                                'id': lr[0],
-                                'name': lr[1],
-                                'latitude': lr[2],
-                                'longitude': lr[3],
-                                'radius_m': lr[4]
-                            }
+                session = snapshot['session']
+                loc = snapshot['location']
     except Exception as e:
         logger.exception("scan_page error")
         error = 'Системийн алдаа. Админтай холбогдоно уу.'
 
+    # Rotating горимд static UUID-г хуудсанд гаргахгүй
+    submit_url = None
+    if session and submit_token:
+        submit_url = reverse('submit_attendance_signed', args=[submit_token])
+    elif session:
+        submit_url = reverse('submit_attendance', args=[session['token']])
+
     return render(request, 'admin/attendance/scan_qr.html', {
         'session': session,
         'location': loc,
+        'submit_url': submit_url,
         'error': error
     })
 
 # @csrf_exempt
 def submit_attendance(request, token):
     """Submit attendance via QR scan - returns JSON"""
+    return _submit(request, lambda: session_cache.get_session(token))
+
+
+def submit_attendance_signed(request, signed):
+    """Submit via rotating QR; forged/expired tokens are rejected without a query"""
+    session_id = qr_token.verify_submit(signed)
+    if session_id is None:
+        return JsonResponse({'ok': False, 'error': 'QR token хүчингүй эсвэл хугацаа дууссан. Дахин уншуулна уу.'}, status=403)
+    return _submit(request, lambda: session_cache.get_session_by_id(session_id))
+
+
+def _submit(request, load_snapshot):
     if request.method != 'POST':
         return JsonResponse({'ok': False, 'error': 'Зөвхөн POST request зөвшөөрөгдсөн.'}, status=405)
 
@@ -112,104 +89,73 @@ def submit_attendance(request, token):
         if not student_code:
             return JsonResponse({'ok': False, 'error': 'Оюутны код оруулна уу.'})
 
-        # Find session
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT id, course_id, location_id, date, expires_at
-                FROM class_session
-                WHERE token = %s
-            """, [token])
-            row = cursor.fetchone()
+        try:
+            lat, lon = parse_coords(lat, lon)
+        except ValueError:
+            return JsonResponse({'ok': False, 'error': 'Байршлын мэдээлэл буруу байна.'}, status=400)
 
-        if not row:
-            return JsonResponse({'ok': False, 'error': 'Session олдсонгүй.'})
+        # Session + location from the in-process token cache
+        snapshot = load_snapshot()
 
-        session_id, course_id, location_id, session_date, expires_at = row
+        if not snapshot:
+            return JsonResponse({'ok': False, 'error': 'Session олдсонгүй.'})
 
-        # ── ЗАСВАР: pytz.utc заавал заана ──
+        session = snapshot['session']
         now = timezone.now()
-        if expires_at:
-            if timezone.is_naive(expires_at):
-                expires_at = timezone.make_aware(expires_at, pytz.utc)  # UTC гэж тооцно
-            if expires_at < now:
-                return JsonResponse({'ok': False, 'error': 'Session-ий хугацаа дууссан байна.'})
-
-        # Lookup student
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT id, full_name FROM student
-                WHERE student_code = %s LIMIT 1
-            """, [student_code])
-            s = cursor.fetchone()
-
-        if not s:
-            return JsonResponse({'ok': False, 'error': 'Оюутан олдсонгүй. Код шалгана уу.'})
+        expires_at = session['expires_at']
+        if expires_at and expires_at < now:
+            return JsonResponse({'ok': False, 'error': 'Session-ий хугацаа дууссан байна.'})
 
-        student_id, student_name = s[0], s[1]
+        # Student, device - one round-trip
+        scan = resolve_scan(student_code, device_id)
+
+        if not scan['student_id']:
+            return JsonResponse({'ok': False, 'error': 'Оюутан олдсонгүй. Код шалгана уу.'})
 
-        # Check enrollment
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT COUNT(*) FROM class_group_schedule cgs
-                INNER JOIN student_class_group scg ON scg.class_group_id = cgs.class_group_id
-                INNER JOIN course_schedule_pattern csp ON csp.id = cgs.course_schedule_pattern_id
-                WHERE scg.student_id = %s AND csp.course_id = %s
-            """, [student_id, course_id])
-            enrolled_count = cursor.fetchone()[0]
+        student_id, student_name = scan['student_id'], scan['student_name']
 
-        if enrolled_count == 0:
+        # Enrollment: per-session roster set, built once per session
+        if not session_roster.is_enrolled(session, student_id):
             return JsonResponse({
                 'ok': False,
                 'error': 'Та энэ хичээлд бүртгэлтэй биш байна.',
                 'student_name': student_name
             })
 
-        # Device registry check / register
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT device_id FROM device_registry WHERE student_id = %s LIMIT 1", [student_id])
-            existing = cursor.fetchone()
-
-        if existing:
-            if device_id and device_id != existing[0]:
-                return JsonResponse({
-                    'ok': False,
-                    'error': 'Таны төхөөрөмж бүртгэлтэй төхөөрөмжтэй таарахгүй байна.',
-                    'student_name': student_name
-                })
-        else:
-            if device_id:
-                with connection.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO device_registry (student_id, device_id, device_info, created_at)
-                        VALUES (%s, %s, %s, %s)
-                    """, [student_id, device_id, device_info, now])
+        # Device registry check; the first device is registered together with the attendance row
+        registered_device = scan['registered_device']
+        device_taken = scan['device_owner_id'] not in (None, student_id)
+        if (registered_device and device_id and device_id != registered_device) or \
+                (not registered_device and device_taken):
+            return JsonResponse({
+                'ok': False,
+                'error': 'Таны төхөөрөмж бүртгэлтэй төхөөрөмжтэй таарахгүй байна.',
+                'student_name': student_name
+            })
 
         # Location verification
         allowed_ok = True
         distance_m = None
         location_error = None
 
-        if location_id:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT latitude, longitude, radius_m, name FROM location WHERE id = %s", [location_id])
-                lr = cursor.fetchone()
-
-            if lr and lat and lon:
-                try:
-                    distance_m = haversine_m(lr[0], lr[1], float(lat), float(lon))
+        lr = snapshot['location']
+        if lr and lat is not None and lon is not None:
+            try:
+                # per-location precomputed fence (radians, cos(lat), bbox)
+                fence = geofence.get_fence(lr['latitude'], lr['longitude'], lr['radius_m'])
+                inside, distance = fence.check(lat, lon)
+                distance_m = int(distance) if distance is not None else None
+                if not inside:
+                    allowed_ok = False
                     if distance_m is None:
-                        allowed_ok = False
-                        location_error = 'Байршлын тооцоолол алдаатай байна.'
+                        # bbox-оос гадуур: зайг тооцоолоогүй
+                        location_error = f'Та {lr["name"]}-ийн зөвшөөрөгдсөн {int(fence.radius_m)}м радиусаас хол байна'
                     else:
-                        distance_m = int(distance_m)
-                        allowed_radius = lr[2] or 100
-                        if distance_m > allowed_radius:
-                            allowed_ok = False
-                            location_error = f'Та {lr[3]}-с {distance_m}м зайд байна. Зөвшөөрөгдсөн радиус: {allowed_radius}м'
-                except (ValueError, TypeError) as e:
-                    allowed_ok = False
-                    location_error = f'Байршлын мэдээлэл буруу байна: {str(e)}'
-            # GPS байхгүй (lat/lon = None) бол байршил шалгахгүй
+                        location_error = f'Та {lr["name"]}-с {distance_m}м зайд байна. Зөвшөөрөгдсөн радиус: {int(fence.radius_m)}м'
+            except (ValueError, TypeError) as e:
+                allowed_ok = False
+                location_error = f'Байршлын мэдээлэл буруу байна: {str(e)}'
+        # GPS байхгүй (lat/lon = None) бол байршил шалгахгүй
 
         if not allowed_ok:
             return JsonResponse({
@@ -219,48 +165,20 @@ def submit_attendance(request, token):
                 'student_name': student_name
             })
 
-        # Present attendance type
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT id FROM attendance_type
-                WHERE value = 'present' OR name ILIKE '%ирсэн%'
-                LIMIT 1
-            """)
-            present_type = cursor.fetchone()
-            present_type_id = present_type[0] if present_type else 1
-
-        # Check existing attendance
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT id FROM attendance
-                WHERE session_id = %s AND student_id = %s
-                LIMIT 1
-            """, [session_id, student_id])
-            existing_att = cursor.fetchone()
-
-        with transaction.atomic():
-            with connection.cursor() as cursor:
-                if existing_att:
-                    cursor.execute("""
-                        UPDATE attendance
-                        SET attendance_type_id = %s,
-                            "timestamp" = %s,
-                            lat = %s,
-                            lon = %s,
-                            device_id = %s,
-                            device_info = %s
-                        WHERE id = %s
-                    """, [present_type_id, now, lat, lon, device_id, device_info, existing_att[0]])
-                else:
-                    cursor.execute("""
-                        INSERT INTO attendance
-                        (session_id, student_id, "timestamp", lat, lon, device_id, device_info, attendance_type_id)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """, [session_id, student_id, now, lat, lon, device_id, device_info, present_type_id])
+        # INSERT ... ON CONFLICT (session_id, student_id) DO UPDATE - one round-trip,
+        # or append to the local spool when SCAN_INGEST_MODE = 'spool'
+        write = scan_spool.enqueue if scan_spool.enabled() else record_scan
+        write(
+            session['id'], student_id, scan['present_type_id'], now,
+            lat=lat, lon=lon, device_id=device_id, device_info=device_info,
+            register_device=not registered_device,
+        )
+        session_roster.mark_scanned(session['id'], student_id)
 
         return JsonResponse({
             'ok': True,
             'message': 'Ирц амжилттай бүртгэгдлээ!',
+            'queued': scan_spool.enabled(),
             'distance_m': distance_m,
             'student_name': student_name
         })
@@ -268,5 +186,26 @@ def submit_attendance(request, token):
     except Exception as e:
         logger.exception("submit_attendance error")
         return JsonResponse({'ok': False, 'error': f'Системийн алдаа: {str(e)}'}, status=500)
-    
 
+
+def qr_image(request, token, fmt='png'):
+    """QR image of the scan URL for a session token, cached with ETag/Cache-Control"""
+    if not session_cache.get_session(token):
+        raise Http404('Session олдсонгүй')
+
+    try:
+        box_size = min(max(int(request.GET.get('size', 10)), 2), 20)
+    except ValueError:
+        box_size = 10
+
+    scan_url = request.build_absolute_uri(reverse('scan_page', args=[token]))
+    content, etag = qr_render.render_qr(scan_url, box_size, 4, fmt)
+
+    if request.headers.get('If-None-Match') == etag:
+        resp = HttpResponseNotModified()
+    else:
+        resp = HttpResponse(content, content_type=qr_render.FORMATS[fmt])
+    resp['ETag'] = etag
+    # token-ий QR хэзээ ч өөрчлөгдөхгүй
+    resp['Cache-Control'] = 'public, max-age=86400, immutable'
+    return resp
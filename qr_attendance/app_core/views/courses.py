@@ -2,6 +2,7 @@
 from django.shortcuts import render, redirect
 from django.db import connection, transaction
 from ..utils import _is_admin, set_cookie_safe, get_cookie_safe
+from app_core.services import search, session_cache
 
 def courses_crud(request):
     if not _is_admin(request):
@@ -24,12 +25,13 @@ def courses_crud(request):
         params = []
 
         if q:
-            where_sql = "WHERE name ILIKE %s OR code ILIKE %s"
-            params = [f"%{q}%", f"%{q}%"]
+            # search_index.sql-ийн trigram index-ийг ашиглана
+            where_sql = f"WHERE ({search.COURSE_HAY}) LIKE %s"
+            params = [search.contains_pattern(q)]
 
         with connection.cursor() as cursor:
             # count
-            cursor.execute(f"SELECT COUNT(*) FROM course {where_sql}", params)
+            cursor.execute(f"SELECT COUNT(*) FROM course c {where_sql}", params)
             total = cursor.fetchone()[0]
 
             total_pages = (total + page_size - 1) // page_size
@@ -37,7 +39,7 @@ def courses_crud(request):
             # fetch
             cursor.execute(f"""
                 SELECT id, name, code
-                FROM course
+                FROM course c
                 {where_sql}
                 ORDER BY id DESC
                 LIMIT %s OFFSET %s
@@ -168,6 +170,8 @@ def courses_crud(request):
                     with connection.cursor() as cursor:
                         cursor.execute("DELETE FROM class_session WHERE course_id=%s", [course_id])
                         cursor.execute("DELETE FROM course WHERE id=%s", [course_id])
+                # Устгасан session-уудын token-ийг scan кэш цааш үйлчлэхгүй
+                session_cache.invalidate()
 
                 res = redirect('/admin/courses/?mode=list')
                 set_cookie_safe(res, 'flash_msg', 'Устгагдлаа.', 6)
@@ -13,6 +13,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
 from ..utils import _is_admin, set_cookie_safe, get_cookie_safe
+from app_core.services import keyset
 
 DOCUMENTS_MEDIA_SUBDIR = 'documents'
 MAX_CONTEXT_CHARS = 2000  # chars from a doc to include in prompt
@@ -20,15 +21,16 @@ MAX_CONTEXT_CHARS = 2000  # chars from a doc to include in prompt
 
 @require_http_methods(["GET"])
 def api_docs_list(request):
+    """Bare JSON array (chatbot.html), newest first; ?limit=&after=, next cursor in X-Next-Cursor."""
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT id, name, filename, file_path, description, mime_type, uploaded_at
-                FROM document
-                ORDER BY uploaded_at DESC
-                LIMIT 500
-            """)
-            rows = cursor.fetchall()
+        page = keyset.paginate("""
+            SELECT id, name, filename, file_path, description, mime_type, uploaded_at,
+                   COALESCE(uploaded_at, 'epoch'), id
+            FROM document
+            WHERE 1=1 {keyset}
+        """, [], ["COALESCE(uploaded_at, 'epoch')", 'id'], request=request,
+            limit=keyset.MAX_LIMIT, descending=True)
+        rows = page.rows
 
         docs = []
         for r in rows:
@@ -44,7 +46,10 @@ def api_docs_list(request):
                 'uploaded_at': uploaded.isoformat() if uploaded else ''
             })
 
-        return JsonResponse(docs, safe=False)
+        response = JsonResponse(docs, safe=False)
+        if page.has_next:
+            response['X-Next-Cursor'] = page.next_cursor
+        return response
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -1,15 +1,175 @@
-import io
-import csv
 import datetime
 from django.http import HttpResponse
 from django.shortcuts import redirect
 from django.db import connection
 
+from app_core.services import ref_cache
+from app_core.services.attendance_matrix import AttendanceMatrix, XLSX_CONTENT_TYPE, write_xlsx
+from app_core.services.csv_stream import csv_response, iter_query
+from ..utils import _is_admin
+
+
+SESSION_ATTENDANCE_SQL = """
+    SELECT 
+        s.student_code,
+        s.full_name,
+        at.name as attendance_type,
+        a.timestamp,
+        COALESCE(cg.name, '') as class_group,
+        a.lat,
+        a.lon,
+        a.device_info,
+        l.name as school_name
+    FROM attendance a
+    JOIN student s ON s.id = a.student_id
+    LEFT JOIN attendance_type at ON at.id = a.attendance_type_id
+    LEFT JOIN student_class_group scg ON scg.student_id = s.id
+    LEFT JOIN class_group cg ON cg.id = scg.class_group_id
+    LEFT JOIN location l ON l.id = cg.school_id
+    WHERE a.session_id = %s
+    ORDER BY at.name DESC, s.full_name ASC
+"""
+
+# Өдрийн бүх хуваарь + ирц нэг query-ээр (session бүрт тусдаа query биш).
+# Session-ий мөрүүд дараалж ирэх тул stream хийхдээ cs.id солигдоход шинэ блок эхэлнэ.
+DAILY_SCHEDULE_SQL = """
+    SELECT 
+        cs.id,
+        cs.name,
+        ts.value as timeslot,
+        lt.name as lesson_type,
+        c.name as course_name,
+        c.code as course_code,
+        tp.name as teacher_name,
+        a.id as attendance_id,
+        s.student_code,
+        s.full_name,
+        at.name as attendance_type,
+        a.timestamp,
+        COALESCE(cg.name, '') as class_group
+    FROM class_session cs
+    JOIN course c ON c.id = cs.course_id
+    LEFT JOIN time_setting ts ON ts.id = cs.time_setting_id
+    LEFT JOIN lesson_type lt ON lt.id = cs.lesson_type_id
+    LEFT JOIN teacher_profile tp ON tp.id = cs.teacher_id
+    LEFT JOIN attendance a ON a.session_id = cs.id
+    LEFT JOIN student s ON s.id = a.student_id
+    LEFT JOIN attendance_type at ON at.id = a.attendance_type_id
+    LEFT JOIN student_class_group scg ON scg.student_id = s.id
+    LEFT JOIN class_group cg ON cg.id = scg.class_group_id
+    WHERE cs.date = %s
+    ORDER BY ts.value, cs.id, at.name DESC, s.full_name ASC
+"""
+
+
+def _format_ts(timestamp):
+    if not timestamp:
+        return ''
+    if isinstance(timestamp, datetime.datetime):
+        return timestamp.strftime('%Y-%m-%d %H:%M:%S')
+    return str(timestamp)
+
+
+def _session_csv_rows(session_id, session_row):
+    """CSV мөрүүд: толгой, ирцийн мөрүүд (server-side cursor-оос), статистик."""
+    yield [f"Хуваарь ID: {session_row[0]}"]
+    yield [f"Хуваарь нэр: {session_row[1] or 'Тодорхойгүй'}"]
+    yield [f"Хичээл: {session_row[5]} ({session_row[6]})"]
+    yield [f"Багшийн нэр: {session_row[7] or 'Тодорхойгүй'}"]
+    yield [
+        f"Огноо: {session_row[2]}",
+        f"Цаг: {session_row[3] or '-'}",
+        f"Төрөл: {session_row[4] or '-'}",
+        "",
+        f"Өдөр: {session_row[9]}"
+    ]
+    yield []
+
+    yield [
+        "Оюутны код",
+        "Оюутны нэр",
+        "Статус",
+        "Бүртгэсэн цаг",
+        "Бүлэг",
+        "Lat",
+        "Lon",
+        "Төхөөрөмж",
+        "Байршил"
+    ]
+
+    # Статистикийг stream хийх явцад тоолно
+    total = 0
+    status_counts = {}
+    for row in iter_query(SESSION_ATTENDANCE_SQL, [session_id]):
+        student_code, full_name, att_type, timestamp, class_group, lat, lon, device_info, school_name = row
+        status = att_type or 'Тасалсан'
+        total += 1
+        status_counts[status] = status_counts.get(status, 0) + 1
+
+        yield [
+            student_code or '',
+            full_name or '',
+            status,
+            _format_ts(timestamp),
+            class_group or '-',
+            str(lat) if lat else '',
+            str(lon) if lon else '',
+            device_info or '',
+            school_name or ''
+        ]
+
+    yield []
+    yield ["Нийт:", total]
+    for status, count in status_counts.items():
+        yield [f"{status}:", count]
+
+
+def _daily_schedule_csv_rows(date_obj):
+    yield [f"Өдрийн хуваарь - Огноо: {date_obj}"]
+    yield []
+
+    current_id = None
+    count = 0
+    for row in iter_query(DAILY_SCHEDULE_SQL, [date_obj]):
+        (cs_id, cs_name, timeslot, lesson_type, course_name, course_code, teacher_name,
+         attendance_id, student_code, full_name, att_type, timestamp, class_group) = row
+
+        if cs_id != current_id:
+            if current_id is not None:
+                yield [f"Нийт: {count}"] if count else ["Ирц бүртгэл байхгүй"]
+                yield []
+            current_id, count = cs_id, 0
+
+            yield [f"═══════════════════════════════════════════"]
+            yield [f"Хуваарь ID: {cs_id}"]
+            yield [f"Хуваарь нэр: {cs_name or '-'}"]
+            yield [f"Хичээл: {course_name} ({course_code})"]
+            yield [f"Багш: {teacher_name or '-'}"]
+            yield [f"Цаг: {timeslot or '-'}", f"Төрөл: {lesson_type or '-'}"]
+            yield []
+
+        if attendance_id is None:
+            continue
+        if count == 0:
+            yield ["Оюутны код", "Оюутны нэр", "Статус", "Бүртгэсэн цаг", "Бүлэг"]
+        count += 1
+        yield [
+            student_code or '',
+            full_name or '',
+            att_type or 'Тасалсан',
+            _format_ts(timestamp),
+            class_group or '-'
+        ]
+
+    if current_id is None:
+        yield ["Энэ өдөрт хуваарь байхгүй байна."]
+    else:
+        yield [f"Нийт: {count}"] if count else ["Ирц бүртгэл байхгүй"]
+        yield []
+
 
 def session_export_csv(request, session_id):
-    """Export session attendance to CSV with updated schema"""
-    print("asdfdsa")
-    
+    """Export session attendance to CSV (streamed)"""
     try:
         # Get session info with updated schema
         with connection.cursor() as cursor:
@@ -49,112 +209,11 @@ def session_export_csv(request, session_id):
                 status=404
             )
         
-        # Get attendance records with updated schema
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    s.student_code,
-                    s.full_name,
-                    at.name as attendance_type,
-                    a.timestamp,
-                    COALESCE(cg.name, '') as class_group,
-                    a.lat,
-                    a.lon,
-                    a.device_info,
-					l.name as school_name
-                FROM attendance a
-                JOIN student s ON s.id = a.student_id
-                LEFT JOIN attendance_type at ON at.id = a.attendance_type_id
-                LEFT JOIN student_class_group scg ON scg.student_id = s.id
-                LEFT JOIN class_group cg ON cg.id = scg.class_group_id
-				LEFT JOIN location l ON l.id = cg.school_id
-                WHERE a.session_id = %s
-                ORDER BY at.name DESC, s.full_name ASC
-            """, [session_id])
-            attendance_rows = cursor.fetchall()
-        
-        # Create CSV
-        output = io.StringIO()
-        output.write('\ufeff')  # BOM for Excel UTF-8 recognition
-        writer = csv.writer(output)
-        
-        # Header information
-        writer.writerow([f"Хуваарь ID: {session_row[0]}"])
-        writer.writerow([f"Хуваарь нэр: {session_row[1] or 'Тодорхойгүй'}"])
-        writer.writerow([f"Хичээл: {session_row[5]} ({session_row[6]})"])
-        writer.writerow([f"Багшийн нэр: {session_row[7] or 'Тодорхойгүй'}"])
-        writer.writerow([
-            f"Огноо: {session_row[2]}",
-            f"Цаг: {session_row[3] or '-'}",
-            f"Төрөл: {session_row[4] or '-'}",
-            "",
-            f"Өдөр: {session_row[9]}"
-        ])
-        writer.writerow([])  # Empty row
-        
-        # Attendance data header
-        writer.writerow([
-            "Оюутны код",
-            "Оюутны нэр",
-            "Статус",
-            "Бүртгэсэн цаг",
-            "Бүлэг",
-            "Lat",
-            "Lon",
-            "Төхөөрөмж",
-            "Байршил"
-        ])
-        
-        # Attendance data
-        for row in attendance_rows:
-            student_code, full_name, att_type, timestamp, class_group, lat, lon, device_info, school_name = row
-            
-            # Format timestamp
-            ts_str = ''
-            if timestamp:
-                if isinstance(timestamp, datetime.datetime):
-                    ts_str = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-                else:
-                    ts_str = str(timestamp)
-            
-            writer.writerow([
-                student_code or '',
-                full_name or '',
-                att_type or 'Тасалсан',
-                ts_str,
-                class_group or '-',
-                str(lat) if lat else '',
-                str(lon) if lon else '',
-                device_info or '',
-                school_name or ''
-            ])
-        
-        # Statistics
-        writer.writerow([])
-        writer.writerow(["Нийт:", len(attendance_rows)])
-        
-        # Count by status
-        status_counts = {}
-        for row in attendance_rows:
-            status = row[2] or 'Тасалсан'
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
-        for status, count in status_counts.items():
-            writer.writerow([f"{status}:", count])
-        
-        # Generate filename
         date_str = session_row[2].strftime('%Y%m%d') if isinstance(session_row[2], datetime.date) else str(session_row[2])
         filename = f"attendance_session_{session_id}_{date_str}.csv"
-        
-        # Create response
-        response = HttpResponse(
-            output.getvalue(),
-            content_type='text/csv; charset=utf-8-sig'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
-        
+
+        return csv_response(_session_csv_rows(session_id, session_row), filename)
+
     except Exception as e:
         print(f"CSV export error: {e}")
         import traceback
@@ -167,12 +226,7 @@ def session_export_csv(request, session_id):
 
 
 def daily_schedule_export_csv(request):
-    """Export daily schedule with all sessions to CSV"""
-    print("asdfdsa2")
-    
-
-    
-    # Get date parameter
+    """Export daily schedule with all sessions to CSV (one query, streamed)"""
     qdate = request.GET.get('date') or datetime.date.today().isoformat()
     try:
         date_obj = datetime.date.fromisoformat(qdate)
@@ -182,117 +236,128 @@ def daily_schedule_export_csv(request):
             content_type='text/plain; charset=utf-8',
             status=400
         )
-    
+
+    filename = f"daily_schedule_{date_obj}.csv"
+    return csv_response(_daily_schedule_csv_rows(date_obj), filename)
+
+
+# ==============================================================================
+# COURSE ATTENDANCE MATRIX (student x session)
+# ==============================================================================
+
+# attendance_type-ийн төрөл (ref_cache.TYPE_MATCH) -> cell-ийн тэмдэг
+MATRIX_KIND_SYMBOLS = {'present': "✓", 'absent': "✗", 'late': "Х", 'excused': "Ч"}
+MATRIX_ATTENDED_KINDS = ('present', 'late', 'excused')
+
+
+def matrix_symbols():
+    """
+    ({attendance_type_id: symbol}, attended ids) attendance_type хүснэгтээс.
+    Танигдаагүй төрөл нэрийнхээ эхний үсгээр харагдана, "Ирсэн"-д тооцогдохгүй.
+    """
+    symbols, attended = {}, []
+    for type_id, name, value in ref_cache.attendance_types():
+        kind = ref_cache.attendance_type_kind(name, value)
+        symbols[type_id] = MATRIX_KIND_SYMBOLS.get(kind) or (name or '?')[:1].upper()
+        if kind in MATRIX_ATTENDED_KINDS:
+            attended.append(type_id)
+    return symbols, tuple(attended)
+
+
+def _course_matrix_filter(course_id, teacher_id=None, semester_id=None):
+    """class_session cs-ийн WHERE нөхцөл (sessions болон attendance query-д хуваалцана)."""
+    where, params = ["cs.course_id = %s"], [course_id]
+    if teacher_id:
+        where.append("cs.teacher_id = %s")
+        params.append(teacher_id)
+    if semester_id:
+        # semester_id нөхөгдөөгүй (backfill_session_semester) хуучин мөрүүдэд resolver
+        where.append("""(cs.semester_id = %s OR (cs.semester_id IS NULL
+                         AND attendance_course_semester(cs.course_id, cs.date) = %s))""")
+        params += [semester_id, semester_id]
+    return " AND ".join(where), params
+
+
+def load_course_matrix(course_id, teacher_id=None, semester_id=None):
+    """
+    Хичээлийн ирцийн matrix-ийг 3 query-ээр ачаална: sessions, students,
+    бүх (student, session, status). Cell бүрт query хийхгүй.
+    """
+    where, params = _course_matrix_filter(course_id, teacher_id, semester_id)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT cs.id, to_char(cs.date, 'MM/DD')
+            FROM class_session cs
+            LEFT JOIN time_setting ts ON ts.id = cs.time_setting_id
+            WHERE {where}
+            ORDER BY cs.date, ts.start_time NULLS LAST, cs.id
+        """, params)
+        sessions = cursor.fetchall()
+
+        # Хуваарьт бүлгээр бүртгэлтэй оюутнууд + ирц бүртгүүлсэн бусад оюутнууд
+        cursor.execute(f"""
+            SELECT s.id, s.student_code, s.full_name
+            FROM student s
+            WHERE s.id IN (
+                SELECT scg.student_id
+                FROM student_class_group scg
+                JOIN class_group_schedule cgs ON cgs.class_group_id = scg.class_group_id
+                JOIN course_schedule_pattern csp ON csp.id = cgs.course_schedule_pattern_id
+                WHERE csp.course_id = %s
+                  AND (%s::bigint IS NULL OR csp.semester_id = %s)
+                UNION
+                SELECT a.student_id
+                FROM attendance a
+                JOIN class_session cs ON cs.id = a.session_id
+                WHERE {where}
+            )
+            ORDER BY s.student_code
+        """, [course_id, semester_id, semester_id] + params)
+        students = cursor.fetchall()
+
+    symbols, attended = matrix_symbols()
+    matrix = AttendanceMatrix(students, sessions, symbols, attended=attended)
+    matrix.fill(iter_query(f"""
+        SELECT a.student_id, a.session_id, a.attendance_type_id
+        FROM attendance a
+        JOIN class_session cs ON cs.id = a.session_id
+        WHERE {where}
+    """, params, chunk_size=5000))
+    return matrix
+
+
+def course_attendance_matrix_xlsx(request, course_id):
+    """Хичээлийн бүх хуваарийн ирцийг оюутан x хуваарь хэлбэрээр Excel-д"""
     try:
-        # Get all sessions for the day
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    cs.id,
-                    cs.name,
-                    cs.date,
-                    ts.value as timeslot,
-                    lt.name as lesson_type,
-                    c.name as course_name,
-                    c.code as course_code,
-                    tp.name as teacher_name
-                FROM class_session cs
-                JOIN course c ON c.id = cs.course_id
-                LEFT JOIN time_setting ts ON ts.id = cs.time_setting_id
-                LEFT JOIN lesson_type lt ON lt.id = cs.lesson_type_id
-                LEFT JOIN teacher_profile tp ON tp.id = cs.teacher_id
-                WHERE cs.date = %s
-                ORDER BY ts.value, cs.id
-            """, [date_obj])
-            sessions = cursor.fetchall()
-        
-        # Create CSV
-        output = io.StringIO()
-        output.write('\ufeff')
-        writer = csv.writer(output)
-        
-        # Header
-        writer.writerow([f"Өдрийн хуваарь - Огноо: {date_obj}"])
-        writer.writerow([])
-        
-        if not sessions:
-            writer.writerow(["Энэ өдөрт хуваарь байхгүй байна."])
-        else:
-            for session in sessions:
-                cs_id, cs_name, cs_date, timeslot, lesson_type, course_name, course_code, teacher_name = session
-                
-                # Session header
-                writer.writerow([f"═══════════════════════════════════════════"])
-                writer.writerow([f"Хуваарь ID: {cs_id}"])
-                writer.writerow([f"Хуваарь нэр: {cs_name or '-'}"])
-                writer.writerow([f"Хичээл: {course_name} ({course_code})"])
-                writer.writerow([f"Багш: {teacher_name or '-'}"])
-                writer.writerow([f"Цаг: {timeslot or '-'}", f"Төрөл: {lesson_type or '-'}"])
-                writer.writerow([])
-                
-                # Get attendance for this session
-                with connection.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT 
-                            s.student_code,
-                            s.full_name,
-                            at.name as attendance_type,
-                            a.timestamp,
-                            COALESCE(cg.name, '') as class_group
-                        FROM attendance a
-                        JOIN student s ON s.id = a.student_id
-                        LEFT JOIN attendance_type at ON at.id = a.attendance_type_id
-                        LEFT JOIN student_class_group scg ON scg.student_id = s.id
-                        LEFT JOIN class_group cg ON cg.id = scg.class_group_id
-                        WHERE a.session_id = %s
-                        ORDER BY at.name DESC, s.full_name ASC
-                    """, [cs_id])
-                    att_rows = cursor.fetchall()
-                
-                if not att_rows:
-                    writer.writerow(["Ирц бүртгэл байхгүй"])
-                else:
-                    writer.writerow(["Оюутны код", "Оюутны нэр", "Статус", "Бүртгэсэн цаг", "Бүлэг"])
-                    
-                    for row in att_rows:
-                        student_code, full_name, att_type, timestamp, class_group = row
-                        ts_str = ''
-                        if timestamp:
-                            if isinstance(timestamp, datetime.datetime):
-                                ts_str = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-                            else:
-                                ts_str = str(timestamp)
-                        
-                        writer.writerow([
-                            student_code or '',
-                            full_name or '',
-                            att_type or 'Тасалсан',
-                            ts_str,
-                            class_group or '-'
-                        ])
-                    
-                    writer.writerow([f"Нийт: {len(att_rows)}"])
-                
-                writer.writerow([])
-        
-        # Generate filename
-        filename = f"daily_schedule_{date_obj}.csv"
-        
-        # Create response
-        response = HttpResponse(
-            output.getvalue(),
-            content_type='text/csv; charset=utf-8-sig'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
-        
-    except Exception as e:
-        print(f"Daily CSV export error: {e}")
-        import traceback
-        traceback.print_exc()
-        return HttpResponse(
-            f"CSV үүсгэхэд алдаа гарлаа: {str(e)}",
-            content_type="text/plain; charset=utf-8",
-            status=500
-        )
\ No newline at end of file
+        user_id = int(request.COOKIES.get('user_id'))
+    except (TypeError, ValueError):
+        return redirect('login')
+
+    semester_id = request.GET.get('semester_id') or None
+    if semester_id and not str(semester_id).isdigit():
+        return HttpResponse("semester_id буруу", content_type="text/plain; charset=utf-8", status=400)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name, code FROM course WHERE id = %s", [course_id])
+        course = cursor.fetchone()
+        cursor.execute("SELECT id FROM teacher_profile WHERE user_id = %s LIMIT 1", [user_id])
+        teacher = cursor.fetchone()
+
+    if not course:
+        return HttpResponse("Хичээл олдсонгүй", content_type="text/plain; charset=utf-8", status=404)
+
+    # Багш зөвхөн өөрийн хуваариудыг, admin бүгдийг
+    if teacher:
+        teacher_id = teacher[0]
+    elif _is_admin(request):
+        teacher_id = None
+    else:
+        return HttpResponse("Хандах эрхгүй", content_type="text/plain; charset=utf-8", status=403)
+
+    matrix = load_course_matrix(course_id, teacher_id, semester_id and int(semester_id))
+
+    response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="course_attendance_{course[1] or course_id}.xlsx"'
+    write_xlsx(matrix, response, f"Ирцийн нэгтгэл - {course[0]}")
+    return response
@@ -2,6 +2,7 @@
 from django.shortcuts import render, redirect
 from django.db import connection, transaction
 from ..utils import _is_admin, set_cookie_safe, get_cookie_safe
+from app_core.services import ref_cache
 
 # List
 def locations_list(request):
@@ -44,6 +45,7 @@ def _insert_timeslots_for_location(cursor, location_id):
         WHERE rc.type = 'timeslot'
         ORDER BY rc.id
     """, [location_id])
+    ref_cache.invalidate('time_setting')
 
 # app_core/views/locations.py - Засварласан (schedule-ээс get_school_timeslots импортлож, timeslots нэмэх)
 def get_school_timeslots(location_id=None):
@@ -101,6 +103,7 @@ def location_add(request):
                             VALUES (%s, %s, %s, %s) RETURNING id
                         """, [name, lat_f, lon_f, radius_i])
                         loc_id = cursor.fetchone()[0]
+                    ref_cache.invalidate('location')
                 response = redirect('location_edit', loc_id)
                 set_cookie_safe(response, 'flash_msg', 'Байршил амжилттай нэмэгдлээ.', 6)
                 set_cookie_safe(response, 'flash_status', 200, 6)
@@ -162,6 +165,7 @@ def location_edit(request, loc_id):
                             SET name = %s, latitude = %s, longitude = %s, radius_m = %s
                             WHERE id = %s
                         """, [name, lat_f, lon_f, radius_i, loc_id])
+                        ref_cache.invalidate('location')
 
                         print("name, radius")
                         # Одоогийн цагуудыг устгах, шинээр нэмэх
@@ -202,6 +206,7 @@ def location_edit(request, loc_id):
                         INSERT INTO time_setting (location_id, name, value, start_time, end_time)
                         VALUES (%s, %s, %s, %s, %s)
                     """, [loc_id, slot_name, f"{slot_start}-{slot_end}", slot_start + ':00', slot_end + ':00'])
+                ref_cache.invalidate('time_setting')
 
                 response = redirect('location_edit', loc_id=loc_id)
                 set_cookie_safe(response, 'flash_msg', 'Шинэ цаг нэмэгдлээ.', 6)
@@ -226,6 +231,7 @@ def location_edit(request, loc_id):
                     SET name=%s, value=%s, start_time=%s, end_time=%s
                     WHERE location_id=%s AND value=%s
                 """, [name, new_value, start_time, end_time, loc_id, old_value])
+            ref_cache.invalidate('time_setting')
             return redirect('location_edit', loc_id)
 
         elif action == 'delete_timeslot':
@@ -234,6 +240,7 @@ def location_edit(request, loc_id):
                 try:
                     with connection.cursor() as cursor:
                         cursor.execute("DELETE FROM time_setting WHERE value = %s", [slot_value])
+                    ref_cache.invalidate('time_setting')
 
                     response = redirect('location_edit', loc_id=loc_id)
                     set_cookie_safe(response, 'flash_msg', 'Цаг устгагдлаа.', 6)
@@ -263,6 +270,7 @@ def location_delete(request, loc_id):
             with transaction.atomic():
                 with connection.cursor() as cursor:
                     cursor.execute("DELETE FROM location WHERE id = %s", [loc_id])
+                    ref_cache.invalidate('location', 'time_setting')
             response = redirect('locations_list')
             set_cookie_safe(response, 'flash_msg', 'Байршил амжилттай устлаа.', 6)
             set_cookie_safe(response, 'flash_status', 200, 6)
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect
 from django.db import connection
 from app_core.utils import _is_admin
+from app_core.services import ref_cache
 from django.views.decorators.csrf import csrf_protect
 import json
 
@@ -28,6 +29,7 @@ def attendance_type_manage(request):
                             INSERT INTO attendance_type (name, value)
                             VALUES (%s, %s)
                         """, [name, value])
+                    ref_cache.invalidate('attendance_type')
                 except Exception as e:
                     error = "Утга давхцаж байна."
 
@@ -43,12 +45,14 @@ def attendance_type_manage(request):
                     SET name=%s, value=%s, updated_at=now()
                     WHERE id=%s
                 """, [name, value, _id])
+            ref_cache.invalidate('attendance_type')
 
         # DELETE
         elif action == "delete":
             _id = request.POST.get("id")
             with connection.cursor() as cursor:
                 cursor.execute("DELETE FROM attendance_type WHERE id=%s", [_id])
+            ref_cache.invalidate('attendance_type')
 
     # READ
     with connection.cursor() as cursor:
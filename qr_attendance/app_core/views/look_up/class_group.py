@@ -4,63 +4,11 @@ from django.views.decorators.csrf import csrf_protect
 from django.utils import timezone
 
 from app_core.utils import _is_admin, set_cookie_safe
+from app_core.services import repository
 
 import json
 
 
-def _get_schools():
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT id, name FROM location ORDER BY name")
-        rows = cursor.fetchall()
-    return [{"id": r[0], "name": r[1]} for r in rows]
-
-
-def _get_programs():
-    """
-    Return programs plus the school_id (via department) so frontend can filter by school.
-    """
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT p.id, p.name, p.code, d.school_id
-            FROM program p
-            JOIN department d ON p.department_id = d.id
-            ORDER BY p.code, p.name
-        """)
-        rows = cursor.fetchall()
-    return [
-        {"id": r[0], "name": r[1], "code": r[2] or "", "school_id": r[3]}
-        for r in rows
-    ]
-
-
-def _get_semesters():
-    """
-    Бүх semester Мөрүүдийг авах (school_id-тай). Frontend-д дамжуулна.
-    """
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT id, school_id, school_year, term, name, start_date, end_date, is_active, created_at
-            FROM semester
-            ORDER BY school_id, school_year DESC, term DESC
-        """)
-        rows = cursor.fetchall()
-
-    items = []
-    for r in rows:
-        items.append({
-            "id": r[0],
-            "school_id": r[1],
-            "school_year": r[2],
-            "term": r[3],
-            "name": r[4],
-            "start_date": str(r[5]) if r[5] else "",
-            "end_date": str(r[6]) if r[6] else "",
-            "is_active": r[7],
-            "created_at": str(r[8]) if r[8] else ""
-        })
-    return items
-
-
 def _detect_year_column():
     """
     class_group дээр жил хадгалах баганы нэрийг олно.
@@ -289,16 +237,16 @@ def class_group_manage(request):
                 error = f"Устгахад алдаа гарлаа: {e}"
 
     # GET
-    schools = _get_schools()
-    programs = _get_programs()
-    semesters = _get_semesters()  # used to derive available school_years
+    schools = repository.schools()
+    programs = repository.programs()
+    semesters = repository.semesters()  # used to derive available school_years
     items = _get_class_groups()
 
     return render(request, "admin/look_up/class_group_manage.html", {
         "error": error,
         "schools": schools,
-        "schools_json": json.dumps(schools, ensure_ascii=False),
-        "programs_json": json.dumps(programs, ensure_ascii=False),
-        "semesters_json": json.dumps(semesters, ensure_ascii=False),
+        "schools_json": repository.as_json(schools),
+        "programs_json": repository.as_json(programs),
+        "semesters_json": repository.as_json(semesters),
         "items": json.dumps(items, ensure_ascii=False),
     })
@@ -2,6 +2,7 @@
 from django.shortcuts import render, redirect
 from django.db import connection, transaction
 from app_core.utils import _is_admin, set_cookie_safe
+from app_core.services import ref_cache
 from django.views.decorators.csrf import csrf_protect
 import json
 
@@ -93,11 +94,8 @@ def class_room_manage(request):
         """)
         rows = cursor.fetchall()
 
-        cursor.execute("SELECT id, name FROM location ORDER BY name")
-        schools = cursor.fetchall()
-
-        cursor.execute("SELECT id, name FROM room_type ORDER BY name")
-        room_types = cursor.fetchall()
+    schools = ref_cache.location_choices()
+    room_types = sorted(((rt['id'], rt['name']) for rt in ref_cache.room_types()), key=lambda rt: rt[1] or '')
 
     items = [{
         "id": r[0],
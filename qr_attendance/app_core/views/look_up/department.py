@@ -2,6 +2,7 @@
 from django.shortcuts import render, redirect
 from django.db import connection, transaction
 from app_core.utils import _is_admin, set_cookie_safe
+from app_core.services import ref_cache
 from django.views.decorators.csrf import csrf_protect
 import json
 
@@ -87,9 +88,8 @@ def department_manage(request):
         """)
         rows = cursor.fetchall()
 
-        # schools dropdown-д ашиглах байршлууд
-        cursor.execute("SELECT id, name FROM location ORDER BY name")
-        schools = cursor.fetchall()
+    # schools dropdown-д ашиглах байршлууд
+    schools = ref_cache.location_choices()
 
     # items дотор school_name нэмсэн нь ЧУХАЛ
     items = [
@@ -2,6 +2,7 @@
 from django.shortcuts import render, redirect
 from django.db import connection, transaction
 from app_core.utils import _is_admin, set_cookie_safe
+from app_core.services import ref_cache
 from django.views.decorators.csrf import csrf_protect
 import json
 
@@ -31,6 +32,7 @@ def lesson_type_manage(request):
                                 INSERT INTO lesson_type (name, value)
                                 VALUES (%s, %s)
                             """, [name, value])
+                        ref_cache.invalidate('lesson_type')
 
                     resp = redirect("lesson_type_manage")
                     set_cookie_safe(resp, "flash_msg", "Амжилттай нэмэгдлээ", 5)
@@ -57,6 +59,7 @@ def lesson_type_manage(request):
                                 SET name=%s, value=%s
                                 WHERE id=%s
                             """, [name, value, _id])
+                        ref_cache.invalidate('lesson_type')
 
                     resp = redirect("lesson_type_manage")
                     set_cookie_safe(resp, "flash_msg", "Амжилттай шинэчлэгдлээ", 5)
@@ -73,6 +76,7 @@ def lesson_type_manage(request):
                 with transaction.atomic():
                     with connection.cursor() as cursor:
                         cursor.execute("DELETE FROM lesson_type WHERE id=%s", [_id])
+                    ref_cache.invalidate('lesson_type')
 
                 resp = redirect("lesson_type_manage")
                 set_cookie_safe(resp, "flash_msg", "Амжилттай устгалаа", 5)
@@ -99,8 +103,4 @@ def lesson_type_manage(request):
     })
 
 def _get_lesson_types():
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT id, name, value FROM lesson_type ORDER BY id ASC")
-        rows = cursor.fetchall()
-
-    return [{"id": r[0], "name": r[1], "value": r[2]} for r in rows]
\ No newline at end of file
+    return ref_cache.lesson_types()
\ No newline at end of file
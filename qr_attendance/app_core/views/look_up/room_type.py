@@ -2,6 +2,7 @@
 from django.shortcuts import render, redirect
 from django.db import connection, transaction
 from app_core.utils import _is_admin, set_cookie_safe
+from app_core.services import ref_cache
 from django.views.decorators.csrf import csrf_protect
 import json
 
@@ -25,6 +26,7 @@ def room_type_manage(request):
                             INSERT INTO room_type (code, name)
                             VALUES (%s, %s)
                         """, [code, name])
+                    ref_cache.invalidate('room_type')
                 resp = redirect("room_type_manage")
                 set_cookie_safe(resp, "flash_msg", "Амжилттай нэмэгдлээ", 5)
                 set_cookie_safe(resp, "flash_status", 200, 5)
@@ -48,6 +50,7 @@ def room_type_manage(request):
                                 SET code=%s, name=%s
                                 WHERE id=%s
                             """, [code, name, _id])
+                        ref_cache.invalidate('room_type')
                     resp = redirect("room_type_manage")
                     set_cookie_safe(resp, "flash_msg", "Амжилттай шинэчлэгдлээ", 5)
                     set_cookie_safe(resp, "flash_status", 200, 5)
@@ -62,6 +65,7 @@ def room_type_manage(request):
                 with transaction.atomic():
                     with connection.cursor() as cursor:
                         cursor.execute("DELETE FROM room_type WHERE id=%s", [_id])
+                    ref_cache.invalidate('room_type')
                 resp = redirect("room_type_manage")
                 set_cookie_safe(resp, "flash_msg", "Амжилттай устгалаа", 5)
                 set_cookie_safe(resp, "flash_status", 200, 5)
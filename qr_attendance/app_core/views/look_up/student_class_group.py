@@ -2,16 +2,10 @@ from django.shortcuts import render, redirect
 from django.db import connection, transaction
 from django.views.decorators.csrf import csrf_protect
 from django.core.paginator import Paginator
-from django.utils import timezone
 from app_core.utils import _is_admin, set_cookie_safe
+from app_core.services import bulk_enrollment, repository, roster_import, session_roster
 import json
 
-def _get_schools():
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT id, name FROM location ORDER BY name")
-        rows = cursor.fetchall()
-    return [{"id": r[0], "name": r[1]} for r in rows]
-
 def _get_years():
     """Бүх оныг буцаана"""
     with connection.cursor() as cursor:
@@ -24,151 +18,6 @@ def _get_years():
         rows = cursor.fetchall()
     return [r[0] for r in rows]
 
-def _get_departments(school_id=None):
-    with connection.cursor() as cursor:
-        q = "SELECT id, school_id, name, code FROM department"
-        params = []
-        if school_id:
-            q += " WHERE school_id = %s"
-            params.append(school_id)
-        q += " ORDER BY school_id, code, name"
-        cursor.execute(q, params)
-        rows = cursor.fetchall()
-    return [
-        {"id": r[0], "school_id": r[1], "name": r[2], "code": r[3] or ""}
-        for r in rows
-    ]
-
-def _get_programs(school_id=None, department_id=None):
-    """Хөтөлбөрүүдийг авах"""
-    with connection.cursor() as cursor:
-        q = """
-            SELECT p.id, p.department_id, p.name, p.code, d.school_id
-            FROM program p
-            JOIN department d ON p.department_id = d.id
-        """
-        params = []
-        where = []
-        
-        if school_id:
-            where.append("d.school_id = %s")
-            params.append(school_id)
-        if department_id:
-            where.append("p.department_id = %s")
-            params.append(department_id)
-            
-        if where:
-            q += " WHERE " + " AND ".join(where)
-        q += " ORDER BY p.code, p.name"
-        
-        cursor.execute(q, params)
-        rows = cursor.fetchall()
-    return [
-        {
-            "id": r[0],
-            "department_id": r[1],
-            "name": r[2],
-            "code": r[3] or "",
-            "school_id": r[4]
-        }
-        for r in rows
-    ]
-
-def _get_class_groups(school_id=None, year=None, department_id=None, program_id=None):
-    with connection.cursor() as cursor:
-        q = """
-            SELECT
-                cg.id, cg.name, cg.year, cg.school_id,
-                p.id AS program_id, p.name AS program_name, p.code AS program_code,
-                d.id AS department_id, d.name AS department_name
-            FROM class_group cg
-            JOIN program p ON cg.program_id = p.id
-            JOIN department d ON p.department_id = d.id
-        """
-        params = []
-        where = []
-        
-        if school_id:
-            where.append("cg.school_id = %s")
-            params.append(school_id)
-        if year:
-            where.append("cg.year = %s")
-            params.append(year)
-        if department_id:
-            where.append("d.id = %s")
-            params.append(department_id)
-        if program_id:
-            where.append("p.id = %s")
-            params.append(program_id)
-            
-        if where:
-            q += " WHERE " + " AND ".join(where)
-        q += " ORDER BY cg.year DESC, p.code, cg.name"
-        
-        cursor.execute(q, params)
-        rows = cursor.fetchall()
-    return [
-        {
-            "id": r[0],
-            "name": r[1] or "",
-            "year": r[2],
-            "school_id": r[3],
-            "program_id": r[4],
-            "program_name": r[5] or "",
-            "program_code": r[6] or "",
-            "department_id": r[7],
-            "department_name": r[8] or ""
-        }
-        for r in rows
-    ]
-
-def _get_students(school_id=None):
-    """Оюутнуудыг авах"""
-    with connection.cursor() as cursor:
-        q = """
-            SELECT DISTINCT
-                s.id,
-                s.student_code,
-                s.full_name
-            FROM student s
-        """
-        params = []
-        if school_id:
-            q += """
-                LEFT JOIN student_class_group scg ON s.id = scg.student_id
-                LEFT JOIN class_group cg ON scg.class_group_id = cg.id
-                WHERE cg.school_id = %s OR cg.school_id IS NULL
-            """
-            params.append(school_id)
-        q += " ORDER BY s.full_name"
-        
-        cursor.execute(q, params)
-        rows = cursor.fetchall()
-    
-    return [
-        {
-            "id": r[0],
-            "student_code": r[1] or "",
-            "full_name": r[2] or ""
-        }
-        for r in rows
-    ]
-
-def _get_students_in_class_group(class_group_id):
-    """Тодорхой бүлэгт элссэн оюутнуудын ID"""
-    if not class_group_id:
-        return []
-    
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT student_id
-            FROM student_class_group
-            WHERE class_group_id = %s
-        """, [class_group_id])
-        rows = cursor.fetchall()
-    
-    return [r[0] for r in rows]
-
 def _get_student_year_enrollments(year):
     """
     Тухайн оны бүх оюутнуудын элсэлтийг авах
@@ -304,37 +153,19 @@ def student_class_group_manage(request):
                             error = "Анги олдсонгүй"
                         else:
                             selected_year = row[0]
-                            
-                            # Тухайн оны бүх элсэлтийг шалгах
-                            year_enrollments = _get_student_year_enrollments(selected_year)
-                            
+
+                            # Нэг statement: энэ бүлэгт эсвэл тухайн онд өөр бүлэгт элссэнийг
+                            # алгасаад оюутан бүрийн үр дүнг буцаана
                             with transaction.atomic():
-                                added_count = 0
-                                skipped_students = []
-                                
-                                for sid in student_ids:
-                                    sid_int = int(sid)
-                                    
-                                    # Тухайн онд аль хэдийн элссэн эсэхийг шалгах
-                                    if sid_int in year_enrollments:
-                                        existing_group = year_enrollments[sid_int]["class_group_name"]
-                                        skipped_students.append(f"{sid} ({existing_group})")
-                                        continue
-                                    
-                                    # Тухайн бүлэгт аль хэдийн элссэн эсэхийг шалгах
-                                    cursor.execute("""
-                                        SELECT 1 FROM student_class_group
-                                        WHERE student_id = %s AND class_group_id = %s
-                                    """, [sid, class_group_id])
-                                    if cursor.fetchone():
-                                        continue
-                                    
-                                    cursor.execute("""
-                                        INSERT INTO student_class_group (student_id, class_group_id, created_at)
-                                        VALUES (%s, %s, %s)
-                                    """, [sid, class_group_id, timezone.now()])
-                                    added_count += 1
-                                
+                                outcomes = roster_import.assign_to_group(class_group_id, student_ids)
+                            added_count = sum(1 for _, outcome, _ in outcomes if outcome == bulk_enrollment.ENROLLED)
+                            skipped_students = [
+                                f"{sid} ({group_name})"
+                                for sid, outcome, group_name in outcomes
+                                if outcome == bulk_enrollment.CONFLICT
+                            ]
+
+                            session_roster.invalidate()  # бүлгийн гишүүнчлэл өөрчлөгдсөн
                             resp = redirect("student_class_group_manage")
                             
                             if skipped_students:
@@ -358,6 +189,7 @@ def student_class_group_manage(request):
                     with connection.cursor() as cursor:
                         cursor.execute("DELETE FROM student_class_group WHERE id = %s", [assignment_id])
                         
+                session_roster.invalidate()  # бүлгийн гишүүнчлэл өөрчлөгдсөн
                 resp = redirect("student_class_group_manage")
                 set_cookie_safe(resp, "flash_msg", "Оюутныг бүлгээс гаргалаа", 5)
                 set_cookie_safe(resp, "flash_status", 200, 5)
@@ -408,6 +240,7 @@ def student_class_group_manage(request):
                         cursor.execute(q, params)
                         count = cursor.rowcount
                         
+                session_roster.invalidate()  # бүлгийн гишүүнчлэл өөрчлөгдсөн
                 resp = redirect("student_class_group_manage")
                 set_cookie_safe(resp, "flash_msg", f"{count} оюутныг бүлгээс гаргалаа", 5)
                 set_cookie_safe(resp, "flash_status", 200, 5)
@@ -416,12 +249,11 @@ def student_class_group_manage(request):
                 error = f"Гаргахад алдаа: {e}"
     
     # GET - датаг унших
-    schools = _get_schools()
+    schools = repository.schools()
     years = _get_years()
-    departments = _get_departments()
-    programs = _get_programs()
-    class_groups = _get_class_groups()
-    students = _get_students()
+    departments = repository.departments()
+    programs = repository.programs()
+    class_groups = repository.class_groups()
     
     # Шүүлтүүр
     filter_school = request.GET.get("school_id") or None
@@ -450,7 +282,7 @@ def student_class_group_manage(request):
     
     # Элсүүлэх хэсэгт сонгогдсон бүлэгт аль хэдийн элссэн оюутнууд
     selected_class_group_for_assign = request.GET.get("assign_class_group_id") or None
-    assigned_student_ids = _get_students_in_class_group(selected_class_group_for_assign) if selected_class_group_for_assign else []
+    assigned_student_ids = repository.class_group_student_ids(selected_class_group_for_assign) if selected_class_group_for_assign else []
     
     # Элсүүлэх хэсэгт сонгогдсон оны бүх элсэлтүүд
     selected_year_for_assign = request.GET.get("assign_year") or None
@@ -463,7 +295,6 @@ def student_class_group_manage(request):
         "departments": departments,
         "programs": programs,
         "class_groups": class_groups,
-        "students": students,
         "assignments": page_items,
         "paginator": paginator,
         "page_obj": page_obj,
@@ -477,12 +308,11 @@ def student_class_group_manage(request):
         "assigned_student_ids": assigned_student_ids,
         "year_enrollments": year_enrollments,
         # JSON форматаар
-        "schools_json": json.dumps(schools, ensure_ascii=False),
+        "schools_json": repository.as_json(schools),
         "years_json": json.dumps(years, ensure_ascii=False),
-        "departments_json": json.dumps(departments, ensure_ascii=False),
-        "programs_json": json.dumps(programs, ensure_ascii=False),
-        "class_groups_json": json.dumps(class_groups, ensure_ascii=False),
-        "students_json": json.dumps(students, ensure_ascii=False),
+        "departments_json": repository.as_json(departments),
+        "programs_json": repository.as_json(programs),
+        "class_groups_json": repository.as_json(class_groups),
         "assigned_student_ids_json": json.dumps(assigned_student_ids, ensure_ascii=False),
         "year_enrollments_json": json.dumps(year_enrollments, ensure_ascii=False),
     })
\ No newline at end of file
@@ -5,10 +5,31 @@ from django.shortcuts import render, redirect
 from django.db import connection, transaction
 from django.views.decorators.csrf import csrf_protect
 from django.utils import timezone
-from ..utils import _is_admin, set_cookie_safe, get_cookie_safe, _get_semesters, _get_room_types, _get_class_rooms, _get_programs, _get_class_groups, _get_current_semester_pattern, _get_students
+from ..utils import _is_admin, set_cookie_safe, get_cookie_safe, _get_current_semester_pattern
 from datetime import datetime, timedelta, date
 import json
 
+from app_core.services import bulk_enrollment, ref_cache, repository, schedule_builder, search
+
+
+def _available_students(course_schedule_pattern_id, q):
+    """Pattern-д бүртгэгдээгүй, q-д тохирох оюутнууд: [(id, name, student_code)]"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT S.id, S.full_name, S.student_code
+            FROM student S
+            WHERE ({search.STUDENT_HAY}) LIKE %s
+              AND S.id NOT IN (
+                  SELECT E.student_id
+                  FROM enrollment E
+                  INNER JOIN class_group_schedule CGS ON CGS.id = E.class_group_schedule_id
+                  WHERE CGS.course_schedule_pattern_id = %s
+              )
+            ORDER BY S.full_name
+            LIMIT 100
+        """, [search.contains_pattern(q), course_schedule_pattern_id])
+        return cursor.fetchall()
+
 
 @csrf_protect
 def register_student_pattern(request, course_schedule_pattern_id):
@@ -43,22 +64,7 @@ def register_student_pattern(request, course_schedule_pattern_id):
     q = request.GET.get('q', '').strip()
     available_students = []
     if q:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT S.id, S.full_name, S.student_code
-                FROM student S
-                WHERE (S.full_name ILIKE %s OR S.student_code ILIKE %s)
-                  AND S.id NOT IN (
-                      SELECT E.student_id
-                      FROM enrollment E
-                      INNER JOIN class_group_schedule CGS ON CGS.id = E.class_group_schedule_id
-                      WHERE CGS.course_schedule_pattern_id = %s
-                  )
-                ORDER BY S.full_name
-                LIMIT 100
-            """, [f'%{q}%', f'%{q}%', course_schedule_pattern_id])
-            available_students = cursor.fetchall()
-            # (id, name, student_code)
+        available_students = _available_students(course_schedule_pattern_id, q)
 
     # Handle POST (add / delete)
     message = None
@@ -75,22 +81,18 @@ def register_student_pattern(request, course_schedule_pattern_id):
                 error = "Оюутан эсвэл бүлэг сонгогдоогүй байна."
             else:
                 try:
-                    with transaction.atomic():
-                        with connection.cursor() as cursor:
-                            # check duplicate
-                            cursor.execute("""
-                                SELECT id FROM enrollment
-                                WHERE student_id = %s AND class_group_schedule_id = %s
-                            """, [student_id, class_group_schedule_id])
-                            exists = cursor.fetchone()
-                            if exists:
-                                error = "Энэхүү оюутан аль хэдийн энэ хуваарьт бүртгэлтэй байна."
-                            else:
-                                cursor.execute("""
-                                    INSERT INTO enrollment (student_id, class_group_schedule_id)
-                                    VALUES (%s, %s)
-                                """, [student_id, class_group_schedule_id])
-                                message = "Оюутан амжилттай бүртгэгдлээ."
+                    result = bulk_enrollment.enroll(
+                        class_group_schedule_id=class_group_schedule_id, student_ids=[student_id],
+                    )
+                    counts = result.counts
+                    if counts[bulk_enrollment.ENROLLED]:
+                        message = "Оюутан амжилттай бүртгэгдлээ."
+                    elif counts[bulk_enrollment.ALREADY]:
+                        error = "Энэхүү оюутан аль хэдийн энэ хуваарьт бүртгэлтэй байна."
+                    elif counts[bulk_enrollment.CONFLICT]:
+                        error = "Энэхүү оюутан энэ хуваарьт өөр бүлгээр бүртгэлтэй байна."
+                    else:
+                        error = "Оюутан олдсонгүй."
                 except Exception as e:
                     error = f"Бүртгэх үед алдаа гарлаа: {str(e)}"
 
@@ -134,21 +136,7 @@ def register_student_pattern(request, course_schedule_pattern_id):
 
         # refresh available_students if q present
         if q:
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT S.id, S.full_name, S.student_code
-                    FROM student S
-                    WHERE (S.full_name ILIKE %s OR S.student_code ILIKE %s)
-                      AND S.id NOT IN (
-                          SELECT E.student_id
-                          FROM enrollment E
-                          INNER JOIN class_group_schedule CGS ON CGS.id = E.class_group_schedule_id
-                          WHERE CGS.course_schedule_pattern_id = %s
-                      )
-                    ORDER BY S.full_name
-                    LIMIT 100
-                """, [f'%{q}%', f'%{q}%', course_schedule_pattern_id])
-                available_students = cursor.fetchall()
+            available_students = _available_students(course_schedule_pattern_id, q)
 
     # render
     return render(request, 'admin/schedule/register_student_pattern.html', {
@@ -214,29 +202,13 @@ def get_school_timeslots(school_id=None):
     We read from time_setting: if rows exist for that school -> use those,
     otherwise allow global ones (location_id IS NULL) or fallback to ref_constant timeslot.
     """
-    with connection.cursor() as cursor:
-        if school_id:
-            cursor.execute("""
-                SELECT id, name, value, start_time, end_time
-                FROM time_setting
-                WHERE location_id = %s
-                ORDER BY start_time
-            """, [school_id])
-            rows = cursor.fetchall()
-            if rows:
-                return [{'id': r[0], 'name': r[1], 'slot': r[2], 'start_time': r[3], 'end_time': r[4]} for r in rows]
-
+    rows = ref_cache.timeslots(school_id, order='start_time') if school_id else []
+    if not rows:
         # fallback: global time_setting where location_id IS NULL
-        with connection.cursor() as cursor2:
-            cursor2.execute("""
-                SELECT id, name, value, start_time, end_time
-                FROM time_setting
-                WHERE location_id IS NULL
-                ORDER BY start_time
-            """)
-            rows2 = cursor2.fetchall()
-            if rows2:
-                return [{'id': r[0], 'name': r[1], 'slot': r[2], 'start_time': r[3], 'end_time': r[4]} for r in rows2]
+        rows = [t for t in ref_cache.timeslots(order='start_time') if t['location_id'] is None]
+    if rows:
+        return [{'id': t['id'], 'name': t['name'], 'slot': t['value'],
+                 'start_time': t['start_time'], 'end_time': t['end_time']} for t in rows]
 
 
 # --------------------------
@@ -253,9 +225,7 @@ def semester_list(request):
     selected_school = request.GET.get("school_id")
 
     # Load all schools (location table)
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT id, name FROM location ORDER BY name")
-        schools = cursor.fetchall()
+    schools = ref_cache.location_choices()
 
     params = []
     where = ""
@@ -299,10 +269,7 @@ def semester_create(request):
         return redirect('login')
 
     # load schools (we use location as school)
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT id, name FROM location ORDER BY name")
-        schools = cursor.fetchall()  # list of tuples (id, name)
-        print("schools: ", schools)
+    schools = ref_cache.location_choices()  # list of tuples (id, name)
         
     if request.method == 'POST':
         school_id = request.POST.get('school_id') or None
@@ -389,15 +356,11 @@ def schedule_edit(request, semester_id):
     if not _is_admin(request):
         return redirect('login')
     
-    semester = _get_semesters(semester_id)
-    school_id = semester['school_id']  
-    
-    room_types = _get_room_types()
-    class_rooms = _get_class_rooms(school_id)
-    programs = _get_programs(school_id)
-    class_groups =_get_class_groups(school_id, semester['school_year'])
-    patterns = _get_current_semester_pattern(semester_id, None)
-    # 3) Handle POST actions
+    semester = repository.semester(semester_id)
+    school_id = semester.school_id
+    error = None
+
+    # 3) Handle POST actions (амжилттай бол redirect - доорх жагсаалтуудыг ачаалахгүй)
     if request.method == 'POST':
         action = request.POST.get('action')
 
@@ -416,68 +379,31 @@ def schedule_edit(request, semester_id):
 
             # basic validation
             if not all([course_id, teacher_id, day, timeslot, lesson_type_id, group_ids, class_room_id]):
-                redirect('schedule_edit', semester_id=semester_id)
-            try:
-                freq_int = int(frequency)
-            except ValueError:
-                freq_int = 1
-            print("here")
-
-            try:
-                with transaction.atomic():
-                    with connection.cursor() as cursor:
-                        cursor.execute("""
-                            INSERT INTO course_schedule_pattern
-                            (semester_id, course_id, teacher_id, day_of_week, 
-                            lesson_type_id, location_id, frequency, time_setting_id,
-                            class_room_id)
-                            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                            RETURNING id
-                        """, [
-                            semester_id, course_id, teacher_id, day, 
-                            lesson_type_id, location_id, freq_int, time_setting_id, class_room_id
-                        ])
-                    
-                        pattern_id = cursor.fetchone()[0]
-                    print("fets: ", pattern_id)
-                    for class_group_id in group_ids:
-                        with connection.cursor() as cursor:
-                            cursor.execute("""
-                                INSERT INTO class_group_schedule(class_group_id, course_schedule_pattern_id)
-                                VALUES(%s, %s)
-                                RETURNING id
-                            """, [class_group_id, pattern_id])
-                            class_group_schedule_id = cursor.fetchone()[0]
-                        print("fets2: ", class_group_schedule_id)
+                error = 'Хичээл, багш, гараг, цаг, төрөл, анги танхим, бүлгийг сонгоно уу'
+            else:
+                try:
+                    freq_int = int(frequency)
+                except ValueError:
+                    freq_int = 1
 
-                        with connection.cursor() as cursor:
-                            cursor.execute("""
-                                INSERT INTO enrollment (student_id, class_group_schedule_id)
-                                SELECT 
-                                    B.student_id,
-                                    %s
-                                FROM class_group A
-                                INNER JOIN student_class_group B ON A.id = B.class_group_id
-                                WHERE A.id = %s
-                            """, [class_group_schedule_id, class_group_id])
-                        print("fets3 ")
-                        
-                r = redirect('schedule_edit', semester_id=semester_id)
-                set_cookie_safe(r, 'flash_msg', 'Хичээлийн хуваарь амжилттай нэмэгдлээ', 5)
-                set_cookie_safe(r, 'flash_status', 200, 5)
-                return r
-            except Exception as e:
-                # Fall back to render with error
-                return render(request, 'admin/schedule/schedule_edit.html', {
-                    'semester': semester,
-                    'patterns': patterns,
-                    'courses': [],
-                    'teachers': [],
-                    'locations': [],
-                    'timeslots': get_school_timeslots(school_id),
-                    'lesson_types': [],
-                    'error': f'Хадгалах үед алдаа: {str(e)}'
-                })
+                try:
+                    # Pattern + бүлгүүд + бүлгийн оюутнуудын элсэлт нэг statement-ээр
+                    with transaction.atomic():
+                        pattern_id = schedule_builder.create_pattern(
+                            semester_id, group_ids,
+                            course_id=course_id, teacher_id=teacher_id, day_of_week=day,
+                            lesson_type_id=lesson_type_id, location_id=location_id, frequency=freq_int,
+                            time_setting_id=time_setting_id, class_room_id=class_room_id,
+                        )
+                    if pattern_id is None:
+                        error = 'Энэ хичээл, багш, гараг, цагт хуваарь аль хэдийн байна'
+                    else:
+                        r = redirect('schedule_edit', semester_id=semester_id)
+                        set_cookie_safe(r, 'flash_msg', 'Хичээлийн хуваарь амжилттай нэмэгдлээ', 5)
+                        set_cookie_safe(r, 'flash_status', 200, 5)
+                        return r
+                except Exception as e:
+                    error = f'Хадгалах үед алдаа: {str(e)}'
 
         elif action == 'delete_pattern':
             pattern_id = request.POST.get('pattern_id')
@@ -525,7 +451,13 @@ def schedule_edit(request, semester_id):
                 set_cookie_safe(r, 'flash_status', 500, 6)
                 return r
 
-    # 4) GET: load dropdowns filtered by school (if available)
+    # 4) GET (эсвэл алдаатай POST): load dropdowns filtered by school (if available)
+    room_types = ref_cache.room_types()
+    class_rooms = repository.class_rooms(school_id)
+    programs = repository.programs(school_id)
+    class_groups = repository.class_groups(school_id, semester.school_year)
+    patterns = _get_current_semester_pattern(semester_id, None)
+
     with connection.cursor() as cursor:
         # courses (all courses)
         cursor.execute("SELECT id, name, code FROM course ORDER BY name")
@@ -535,23 +467,13 @@ def schedule_edit(request, semester_id):
         cursor.execute("SELECT id, name FROM teacher_profile ORDER BY name")
         teachers = cursor.fetchall()
 
-        # locations: prefer locations for this school_id, but if none, list all
-        if school_id:
-            cursor.execute("SELECT id, name FROM location WHERE id = %s ORDER BY name", [school_id])
-            locations = cursor.fetchall()
-            # if that returned empty, fallback to all locations
-            if not locations:
-                cursor.execute("SELECT id, name FROM location ORDER BY name")
-                locations = cursor.fetchall()
-        else:
-            cursor.execute("SELECT id, name FROM location ORDER BY name")
-            locations = cursor.fetchall()
+    # locations: prefer locations for this school_id, but if none, list all
+    locations = ref_cache.location_choices()
+    if school_id:
+        # if that returned empty, fallback to all locations
+        locations = [loc for loc in locations if loc[0] == school_id] or locations
 
-        cursor.execute("""
-            SELECT id, name, value FROM lesson_type
-            ORDER BY id
-        """, [school_id])
-        lesson_types = cursor.fetchall()
+    lesson_types = [(lt['id'], lt['name'], lt['value']) for lt in ref_cache.lesson_types()]
 
     timeslots = get_school_timeslots(school_id)
 
@@ -567,7 +489,8 @@ def schedule_edit(request, semester_id):
         'room_types': room_types,
         'class_rooms': class_rooms,
         'programs': programs,
-        'class_groups': class_groups
+        'class_groups': class_groups,
+        'error': error,
     })
 
 
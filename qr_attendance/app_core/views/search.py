@@ -0,0 +1,36 @@
+# app_core/views/search.py
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from app_core.services import search
+
+
+def _logged_in(request):
+    # админ болон багш (role_name cookie аль нь ч байж болно)
+    return bool(request.COOKIES.get('user_id'))
+
+
+@require_GET
+def api_search_students(request):
+    """GET ?q=&limit=&class_group_id= -> {"results": [{id, student_code, full_name}]}"""
+    if not _logged_in(request):
+        return JsonResponse({'error': 'Нэвтрэх шаардлагатай'}, status=403)
+    q = request.GET.get('q', '')
+    class_group_id = request.GET.get('class_group_id') or None
+    if class_group_id is not None:
+        try:
+            class_group_id = int(class_group_id)
+        except ValueError:
+            return JsonResponse({'error': 'class_group_id буруу'}, status=400)
+    if not q.strip() and not class_group_id:
+        return JsonResponse({'results': []})
+    results = search.students(q, limit=request.GET.get('limit'), class_group_id=class_group_id)
+    return JsonResponse({'results': results})
+
+
+@require_GET
+def api_search_courses(request):
+    """GET ?q=&limit= -> {"results": [{id, code, name}]}"""
+    if not _logged_in(request):
+        return JsonResponse({'error': 'Нэвтрэх шаардлагатай'}, status=403)
+    return JsonResponse({'results': search.courses(request.GET.get('q', ''), limit=request.GET.get('limit'))})
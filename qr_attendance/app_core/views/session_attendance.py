@@ -2,16 +2,16 @@
 # Place this file into your app_core/views/ directory.
 
 import uuid
-import base64
-from io import BytesIO
 from datetime import timedelta
 from django.shortcuts import render, redirect, HttpResponse
 from django.db import connection, transaction
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.http import JsonResponse
+from django.urls import reverse
 from ..utils import _is_admin, set_cookie_safe
-import qrcode  # ensure `qrcode` package installed (pip install qrcode[pil])
+from app_core.services import search, session_roster, qr_render, qr_token
+from app_core.services.session_prefill import preregister_absent
 
 
 # 1) page to show pattern details and Generate button
@@ -76,7 +76,7 @@ def generate_qr_session(request, pattern_id):
             with connection.cursor() as cursor:
                 # find pattern row (also validate)
                 cursor.execute("""
-                    SELECT teacher_id, course_id, location_id, lesson_type_id, timeslot
+                    SELECT teacher_id, course_id, location_id, lesson_type_id, timeslot, semester_id
                     FROM course_schedule_pattern WHERE id=%s
                 """, [pattern_id])
                 row = cursor.fetchone()
@@ -86,7 +86,7 @@ def generate_qr_session(request, pattern_id):
                     set_cookie_safe(r, 'flash_status', 404, 5)
                     return r
 
-                teacher_id, course_id, location_id, lesson_type_id, timeslot = row
+                teacher_id, course_id, location_id, lesson_type_id, timeslot, semester_id = row
 
                 # try to find matching time_setting id by timeslot string
                 cursor.execute("""
@@ -116,12 +116,21 @@ def generate_qr_session(request, pattern_id):
                 # insert into class_session
                 cursor.execute("""
                     INSERT INTO class_session
-                        (teacher_id, course_id, location_id, lesson_type_id, time_setting_id, token, expires_at, date, created_at)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,CURRENT_DATE,now())
+                        (teacher_id, course_id, location_id, lesson_type_id, time_setting_id, token, expires_at, date, created_at,
+                         semester_id)
+                    VALUES (%s,%s,%s,%s,%s,%s,%s,CURRENT_DATE,now(),
+                            COALESCE(%s::bigint, attendance_course_semester(%s, CURRENT_DATE)))
                     RETURNING id
-                """, [teacher_id, course_id, location_id, lesson_type_id, time_setting_id, token, expires_at])
+                """, [teacher_id, course_id, location_id, lesson_type_id, time_setting_id, token, expires_at,
+                      semester_id, course_id])
                 session_id = cursor.fetchone()[0]
 
+            # Pattern-ийн бүх оюутныг "Тасалсан" байдлаар урьдчилан бүртгэнэ
+            preregister_absent(session_id, pattern_id)
+
+        # scan-ы enrollment шалгалтад зориулж roster-ийг урьдчилан бэлдэнэ
+        session_roster.build(session_id, course_id, expires_at)
+
         return redirect('teacher_qr_display', session_id=session_id)
 
     except Exception as e:
@@ -149,29 +158,38 @@ def teacher_qr_display(request, session_id):
         return r
 
     token, expires_at, course_id, teacher_id, location_id = row
-    # Build attendance check URL
-    base = request.build_absolute_uri('/')[:-1]
-    attendance_url = f"{base}/attendance/check/?token={token}"
-
-    # generate QR image base64
-    qr = qrcode.QRCode(border=1)
-    qr.add_data(attendance_url)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-
-    buf = BytesIO()
-    img.save(buf, format='PNG')
-    b64 = base64.b64encode(buf.getvalue()).decode()
+    # Rotating HMAC token: дэлгэц QR_ROTATE_SECONDS тутам шинэ token татна
+    attendance_url, b64 = _rotating_qr(request, session_id)
 
     return render(request, 'teacher/qr_display.html', {
         'qr_base64': b64,
         'expires_at': expires_at,
         'attendance_url': attendance_url,
         'session_id': session_id,
-        'token': token
+        'token': token,
+        'rotate_seconds': qr_token.rotate_seconds(),
     })
 
 
+# 3b) QR display polling endpoint: fresh signed token, no DB access
+def teacher_qr_rotate(request, session_id):
+    if not _is_admin(request):
+        return JsonResponse({'ok': False, 'error': 'forbidden'}, status=403)
+    attendance_url, b64 = _rotating_qr(request, session_id)
+    return JsonResponse({
+        'ok': True,
+        'url': attendance_url,
+        'qr_base64': b64,
+        'refresh_in': qr_token.rotate_seconds(),
+    })
+
+
+def _rotating_qr(request, session_id):
+    signed = qr_token.sign_scan(session_id)
+    attendance_url = request.build_absolute_uri(reverse('scan_page_signed', args=[signed]))
+    return attendance_url, qr_render.qr_base64(attendance_url, border=1, cache=False)
+
+
 # 4) attendance_check: public endpoint to verify token and return session meta
 def attendance_check(request):
     token = request.GET.get('token')
@@ -258,11 +276,7 @@ def attendance_mark(request):
                 if not cursor.fetchone():
                     student_id = None
         if not student_id:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT id FROM student WHERE student_code=%s OR full_name ILIKE %s LIMIT 1", [student_code, student_code])
-                s = cursor.fetchone()
-                if s:
-                    student_id = s[0]
+            student_id = search.student_id_exact(student_code)
     except Exception:
         return JsonResponse({'ok': False, 'error': 'Оюутан олж чадсангүй'}, status=404)
 
@@ -270,6 +284,8 @@ def attendance_mark(request):
         return JsonResponse({'ok': False, 'error': 'Student олдсонгүй'}, status=404)
 
     # prevent duplicate attendance for same session & student (optional)
+    if session_roster.already_scanned(session_id, student_id):
+        return JsonResponse({'ok': False, 'error': 'Энэ оюутан аль хэдийн бүртгэгдсэн'}, status=409)
     with connection.cursor() as cursor:
         cursor.execute("SELECT id FROM attendance WHERE session_id=%s AND student_id=%s LIMIT 1", [session_id, student_id])
         if cursor.fetchone():
@@ -294,6 +310,8 @@ def attendance_mark(request):
     except Exception as e:
         return JsonResponse({'ok': False, 'error': f'DB алдаа: {str(e)}'}, status=500)
 
+    session_roster.mark_scanned(session_id, student_id)
+
     return JsonResponse({'ok': True, 'attendance_id': att_id})
 
 
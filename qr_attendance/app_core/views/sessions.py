@@ -1,10 +1,11 @@
 # app_core/views/sessions.py
 from django.shortcuts import render, redirect
 from django.db import connection, transaction
+from django.http import JsonResponse
 from ..utils import _is_admin, set_cookie_safe
-from io import BytesIO
-import base64, datetime, qrcode
+import datetime
 from django.conf import settings
+from app_core.services import keyset, qr_render, ref_cache
 
 def dictfetchall(cursor):
     "Return all rows from a cursor as a dict"
@@ -19,18 +20,39 @@ def sessions_list(request):
     if not _is_admin(request):
         return redirect('login')
 
-    today = datetime.date.today()
+    page, sessions = _sessions_page(request)
+    return render(request, 'admin/sessions/list.html', {
+        'sessions': sessions,
+        'page': page,
+        'today': datetime.date.today(),
+    })
 
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT cs.id, cs.course_id, c.name AS course_name, c.code AS course_code,
-                   cs.date, cs.timeslot, cs.lesson_type, cs.teacher_id, cs.location_id, cs.token
-            FROM class_session cs
-            JOIN course c ON c.id = cs.course_id
-            ORDER BY cs.date DESC, cs.timeslot, cs.id DESC
-            LIMIT 500
-        """)
-        rows = cursor.fetchall()
+
+def api_sessions_list(request):
+    """GET ?limit=&after=|before= -> {"results": [...], "next": token, "prev": token}"""
+    if not _is_admin(request):
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    page, sessions = _sessions_page(request)
+    for s in sessions:
+        s['date'] = s['date'].isoformat() if s['date'] else None
+        s['token'] = str(s['token']) if s['token'] else None
+    return JsonResponse({'results': sessions, **page.as_json()})
+
+
+# (date, id) DESC keyset - index_pack.sql: class_session_date_id_idx
+SESSIONS_PAGE_SQL = """
+    SELECT cs.id, cs.course_id, c.name AS course_name, c.code AS course_code,
+           cs.date, cs.timeslot, cs.lesson_type, cs.teacher_id, cs.location_id, cs.token,
+           cs.date, cs.id
+    FROM class_session cs
+    JOIN course c ON c.id = cs.course_id
+    WHERE TRUE {keyset}
+"""
+
+
+def _sessions_page(request):
+    page = keyset.paginate(SESSIONS_PAGE_SQL, [], ['cs.date', 'cs.id'], request=request, descending=True)
+    rows = page.rows
 
     # Build sessions list and collect teacher ids
     sessions = []
@@ -71,10 +93,8 @@ def sessions_list(request):
     for s in sessions:
         s['teacher_name'] = teacher_map.get(s['teacher_id'], None)
 
-    return render(request, 'admin/sessions/list.html', {
-        'sessions': sessions,
-        'today': today
-    })
+    return page, sessions
+
 
 # Admin/Teacher: create session
 def session_add(request):
@@ -85,8 +105,7 @@ def session_add(request):
         cursor.execute("SELECT id, name, code FROM course ORDER BY name")
         courses = dictfetchall(cursor)
 
-        cursor.execute("SELECT id, name FROM location ORDER BY name")
-        locations = dictfetchall(cursor)
+        locations = [{'id': loc_id, 'name': name} for loc_id, name in ref_cache.location_choices()]
 
         cursor.execute("SELECT value, name FROM ref_constant WHERE type='timeslot' ORDER BY value")
         timeslots = dictfetchall(cursor)
@@ -119,9 +138,11 @@ def session_add(request):
             with transaction.atomic():
                 with connection.cursor() as cursor:
                     cursor.execute("""
-                        INSERT INTO class_session (course_id, teacher_id, location_id, date, timeslot, lesson_type, token, created_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, gen_random_uuid(), now()) RETURNING id, token
-                    """, [course_id, teacher_id, location_id, date, timeslot, lesson_type])
+                        INSERT INTO class_session (course_id, teacher_id, location_id, date, timeslot, lesson_type, token, created_at,
+                                                   semester_id)
+                        VALUES (%s, %s, %s, %s, %s, %s, gen_random_uuid(), now(),
+                                attendance_course_semester(%s, %s::date)) RETURNING id, token
+                    """, [course_id, teacher_id, location_id, date, timeslot, lesson_type, course_id, date])
                     r = cursor.fetchone()
                     new_id = r[0]
                     token = r[1]
@@ -201,9 +222,6 @@ def session_view(request, session_id):
 
     # generate QR (link to scan page)
     qr_url = f"{settings.APP_BASE_URL}/attendance/{session['token']}/scan"
-    qr = qrcode.make(qr_url)
-    buffer = BytesIO()
-    qr.save(buffer, format="PNG")
-    qr_b64 = base64.b64encode(buffer.getvalue()).decode()
+    qr_b64 = qr_render.qr_base64(qr_url)
 
     return render(request, 'admin/sessions/view.html', {'session': session, 'qr_b64': qr_b64})
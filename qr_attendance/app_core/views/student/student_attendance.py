@@ -3,6 +3,8 @@ from django.db import connection
 from django.utils import timezone
 from django.http import Http404
 
+from app_core.services import attendance_summary
+
 
 def student_attendance(request, student_code):
     """View student attendance by student code"""
@@ -51,63 +53,8 @@ def student_attendance(request, student_code):
         'name': student_row[2]
     }
     
-    # Get student's courses for current year/term
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT DISTINCT 
-                c.id,
-                c.name,
-                c.code,
-                COUNT(DISTINCT cs.id) as total_sessions,
-                COUNT(DISTINCT CASE WHEN a.attendance_type_id = 1 THEN a.id END) as present_count,
-                COUNT(DISTINCT CASE WHEN a.attendance_type_id = 2 THEN a.id END) as absent_count,
-                COUNT(DISTINCT CASE WHEN a.attendance_type_id = 3 THEN a.id END) as late_count,
-                COUNT(DISTINCT CASE WHEN a.attendance_type_id = 4 THEN a.id END) as excused_count,
-                cg.name as group_name,
-                cg.group_number
-            FROM student_class_group scg
-            INNER JOIN class_group cg ON cg.id = scg.class_group_id
-            INNER JOIN class_group_schedule cgs ON cgs.class_group_id = cg.id
-            INNER JOIN course_schedule_pattern csp ON csp.id = cgs.course_schedule_pattern_id
-            INNER JOIN course c ON c.id = csp.course_id
-            INNER JOIN semester sem ON sem.id = csp.semester_id
-            LEFT JOIN class_session cs ON cs.course_id = c.id 
-                AND EXTRACT(YEAR FROM cs.date) = sem.school_year
-                AND ((sem.term = 1 AND EXTRACT(MONTH FROM cs.date) BETWEEN 8 AND 12)
-                     OR (sem.term = 2 AND EXTRACT(MONTH FROM cs.date) BETWEEN 1 AND 7))
-            LEFT JOIN attendance a ON a.session_id = cs.id AND a.student_id = %s
-            WHERE scg.student_id = %s
-                AND sem.school_year = %s
-                AND sem.term = %s
-            GROUP BY c.id, c.name, c.code, cg.name, cg.group_number
-            ORDER BY c.name
-        """, [student['id'], student['id'], current_year, current_term])
-        
-        courses = []
-        for row in cursor.fetchall():
-            total = row[3] or 0
-            present = row[4] or 0
-            absent = row[5] or 0
-            late = row[6] or 0
-            excused = row[7] or 0
-            
-            # Calculate attendance percentage
-            attended = present + late + excused
-            percentage = (attended / total * 100) if total > 0 else 0
-            
-            courses.append({
-                'id': row[0],
-                'name': row[1],
-                'code': row[2],
-                'total_sessions': total,
-                'present_count': present,
-                'absent_count': absent,
-                'late_count': late,
-                'excused_count': excused,
-                'attendance_percentage': round(percentage, 1),
-                'group_name': row[8],
-                'group_number': row[9]
-            })
+    # Get student's courses for current year/term (attendance_summary-аас)
+    courses = attendance_summary.student_courses(student['id'], current_year, current_term)
     
     # Get available years for dropdown
     with connection.cursor() as cursor:
@@ -211,11 +158,15 @@ def student_course_detail(request, student_code, course_id):
             LEFT JOIN attendance_type at ON at.id = a.attendance_type_id
             LEFT JOIN teacher_profile tp ON tp.id = cs.teacher_id
             WHERE cs.course_id = %s
-                AND EXTRACT(YEAR FROM cs.date) = %s
-                AND ((EXTRACT(MONTH FROM cs.date) BETWEEN 8 AND 12 AND %s = 1)
-                     OR (EXTRACT(MONTH FROM cs.date) BETWEEN 1 AND 7 AND %s = 2))
+                AND (cs.semester_id IN (
+                        SELECT id FROM semester WHERE school_year = %s AND term = %s
+                    )
+                    -- semester_id нөхөгдөөгүй (backfill_session_semester) хуучин мөрүүд
+                    OR (cs.semester_id IS NULL AND attendance_course_semester(cs.course_id, cs.date) IN (
+                        SELECT id FROM semester WHERE school_year = %s AND term = %s
+                    )))
             ORDER BY cs.date DESC, cs.created_at DESC
-        """, [student['id'], course_id, selected_year, selected_term, selected_term])
+        """, [student['id'], course_id, selected_year, selected_term, selected_year, selected_term])
         
         sessions = []
         for row in cursor.fetchall():
@@ -1,25 +1,43 @@
 # app_core/views/students.py
-from django.core.paginator import Paginator
-from django.utils import timezone
-from django.contrib import messages
 from django.shortcuts import render, redirect
-from django.core.paginator import Paginator
 from django.db import connection, transaction
+from django.http import JsonResponse
 from ..utils import _is_admin, set_cookie_safe, get_cookie_safe
+from app_core.services import keyset, repository, roster_import, session_roster
 
 # -------------------------
 # Students CRUD
 # -------------------------
+# (student_code, id) keyset - index_pack.sql: student_code_id_idx
+STUDENTS_PAGE_SQL = """
+    SELECT id, full_name, student_code, student_code, id
+    FROM student
+    WHERE (%s = '' OR student_code ILIKE %s OR full_name ILIKE %s) {keyset}
+"""
+
+
+def _students_page(request):
+    q = (request.GET.get('q') or '').strip()
+    like = f'%{q}%'
+    page = keyset.paginate(STUDENTS_PAGE_SQL, [q, like, like], ['student_code', 'id'], request=request)
+    students = [{'id': r[0], 'full_name': r[1], 'student_code': r[2]} for r in page.rows]
+    return page, students, q
+
+
 def students_list(request):
     if not _is_admin(request):
         return redirect('login')
 
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT id, full_name, student_code FROM student ORDER BY id DESC")
-        rows = cursor.fetchall()
+    page, students, q = _students_page(request)
+    return render(request, 'admin/students/list.html', {'students': students, 'page': page, 'q': q})
+
 
-    students = [{'id': r[0], 'full_name': r[1], 'student_code': r[2]} for r in rows]
-    return render(request, 'admin/students/list.html', {'students': students})
+def api_students_list(request):
+    """GET ?q=&limit=&after=|before= -> {"results": [...], "next": token, "prev": token}"""
+    if not _is_admin(request):
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    page, students, _ = _students_page(request)
+    return JsonResponse({'results': students, **page.as_json()})
 
 
 def student_add(request):
@@ -58,6 +76,45 @@ def student_add(request):
     return render(request, 'admin/students/add.html')
 
 
+def student_import(request):
+    """CSV/XLSX roster-оос оюутнуудыг бөөнөөр оруулах (services/roster_import.py)"""
+    if not _is_admin(request):
+        return redirect('login')
+
+    context = {'schools': repository.schools()}
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        context.update({
+            'year': request.POST.get('year') or '',
+            'school_id': request.POST.get('school_id') or '',
+            'update_names': request.POST.get('update_names') == 'on',
+            'dry_run': request.POST.get('dry_run') == 'on',
+        })
+        if not upload:
+            context['error'] = 'Файл сонгоно уу.'
+            return render(request, 'admin/students/import.html', context)
+        try:
+            result = roster_import.import_roster(
+                upload, upload.name,
+                default_year=context['year'] or None,
+                school_id=context['school_id'] or None,
+                update_names=context['update_names'],
+                dry_run=context['dry_run'],
+            )
+        except roster_import.RosterError as e:
+            context['error'] = str(e)
+            return render(request, 'admin/students/import.html', context)
+        except Exception as e:
+            context['error'] = f'Оруулах үед алдаа: {str(e)}'
+            return render(request, 'admin/students/import.html', context)
+
+        if not result.dry_run:
+            session_roster.invalidate()  # бүлгийн гишүүнчлэл өөрчлөгдсөн
+        context.update({'result': result, 'rejects': result.rejects[:500]})
+
+    return render(request, 'admin/students/import.html', context)
+
+
 def student_view(request, student_id):
     if not _is_admin(request):
         return redirect('login')
@@ -153,189 +210,3 @@ def student_delete(request, student_id):
             return render(request, 'admin/students/delete_confirm.html', {'student': student, 'error': str(e)})
 
     return render(request, 'admin/students/delete_confirm.html', {'student': student})
-
-# -------------------------
-# Enrollment (Оюутан-курс холболт)
-# -------------------------
-def enrollments_list(request):
-    # -------------------------
-    # 1) Load base datasets
-    # -------------------------
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT id, full_name, student_code FROM student ORDER BY student_code")
-        all_students = cursor.fetchall()
-
-        cursor.execute("SELECT id, name, code FROM course ORDER BY code")
-        all_courses = cursor.fetchall()
-
-    # Distinct years
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT DISTINCT year FROM enrollment ORDER BY year DESC")
-        years = [r[0] for r in cursor.fetchall()]
-
-    # -------------------------
-    # 2) Read filters (GET params)
-    # -------------------------
-    search = request.GET.get('search', '').strip()
-    filter_course = request.GET.get('course_id') or None
-    filter_year = request.GET.get('year') or None
-    filter_term = request.GET.get('term') or None
-
-    # NEW → Items per page
-    per_page = request.GET.get('per_page', '30')
-    try:
-        per_page = int(per_page)
-        if per_page <= 0:
-            per_page = 30
-    except:
-        per_page = 30
-
-    # -------------------------
-    # 3) Build SQL query
-    # -------------------------
-    sql = """
-        SELECT e.id,
-               s.student_code,
-               s.full_name,
-               c.code,
-               c.name,
-               e.year,
-               e.term
-        FROM enrollment e
-        JOIN student s ON s.id = e.student_id
-        JOIN course c ON c.id = e.course_id
-        WHERE 1=1
-    """
-    params = []
-
-    if search:
-        sql += """ AND (
-            s.student_code ILIKE %s OR 
-            s.full_name ILIKE %s OR
-            c.code ILIKE %s OR
-            c.name ILIKE %s
-        )"""
-        like = f"%{search}%"
-        params.extend([like, like, like, like])
-
-    if filter_course:
-        sql += " AND e.course_id = %s"
-        params.append(filter_course)
-
-    if filter_year:
-        sql += " AND e.year = %s"
-        params.append(filter_year)
-
-    if filter_term:
-        sql += " AND e.term = %s"
-        params.append(filter_term)
-
-    # *** NEW ORDER: course_code → student_code ***
-    sql += " ORDER BY c.code ASC, s.student_code ASC"
-
-    # -------------------------
-    # 4) Fetch rows
-    # -------------------------
-    with connection.cursor() as cursor:
-        cursor.execute(sql, params)
-        rows = cursor.fetchall()
-
-    enrolls_raw = [{
-        'id': r[0],
-        'student_code': r[1],
-        'student_name': r[2],
-        'course_code': r[3],
-        'course_name': r[4],
-        'year': r[5],
-        'term_display': '1-р семестр' if r[6] == 1 else '2-р семестр'
-    } for r in rows]
-
-    # -------------------------
-    # 5) Pagination (per_page)
-    # -------------------------
-    paginator = Paginator(enrolls_raw, per_page)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    # Absolute row number
-    for i, e in enumerate(page_obj):
-        e['number'] = (page_obj.number - 1) * per_page + i + 1
-
-    # -------------------------
-    # 6) POST: Bulk insert
-    # -------------------------
-    if request.method == 'POST':
-        course_id = request.POST.get('course_id')
-        student_ids = request.POST.getlist('student_ids')
-        year = request.POST.get('year')
-        term = request.POST.get('term')
-
-        if not course_id or not student_ids:
-            messages.error(request, "Хичээл болон оюутан сонгоно уу.")
-        else:
-            inserted = skipped = 0
-            with connection.cursor() as cursor:
-                for sid in student_ids:
-                    cursor.execute("""
-                        SELECT 1 FROM enrollment
-                        WHERE student_id=%s AND course_id=%s AND year=%s AND term=%s
-                    """, [sid, course_id, year, term])
-
-                    if cursor.fetchone():
-                        skipped += 1
-                    else:
-                        cursor.execute("""
-                            INSERT INTO enrollment (student_id, course_id, year, term)
-                            VALUES (%s, %s, %s, %s)
-                        """, [sid, course_id, year, term])
-                        inserted += 1
-
-            msg = f"Амжилттай: {inserted} элслээ."
-            if skipped:
-                msg += f" (Давхардсан: {skipped})"
-            messages.success(request, msg)
-
-        # Preserve filters + scroll to results
-        params = request.GET.copy()
-        params['scroll'] = '1'
-        return redirect(f"{request.path}?{params.urlencode()}")
-
-    # -------------------------
-    # Defaults
-    # -------------------------
-    now = timezone.now()
-    default_year = now.year
-    default_term = 2 if now.month <= 7 else 1
-
-    return render(request, 'admin/enrollments/list.html', {
-        'enrolls': page_obj,
-        'page_obj': page_obj,
-        'paginator': paginator,
-
-        'all_students': all_students,
-        'all_courses': all_courses,
-        'years': years,
-
-        'default_year': default_year,
-        'default_term': default_term,
-
-        # template filters
-        'search': search,
-        'filter_course': filter_course,
-        'filter_year': filter_year,
-        'filter_term': filter_term,
-
-        # NEW: number of rows per page
-        'per_page': per_page,
-    })
-
-
-def enrollment_delete(request, enrollment_id):
-    if not _is_admin(request):
-        return redirect('login')
-
-    with connection.cursor() as cursor:
-        cursor.execute("DELETE FROM enrollment WHERE id = %s", [enrollment_id])
-
-    messages.success(request, 'Элсэлт устгагдлаа')
-    return redirect('enrollments_list')
\ No newline at end of file
@@ -3,13 +3,14 @@ from django.db import connection, transaction
 from django.http import JsonResponse, HttpResponseBadRequest, Http404
 from django.urls import reverse
 from django.utils import timezone
-from io import BytesIO
 from datetime import timedelta
 import uuid
-import datetime, math, qrcode, base64
+import datetime
 from django.conf import settings
 from ...utils import _get_current_semester_pattern  
 import pytz
+from app_core.services import session_roster, qr_render, geofence, ref_cache
+from app_core.services.session_prefill import preregister_absent
 ub_tz = pytz.timezone('Asia/Ulaanbaatar')
 
 def make_aware_ub(dt, ub_tz):
@@ -21,15 +22,9 @@ def make_aware_ub(dt, ub_tz):
     return timezone.localtime(dt, ub_tz)
 
 def get_timeslots(school_id):
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT name, value, id 
-                FROM time_setting
-                WHERE location_id = %s       
-            ORDER BY id
-        """, [school_id])
-        times = cursor.fetchall()
-    return [{"name": t[0], "slot": t[1], "id": t[2]} for t in times]
+    if school_id is None:
+        return []
+    return [{"name": t["name"], "slot": t["value"], "id": t["id"]} for t in ref_cache.timeslots(school_id)]
 
 def get_teacher_info(user_id):
     with connection.cursor() as cursor:
@@ -170,13 +165,7 @@ def teacher_dashboard(request):
 
 def get_attendance_types():
     """Get all attendance types"""
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT id, name, value
-            FROM attendance_type
-            ORDER BY id
-        """)
-        return cursor.fetchall()
+    return ref_cache.attendance_types()
 
 #ҮҮСГЭХ эхлэх
     
@@ -185,10 +174,9 @@ from django.db import connection, transaction
 from django.http import JsonResponse, HttpResponseBadRequest, Http404
 from django.urls import reverse
 from django.utils import timezone
-from io import BytesIO
 from datetime import timedelta
 import uuid
-import datetime, math, qrcode, base64
+import datetime
 from ...utils import _get_current_semester_pattern
 
 
@@ -211,26 +199,14 @@ def get_teacher_info(user_id):
 
 def get_timeslots(school_id):
     """Get all timeslots for a school"""
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT name, value, id 
-            FROM time_setting
-            WHERE location_id = %s       
-            ORDER BY id
-        """, [school_id])
-        times = cursor.fetchall()
-    return [{"name": t[0], "slot": t[1], "id": t[2]} for t in times]
+    if school_id is None:
+        return []
+    return [{"name": t["name"], "slot": t["value"], "id": t["id"]} for t in ref_cache.timeslots(school_id)]
 
 
 def get_attendance_types():
     """Get all attendance types"""
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT id, name, value
-            FROM attendance_type
-            ORDER BY id
-        """)
-        return cursor.fetchall()
+    return ref_cache.attendance_types()
 
 
 def get_class_groups_for_pattern(pattern_id):
@@ -382,7 +358,7 @@ def create_session(request):
     # Session info if created
     created_session = None
     session_attendance = []
-    qr_code_base64 = None
+    qr_code_url = None
 
     message = None
     error = None
@@ -399,12 +375,13 @@ def create_session(request):
             time_setting_id_post = request.POST.get('time_setting_id') or None
             session_name = request.POST.get('name') or ''
             class_room_id = None
+            semester_id = None
 
             # If created from pattern, get pattern details
             if pattern_id:
                 with connection.cursor() as cursor:
                     cursor.execute("""
-                        SELECT course_id, lesson_type_id, class_room_id, location_id
+                        SELECT course_id, lesson_type_id, class_room_id, location_id, semester_id
                         FROM course_schedule_pattern
                         WHERE id = %s
                     """, [pattern_id])
@@ -414,6 +391,7 @@ def create_session(request):
                         lesson_type_id = p[1]
                         class_room_id = p[2]
                         location_id = p[3]
+                        semester_id = p[4]
             else:
                 class_room_id = request.POST.get('class_room_id') or None
 
@@ -435,8 +413,9 @@ def create_session(request):
                         cursor.execute("""
                             INSERT INTO class_session
                             (teacher_id, course_id, token, location_id, date, created_at,
-                             lesson_type_id, time_setting_id, expires_at, name)
-                            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                             lesson_type_id, time_setting_id, expires_at, name, semester_id)
+                            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,
+                                    COALESCE(%s::bigint, attendance_course_semester(%s, %s)))
                             RETURNING id, token, expires_at
                         """, [
                             teacher_id,
@@ -448,10 +427,12 @@ def create_session(request):
                             lesson_type_id,
                             time_setting_id_post,
                             expires_at,
-                            session_name
+                            session_name,
+                            semester_id, course_id, now_local.date()
                         ])
                         cs_row = cursor.fetchone()
                         if cs_row:
+                            session_roster.build(cs_row[0], course_id, expires_at)
                             created_session = {
                                 'id': cs_row[0],
                                 'token': str(cs_row[1]),
@@ -459,45 +440,12 @@ def create_session(request):
                                 'name': session_name,
                             }
                             
-                            # Generate QR code
-                            qr_url = request.build_absolute_uri(f'/attendance/{cs_row[1]}/scan/')
-                            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-                            qr.add_data(qr_url)
-                            qr.make(fit=True)
-                            img = qr.make_image(fill_color="black", back_color="white")
-                            
-                            buffered = BytesIO()
-                            img.save(buffered, format="PNG")
-                            qr_code_base64 = base64.b64encode(buffered.getvalue()).decode()
+                            # QR зургийг /attendance/<token>/qr.png endpoint кэштэйгээр өгнө
+                            qr_code_url = reverse('attendance_qr_png', args=[cs_row[1]])
 
-                    # Pre-register all students as "Тасалсан" (absent)
+                    # Pre-register all students as "Тасалсан" (absent) - нэг INSERT ... SELECT
                     if pattern_id:
-                        # Find attendance_type_id for "Тасалсан"
-                        with connection.cursor() as cursor:
-                            cursor.execute("""
-                                SELECT id FROM attendance_type WHERE value = 'absent' OR name ILIKE '%тасалсан%' LIMIT 1
-                            """)
-                            absent_type = cursor.fetchone()
-                            absent_type_id = absent_type[0] if absent_type else 2  # default to 2
-
-                            # Get all students for pattern
-                            cursor.execute("""
-                                SELECT DISTINCT s.id
-                                FROM class_group_schedule cgs
-                                INNER JOIN class_group cg ON cg.id = cgs.class_group_id
-                                INNER JOIN student_class_group scg ON scg.class_group_id = cg.id
-                                INNER JOIN student s ON s.id = scg.student_id
-                                WHERE cgs.course_schedule_pattern_id = %s
-                            """, [pattern_id])
-                            all_students = cursor.fetchall()
-
-                            # Batch insert as "Тасалсан"
-                            for student in all_students:
-                                cursor.execute("""
-                                    INSERT INTO attendance
-                                    (session_id, student_id, "timestamp", attendance_type_id, device_id, device_info)
-                                    VALUES (%s, %s, %s, %s, %s, %s)
-                                """, [cs_row[0], student[0], now_local, absent_type_id, 'pre-registered', 'Автоматаар тасалсан'])
+                        preregister_absent(cs_row[0], pattern_id, now_local)
 
                     message = "Session амжилттай үүслээ. Бүх оюутнууд 'Тасалсан' байдлаар урьдчилан бүртгэгдлээ."
             except Exception as e:
@@ -587,16 +535,8 @@ def create_session(request):
                         'name': cs_row[3],
                     }
                     
-                    # Regenerate QR code
-                    qr_url = request.build_absolute_uri(f'/attendance/{cs_row[1]}/scan/')
-                    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-                    qr.add_data(qr_url)
-                    qr.make(fit=True)
-                    img = qr.make_image(fill_color="black", back_color="white")
-                    
-                    buffered = BytesIO()
-                    img.save(buffered, format="PNG")
-                    qr_code_base64 = base64.b64encode(buffered.getvalue()).decode()
+                    # QR зургийг /attendance/<token>/qr.png endpoint кэштэйгээр өгнө
+                    qr_code_url = reverse('attendance_qr_png', args=[cs_row[1]])
 
         elif action == 'remove_attendance':
             attendance_id = request.POST.get('attendance_id')
@@ -630,16 +570,8 @@ def create_session(request):
                             'name': cs_row[3],
                         }
                         
-                        # Regenerate QR code
-                        qr_url = request.build_absolute_uri(f'/attendance/{cs_row[1]}/scan/')
-                        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-                        qr.add_data(qr_url)
-                        qr.make(fit=True)
-                        img = qr.make_image(fill_color="black", back_color="white")
-                        
-                        buffered = BytesIO()
-                        img.save(buffered, format="PNG")
-                        qr_code_base64 = base64.b64encode(buffered.getvalue()).decode()
+                        # QR зургийг /attendance/<token>/qr.png endpoint кэштэйгээр өгнө
+                        qr_code_url = reverse('attendance_qr_png', args=[cs_row[1]])
 
     # Load attendance for active session
     if created_session:
@@ -666,7 +598,7 @@ def create_session(request):
         'class_groups': class_groups,
         'created_session': created_session,
         'session_attendance': session_attendance,
-        'qr_code_base64': qr_code_base64,
+        'qr_code_url': qr_code_url,
         'message': message,
         'error': error,
         'day_of_week': day_of_week,
@@ -875,23 +807,17 @@ def teacher_schedule(request):
         semester = {'id': sem[0], 'school_id': sem[1], 'start_date': sem[2], 'end_date': sem[3]}
 
     # Load timeslots for school's location (fallback to all)
-    timeslots = []
-    with connection.cursor() as cursor:
-        if semester and semester['school_id']:
-            cursor.execute("""
-                SELECT id, COALESCE(name, 'Цаг ' || id::text) AS name, value AS slot, start_time, end_time
-                FROM time_setting WHERE location_id = %s ORDER BY start_time NULLS LAST, id
-            """, [semester['school_id']])
-            ts_rows = cursor.fetchall()
-            if not ts_rows:
-                cursor.execute("SELECT id, COALESCE(name,'Цаг ' || id::text) AS name, value AS slot, start_time, end_time FROM time_setting ORDER BY start_time NULLS LAST, id")
-                ts_rows = cursor.fetchall()
-        else:
-            cursor.execute("SELECT id, COALESCE(name,'Цаг ' || id::text) AS name, value AS slot, start_time, end_time FROM time_setting ORDER BY start_time NULLS LAST, id")
-            ts_rows = cursor.fetchall()
-
-    for r in ts_rows:
-        timeslots.append({'id': r[0], 'name': r[1], 'slot': r[2], 'start_time': r[3], 'end_time': r[4]})
+    ts_rows = []
+    if semester and semester['school_id']:
+        ts_rows = ref_cache.timeslots(semester['school_id'], order='start_time')
+    if not ts_rows:
+        ts_rows = ref_cache.timeslots(order='start_time')
+
+    timeslots = [
+        {'id': t['id'], 'name': t['name'] or f"Цаг {t['id']}", 'slot': t['value'],
+         'start_time': t['start_time'], 'end_time': t['end_time']}
+        for t in ts_rows
+    ]
 
     # Load patterns for this teacher in this semester (if semester selected)
     patterns = []
@@ -1095,25 +1021,17 @@ def session_detail(request, token):
     # --------------------------
     # 4) Load location
     # --------------------------
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT name FROM location WHERE id = %s", [session['location_id']])
-        lr = cursor.fetchone()
-    location = lr[0] if lr else "Заагаагүй"
+    lr = ref_cache.location(session['location_id'])
+    location = lr['name'] if lr else "Заагаагүй"
 
     # --------------------------
     # 5) Load time slot via time_setting
     # --------------------------
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT name, start_time, end_time 
-            FROM time_setting 
-            WHERE id = %s
-        """, [session['time_setting_id']])
-        ts = cursor.fetchone()
+    ts = ref_cache.timeslot(session['time_setting_id'])
 
     if ts:
-        slot_name = ts[0]
-        slot_range = f"{ts[1].strftime('%H:%M')} - {ts[2].strftime('%H:%M')}"
+        slot_name = ts['name']
+        slot_range = f"{ts['start_time'].strftime('%H:%M')} - {ts['end_time'].strftime('%H:%M')}"
     else:
         slot_name = "Цаггүй"
         slot_range = ""
@@ -1165,14 +1083,7 @@ def session_detail(request, token):
     # --------------------------
     qr_url = f"{settings.APP_BASE_URL}/attendance/scan/{session['token']}/"
 
-    qr = qrcode.QRCode(box_size=10, border=3)
-    qr.add_data(qr_url)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    qr_base64 = base64.b64encode(buf.getvalue()).decode()
+    qr_base64 = qr_render.qr_base64(qr_url, box_size=10, border=3)
 
     # --------------------------
     # 8) Render
@@ -1299,17 +1210,8 @@ def attendance_scan(request, token):
     if loc:
         loc_lat, loc_lon, radius = loc
 
-        def haversine(lat1, lon1, lat2, lon2):
-            R = 6371000
-            phi1, phi2 = math.radians(lat1), math.radians(lat2)
-            dphi = math.radians(lat2 - lat1)
-            dlam = math.radians(lon2 - lon1)
-            a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2) ** 2
-            return R * (2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)))
-
         try:
-            dist = haversine(float(lat), float(lon), float(loc_lat), float(loc_lon))
-            if dist > radius:
+            if not geofence.get_fence(loc_lat, loc_lon, radius).contains(lat, lon):
                 return JsonResponse({"ok": False, "error": "Байршил хичээлийн байрлалаас гадуур байна."})
         except:
             return JsonResponse({"ok": False, "error": "GPS мэдээлэл буруу байна."})
@@ -1432,29 +1334,23 @@ def pattern_detail(request, pattern_id):
 
     # Load selectable lists
     # lesson types
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT id, name, value FROM lesson_type ORDER BY id")
-        lesson_types = [{"id": rr[0], "name": rr[1], "value": rr[2]} for rr in cursor.fetchall()]
+    lesson_types = ref_cache.lesson_types()
 
     # locations (limit to school's locations if possible)
-    with connection.cursor() as cursor:
-        if pattern.get("school_id"):
-            cursor.execute("SELECT id, name FROM location WHERE id = %s ORDER BY id", [pattern["location_id"]])
-        else:
-            cursor.execute("SELECT id, name FROM location ORDER BY id")
-        locations = [{"id": rr[0], "name": rr[1]} for rr in cursor.fetchall()]
+    locations = sorted(
+        ({"id": loc["id"], "name": loc["name"]} for loc in ref_cache.locations()
+         if not pattern.get("school_id") or loc["id"] == pattern["location_id"]),
+        key=lambda loc: loc["id"],
+    )
 
     # time_settings for the location (if provided)
     timeslots = []
-    with connection.cursor() as cursor:
-        if pattern.get("location_id"):
-            cursor.execute("""
-                SELECT id, name, value, start_time, end_time FROM time_setting
-                WHERE location_id = %s
-                ORDER BY start_time NULLS LAST, id
-            """, [pattern["location_id"]])
-            for t in cursor.fetchall():
-                timeslots.append({"id": t[0], "name": t[1], "slot": t[2], "start_time": t[3], "end_time": t[4]})
+    if pattern.get("location_id"):
+        timeslots = [
+            {"id": t["id"], "name": t["name"], "slot": t["value"],
+             "start_time": t["start_time"], "end_time": t["end_time"]}
+            for t in ref_cache.timeslots(pattern["location_id"], order='start_time')
+        ]
 
     # semesters (distinct recent)
     with connection.cursor() as cursor:
@@ -1467,21 +1363,7 @@ def pattern_detail(request, pattern_id):
         """, [pattern.get("school_id"), pattern.get("school_id")])
         semesters = [{"id": s[0], "year": s[1], "term": s[2], "start_date": s[3], "end_date": s[4]} for s in cursor.fetchall()]
 
-    # Determine semester to filter existing sessions:
-    semester_start = None
-    semester_end = None
-    if pattern.get("school_year") and pattern.get("term"):
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT start_date, end_date FROM semester
-                WHERE school_year = %s AND term = %s
-                ORDER BY id DESC LIMIT 1
-            """, [pattern["school_year"], pattern["term"]])
-            srow = cursor.fetchone()
-            if srow:
-                semester_start, semester_end = srow[0], srow[1]
-
-    # Load existing sessions for this pattern's course/teacher/time/lesson within semester date range (if available)
+    # Load existing sessions for this pattern's course/teacher/time/lesson in the pattern's semester
     sessions = []
     with connection.cursor() as cursor:
         q = """
@@ -1501,9 +1383,12 @@ def pattern_detail(request, pattern_id):
             q += " AND s.lesson_type_id = %s"
             params.append(pattern["lesson_type_id"])
 
-        if semester_start and semester_end:
-            q += " AND s.date >= %s AND s.date <= %s"
-            params.extend([semester_start, semester_end])
+        # class_session.semester_id - (teacher_id, course_id, semester_id, date) index;
+        # semester_id нөхөгдөөгүй хуучин мөрүүдэд attendance_course_semester()
+        if pattern.get("semester_id"):
+            q += """ AND (s.semester_id = %s OR (s.semester_id IS NULL
+                          AND attendance_course_semester(s.course_id, s.date) = %s))"""
+            params += [pattern["semester_id"], pattern["semester_id"]]
 
         q += " ORDER BY s.date DESC LIMIT 200"
 
@@ -1617,16 +1502,21 @@ def pattern_create_session(request, pattern_id):
                 cursor.execute("""
                     INSERT INTO class_session
                     (teacher_id, course_id, school_id, location_id, lesson_type_id, time_setting_id,
-                     name, date, expires_at, created_at)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s, now() + (%s || ' minutes')::interval, NOW())
+                     name, date, expires_at, created_at, semester_id)
+                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s, now() + (%s || ' minutes')::interval, NOW(),
+                            COALESCE(%s::bigint, attendance_course_semester(%s, %s)))
                     RETURNING id, token, expires_at
                 """, [
                     pattern_teacher_id, course_id, school_id, location_id,
                     lesson_type_id, time_setting_id, name or f"Session {session_date}", session_date_obj,
-                    str(duration_minutes)
+                    str(duration_minutes),
+                    pattern_semester_id, course_id, session_date_obj
                 ])
                 row = cursor.fetchone()
                 session_id, token, expires_at = row
+
+            # Pattern-ийн бүх оюутныг "Тасалсан" байдлаар урьдчилан бүртгэнэ
+            preregister_absent(session_id, pattern_id)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
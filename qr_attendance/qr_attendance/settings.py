@@ -24,6 +24,64 @@ OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
 OLLAMA_REQUEST_TIMEOUT = int(os.getenv("OLLAMA_REQUEST_TIMEOUT", "25"))
 
 
+# ==============================================================================
+# QR SCAN CACHE
+# ==============================================================================
+
+# Token -> session snapshot кэшийн дээд TTL (сек); expires_at-аас хэтрэхгүй
+SESSION_CACHE_MAX_TTL = int(os.getenv("SESSION_CACHE_MAX_TTL", "60"))
+# Session-ийн элсэлтийн roster-ийн дээд TTL (сек); expires_at-аас хэтрэхгүй.
+# Өөр worker дээрх анги бүлгийн өөрчлөлт хамгийн ихдээ энэ хугацаанд хоцорно
+SESSION_ROSTER_MAX_TTL = int(os.getenv("SESSION_ROSTER_MAX_TTL", "900"))
+
+# attendance_type/lesson_type/room_type/time_setting/location кэшийн TTL (сек)
+REF_CACHE_MAX_TTL = int(os.getenv("REF_CACHE_MAX_TTL", "300"))
+# True бол look_up засвар NOTIFY ref_cache илгээж, worker бүр LISTEN хийн шууд хаяна
+REF_CACHE_LISTEN = os.getenv("REF_CACHE_LISTEN", "False").lower() in ("true", "1", "yes")
+
+# Багшийн дэлгэц дээрх QR token-ийг хэдэн секунд тутам шинэчлэх (HMAC гарын үсэгтэй)
+QR_ROTATE_SECONDS = int(os.getenv("QR_ROTATE_SECONDS", "15"))
+# Scan хуудас нээгдсэнээс хойш илгээх хүртэлх хугацаа (сек)
+QR_SUBMIT_MAX_AGE = int(os.getenv("QR_SUBMIT_MAX_AGE", "300"))
+
+# 'sync' - scan бүр шууд attendance руу бичнэ
+# 'spool' - локал SQLite spool руу бичээд `manage.py scan_spool_worker` batch-аар оруулна
+SCAN_INGEST_MODE = os.getenv("SCAN_INGEST_MODE", "sync")
+SCAN_SPOOL_PATH = os.getenv("SCAN_SPOOL_PATH", str(BASE_DIR / "var" / "scan_spool.sqlite3"))
+SCAN_SPOOL_BATCH = int(os.getenv("SCAN_SPOOL_BATCH", "200"))
+# Ийм олон удаа бичиж чадаагүй spool мөрийг failed (dead letter) болгож алгасна
+SCAN_SPOOL_MAX_ATTEMPTS = int(os.getenv("SCAN_SPOOL_MAX_ATTEMPTS", "5"))
+
+
+# ==============================================================================
+# SQL TRACE
+# ==============================================================================
+
+# Request бүрийн SQL тоо, хугацааг Server-Timing header болон app_core.sql лог руу.
+# Default нь DEBUG-тэй ижил: production-д зөвхөн SQL_TRACE=True өгвөл асна
+SQL_TRACE = os.getenv("SQL_TRACE", os.getenv("DEBUG", "False")).lower() in ("true", "1", "yes")
+# 'all' - request бүрийг, 'budget' - budget хэтэрсэн эсвэл удаан statement-тэйг, 'off'
+SQL_TRACE_LOG = os.getenv("SQL_TRACE_LOG", "budget")
+# Ийм удаан (ms) statement-тэй request-ийг логлоно
+SQL_TRACE_SLOW_MS = int(os.getenv("SQL_TRACE_SLOW_MS", "200"))
+# Логт хамгийн удаан / олон давтагдсан хэдэн statement гаргах
+SQL_TRACE_TOP = int(os.getenv("SQL_TRACE_TOP", "3"))
+# URL name -> request-ийн дээд query тоо; '*' бол жагсаалтад байхгүй бүх endpoint
+SQL_QUERY_BUDGETS = {
+    '*': 100,
+    'submit_attendance': 10,
+    'submit_attendance_signed': 10,
+    'scan_page': 10,
+    'scan_page_signed': 10,
+    'admin_dashboard': 10,
+    'admin_dashboard_metrics': 5,
+    'api_search_students': 5,
+    'api_search_courses': 5,
+}
+# True бол budget хэтэрсэн request QueryBudgetExceeded (AssertionError) шиднэ - тест, bench-д
+SQL_BUDGET_RAISE = os.getenv("SQL_BUDGET_RAISE", "False").lower() in ("true", "1", "yes")
+
+
 # ==============================================================================
 # CORE SETTINGS
 # ==============================================================================
@@ -118,6 +176,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'app_core.middleware.SqlTraceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -125,6 +184,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app_core.middleware.RequestScopeMiddleware',
 ]
 
 
@@ -155,11 +215,28 @@ TEMPLATES = [
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# 0 бол pool-гүй: Django-ийн persistent холболт (DB_CONN_MAX_AGE сек, thread бүрд нэг).
+# >0 бол worker process бүр дээд тал нь ийм тооны холболттой pool (app_core.db backend,
+# services/db_pool.py); gunicorn --threads-ийн тооноос багагүй байлгана.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0"))
+# Pool-ийн бүх холболт ашиглагдаж байхад хэдэн секунд хүлээгээд алдаа өгөх
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Ийм удаан (сек) хэрэглэгдээгүй холболтыг өгөхөөс өмнө SELECT 1-ээр шалгана
+DB_POOL_CHECK_IDLE = int(os.getenv("DB_POOL_CHECK_IDLE", "30"))
+# Ийм удаан сул байсан холболтыг хаана / ийм насны холболтыг шинээр солино
+DB_POOL_MAX_IDLE = int(os.getenv("DB_POOL_MAX_IDLE", "300"))
+DB_POOL_MAX_LIFETIME = int(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+# Pool-гүй үед холболтыг хэдэн секунд дахин ашиглах (0 - request бүрд шинэ холболт)
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "600"))
+# pgbouncer (transaction pooling) ард ажиллах үед: server-side cursor хэрэглэхгүй.
+# REF_CACHE_LISTEN-ийн LISTEN нь session pooling эсвэл шууд холболт шаардана.
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "False").lower() in ("true", "1", "yes")
+
 if DATABASE_URL:
     DATABASES = {
         "default": dj_database_url.parse(
             DATABASE_URL,
-            conn_max_age=None,
+            conn_max_age=DB_CONN_MAX_AGE,
             ssl_require=True,
         )
     }
@@ -172,9 +249,18 @@ else:
             'PASSWORD': os.getenv("DB_PASSWORD", "1234"),
             'HOST': os.getenv("DB_HOST", "localhost"),
             'PORT': os.getenv("DB_PORT", "5432"),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
         }
     }
 
+# Тасарсан persistent холболтыг request эхлэхэд шалгаж солино
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = DB_PGBOUNCER
+if DB_POOL_SIZE > 0:
+    # Request бүрийн төгсгөлд холболтыг pool руу буцаана
+    DATABASES['default']['ENGINE'] = 'app_core.db'
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
 # ==============================================================================
 # PASSWORD VALIDATION
 # ==============================================================================
@@ -276,5 +362,10 @@ LOGGING = {
             'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': False,
         },
+        'app_core.sql': {
+            'handlers': ['console'],
+            'level': os.getenv('SQL_TRACE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
     },
 }
\ No newline at end of file